@@ -1,14 +1,38 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict
-from services.risk_service import predict_risk, team_zone_risk
+from typing import Annotated, Dict, List
+from services.risk_service import (
+    predict_risk,
+    predict_risk_batch,
+    build_zone_pyramid,
+    warm_model,
+    model_version,
+    models_info,
+    reload_models,
+    risk_surface,
+)
 from services.ai_service import GPTTacticalService
+from services.cache_service import TTLCache, content_key
+from services.dataset_service import TeamCounts, load_dataset
 from services.log_service import LogService
+from services.startup_service import StartupService
+from services.zone_service import (
+    TRAIN_GRID,
+    ZonePyramid,
+    compare_zone_maps,
+    parse_grid,
+    zone_codes,
+    zone_labels,
+)
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import json
-import re
 import os
+import threading
 from pathlib import Path
 from datetime import datetime
 
@@ -30,7 +54,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-gpt_service = GPTTacticalService()
+# Assets pesados (datasets, modelos, cubos) se cargan en segundo plano
+startup = StartupService()
+
+
+@app.exception_handler(FileNotFoundError)
+async def missing_asset_handler(request, exc: FileNotFoundError):
+    # modelo ausente en disco: el servidor sigue listo para el resto
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+# Se construye en la primera llamada al LLM, no al importar
+_gpt_service: GPTTacticalService | None = None
+_gpt_lock = threading.Lock()
+
+
+def _get_gpt_service() -> GPTTacticalService:
+    global _gpt_service
+    if _gpt_service is None:
+        with _gpt_lock:
+            if _gpt_service is None:
+                _gpt_service = GPTTacticalService()
+    return _gpt_service
 
 # === Carga del dataset una sola vez ===
 
@@ -42,27 +86,57 @@ SOURCE_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "models", "source"))
 # Construcción del nombre del archivo
 MODEL_VARIANTS = {
     "turnover": {
-        "dataset": "train_outfield_K8_T15s.csv",
+        "columnar": "train_outfield_K8_T15s.arrow",
         "description": "Modelo basado en pérdidas (transformData1/trainModel1)",
     },
     "recovery": {
-        "dataset": "train_recoveries_K8_T15s.csv",
+        "columnar": "train_recoveries_K8_T15s.arrow",
         "description": "Modelo basado en recuperaciones (transformData2/trainModel2)",
     },
 }
 
 DEFAULT_MODEL_TYPE = "turnover"
 
+# Precalcular el cubo de zonas de cada equipo antes de reportar "ready"
+WARM_ZONE_CUBES = os.getenv("WARM_ZONE_CUBES", "1") != "0"
+
 TEAMS_PATH = os.path.join(BASE_DIR, "data", "teams_map.csv")
-teams_map = pd.read_csv(TEAMS_PATH).set_index("team_id")["team_name"].to_dict()
+teams_map: dict[int, str] = {}
 
 dataframes: dict[str, pd.DataFrame | None] = {}
-for key, config in MODEL_VARIANTS.items():
-    csv_path = os.path.join(SOURCE_DIR, config["dataset"])
-    if os.path.exists(csv_path):
-        dataframes[key] = pd.read_csv(csv_path)
-    else:
-        dataframes[key] = None
+dataset_errors: dict[str, str] = {}
+# eventos por equipo de cada dataset (calculados al cargar)
+team_counts: dict[str, TeamCounts] = {}
+
+
+def _load_teams_map() -> dict[int, str]:
+    teams_map.update(
+        pd.read_csv(TEAMS_PATH).set_index("team_id")["team_name"].to_dict()
+    )
+    return teams_map
+
+
+def _get_teams_map() -> dict[int, str]:
+    startup.wait("teams_map")
+    if not teams_map:
+        _load_teams_map()
+    return teams_map
+
+
+def _load_dataset(model_type: str) -> pd.DataFrame | None:
+    # dataset inválido (p. ej. zone_id "zx_zy" de una versión anterior): queda
+    # como ausente, no bloquea /readyz y no se vuelve a leer en cada petición;
+    # los endpoints responden 503 con el error
+    try:
+        df = load_dataset(SOURCE_DIR, MODEL_VARIANTS[model_type])
+    except ValueError as e:
+        print(f"⚠️ Dataset '{model_type}' inválido: {e}")
+        dataset_errors[model_type] = str(e)
+        df = None
+    if df is not None:
+        team_counts[model_type] = TeamCounts.from_frame(df)
+    dataframes[model_type] = df
+    return df
 
 
 def _normalize_model_type(model_type: str) -> str:
@@ -73,9 +147,15 @@ def _normalize_model_type(model_type: str) -> str:
 
 
 def _get_dataset(model_type: str) -> pd.DataFrame:
+    startup.wait(f"dataset:{model_type}")
+    if model_type not in dataframes:
+        # sin evento de startup (scripts, tests): carga en línea
+        _load_dataset(model_type)
     df = dataframes.get(model_type)
+    if df is None and model_type in dataset_errors:
+        raise HTTPException(status_code=503, detail=dataset_errors[model_type])
     if df is None:
-        dataset_name = MODEL_VARIANTS[model_type]["dataset"]
+        dataset_name = MODEL_VARIANTS[model_type]["columnar"]
         raise HTTPException(
             status_code=500,
             detail=(
@@ -85,6 +165,205 @@ def _get_dataset(model_type: str) -> pd.DataFrame:
         )
     return df
 
+
+# === Pirámide de riesgo precalculada (model_type, team_id, grilla) ===
+# Se puntúa cada dataset completo una sola vez por versión del modelo; los
+# endpoints sólo consultan (cualquier grilla, sin volver a puntuar). Si el
+# modelo se recarga, la pirámide se recalcula.
+zone_cubes: dict[str, tuple[str, ZonePyramid]] = {}
+_zone_cube_lock = threading.Lock()
+
+# grilla más fina que acepta el parámetro `grid` (1 celda = 1 m x 1 m)
+MAX_ZONE_GRID = (120, 80)
+
+
+def _get_zone_cube(model_type: str) -> ZonePyramid:
+    version = model_version(model_type)
+    entry = zone_cubes.get(model_type)
+    if entry is None or entry[0] != version:
+        with _zone_cube_lock:
+            entry = zone_cubes.get(model_type)
+            if entry is None or entry[0] != version:
+                df = _get_dataset(model_type)
+                entry = (version, build_zone_pyramid(df, model_key=model_type))
+                zone_cubes[model_type] = entry
+    return entry[1]
+
+
+def _parse_zone_grid(grid: str | None) -> tuple[int, int]:
+    if not grid:
+        return TRAIN_GRID
+    try:
+        nx, ny = parse_grid(grid)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Grilla '{grid}' inválida (formato NxM, p. ej. 12x8)")
+    if nx > MAX_ZONE_GRID[0] or ny > MAX_ZONE_GRID[1]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"La grilla máxima es {MAX_ZONE_GRID[0]}x{MAX_ZONE_GRID[1]}",
+        )
+    return nx, ny
+
+
+def zone_filters(
+    period: Annotated[list[int] | None, Query()] = None,
+    minute_bucket: Annotated[list[str] | None, Query(description="0-15, 15-30, ..., 75-90, 90+")] = None,
+    play_pattern: Annotated[list[str] | None, Query()] = None,
+    under_pressure: bool | None = None,
+    counterpress: bool | None = None,
+    opponent: Annotated[list[int] | None, Query()] = None,
+) -> dict[str, list]:
+    """
+    Filtros estructurados de los mapas de zonas (repetibles: ?period=1&period=2).
+    Se responden sumando celdas del cubo precalculado, sin volver a puntuar.
+    """
+    filters = {
+        "period": period,
+        "minute_bucket": minute_bucket,
+        "play_pattern": play_pattern,
+        "under_pressure": under_pressure,
+        "counterpress": counterpress,
+        "opponent": opponent,
+    }
+    return {k: v if isinstance(v, list) else [v] for k, v in filters.items() if v is not None}
+
+
+def _zone_query(query, *args, **kwargs):
+    """Consulta a la pirámide; filtros o grillas no soportados -> 400."""
+    try:
+        return query(*args, **kwargs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _team_zones(model_type: str, team_id: int, grid: tuple[int, int] = TRAIN_GRID,
+                filters: dict | None = None) -> pd.DataFrame:
+    return _zone_query(_get_zone_cube(model_type).team_zones, team_id, grid, filters)
+
+
+# === Matriz de liga (equipos x zonas x modelo) ===
+# Sale de las mismas pirámides (un scoring por dataset y versión del modelo).
+# El payload ya serializado se guarda por (versiones, grilla, formato).
+LEAGUE_CACHE_SIZE = int(os.getenv("LEAGUE_CACHE_SIZE", "32"))
+LEAGUE_CACHE_TTL_S = float(os.getenv("LEAGUE_CACHE_TTL_S", "3600"))
+_league_cache = TTLCache(maxsize=LEAGUE_CACHE_SIZE, ttl=LEAGUE_CACHE_TTL_S)
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def _json_floats(values, decimals: int = 4) -> list:
+    """Array -> listas JSON redondeadas, NaN como null."""
+    arr = np.round(np.asarray(values, dtype=np.float64), decimals)
+    return np.where(np.isnan(arr), None, arr).tolist()
+
+
+def _league_json(matrices: dict, grid: tuple[int, int]) -> bytes:
+    """
+    Columnar: `p`, `n` y `deviation` son [equipo][zona] con los equipos de
+    `teams` y las zonas de `zones` (zx * ny + zy); equipos sin datos en un
+    modelo quedan en null / 0.
+    """
+    teams = np.unique(np.concatenate([m["teams"] for m in matrices.values()]))
+    names = _get_teams_map()
+    nx, ny = grid
+    out = {
+        "grid": [nx, ny],
+        "zones": zone_labels(np.arange(nx * ny), ny).tolist(),
+        "teams": teams.tolist(),
+        "team_names": [names.get(t, f"Equipo {t}") for t in teams.tolist()],
+        "models": {},
+    }
+    for model_type, m in matrices.items():
+        rows = np.searchsorted(teams, m["teams"])
+
+        def expand(values, fill=np.nan):
+            full = np.full((len(teams),) + values.shape[1:], fill, dtype=np.float64)
+            full[rows] = values
+            return full
+
+        out["models"][model_type] = {
+            "version": m["version"],
+            "league_average": _json_floats(m["league_average"]),
+            "league": _json_floats(m["league"]),
+            "team_average": _json_floats(expand(m["team_average"])),
+            "team_deviation": _json_floats(expand(m["team_deviation"])),
+            "p": _json_floats(expand(m["p"])),
+            "deviation": _json_floats(expand(m["deviation"])),
+            "n": expand(m["n"], 0).astype(np.int64).tolist(),
+        }
+    return json.dumps(out, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _league_arrow(matrices: dict, grid: tuple[int, int]) -> bytes:
+    """
+    Formato largo (sólo celdas con eventos) en un stream Arrow IPC:
+    model_type, team_id, zone (código zx * ny + zy), p, n, league, deviation.
+    La grilla, versiones, promedios de liga y nombres van en los metadatos.
+    """
+    columns = {k: [] for k in ("model_type", "team_id", "zone", "p", "n", "league", "deviation")}
+    meta = {"grid": list(grid), "versions": {}, "league_average": {}}
+    for model_type, m in matrices.items():
+        ti, zi = np.nonzero(m["n"])
+        columns["model_type"].append(np.full(len(ti), model_type, dtype=object))
+        columns["team_id"].append(m["teams"][ti])
+        columns["zone"].append(zi)
+        columns["p"].append(m["p"][ti, zi])
+        columns["n"].append(m["n"][ti, zi])
+        columns["league"].append(m["league"][zi])
+        columns["deviation"].append(m["deviation"][ti, zi])
+        meta["versions"][model_type] = m["version"]
+        meta["league_average"][model_type] = float(m["league_average"])
+    cat = {k: np.concatenate(v) for k, v in columns.items()}
+    names = _get_teams_map()
+    teams = np.unique(cat["team_id"]).tolist()
+    meta["team_names"] = {str(t): names.get(t, f"Equipo {t}") for t in teams}
+
+    table = pa.table({
+        "model_type": pa.array(cat["model_type"], pa.string()).dictionary_encode(),
+        "team_id": pa.array(cat["team_id"], pa.int32()),
+        "zone": pa.array(cat["zone"], pa.int16()),
+        "p": pa.array(cat["p"], pa.float32()),
+        "n": pa.array(cat["n"], pa.int32()),
+        "league": pa.array(cat["league"], pa.float32()),
+        "deviation": pa.array(cat["deviation"], pa.float32()),
+    }).replace_schema_metadata({"league_risk_matrix": json.dumps(meta, ensure_ascii=False)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _warm_model(model_type: str):
+    # modelo ausente = "missing" como los datasets (no bloquea /readyz);
+    # los endpoints que lo usen responden el error al pedirlo
+    try:
+        return warm_model(model_type)
+    except FileNotFoundError as e:
+        print(f"⚠️ Modelo '{model_type}' no disponible: {e}")
+        return None
+
+
+def _warm_zone_cube(model_type: str):
+    if dataframes.get(model_type) is None or startup.status(f"model:{model_type}") == "missing":
+        return None
+    return _get_zone_cube(model_type)
+
+
+@app.on_event("startup")
+def start_background_loading():
+    """Encola la carga de assets sin bloquear el arranque del servidor."""
+    startup.submit("teams_map", _load_teams_map)
+    for key in MODEL_VARIANTS:
+        startup.submit(f"dataset:{key}", lambda key=key: _load_dataset(key))
+        startup.submit(f"model:{key}", lambda key=key: _warm_model(key))
+    if WARM_ZONE_CUBES:
+        for key in MODEL_VARIANTS:
+            startup.submit(
+                f"zone_cube:{key}",
+                lambda key=key: _warm_zone_cube(key),
+                depends_on=(f"dataset:{key}", f"model:{key}"),
+            )
+
+
 # ==============================
 #  SCHEMA DE ENTRADA /predict_risk
 # ==============================
@@ -96,7 +375,7 @@ class RiskInput(BaseModel):
     a_minute: float
     period: int
     team_id: int
-    zone_id: str
+    zone_id: str | int  # "zx_zy" o código entero zx * ny + zy (ny = TRAIN_GRID[1])
     pass_length: float | None = -1
     pass_angle: float | None = -1
     a_type: str | None = "Missing"
@@ -119,6 +398,51 @@ class RiskInput(BaseModel):
     model_type: str = DEFAULT_MODEL_TYPE
 
 
+class RiskBatchInput(BaseModel):
+    """
+    Lote de eventos: `events` (lista de RiskInput) o `columns`
+    (formato columnar {columna: [valores]}, todas con la misma longitud).
+    `model_type` puede venir por evento (o columna) o global; el global se
+    usa en los eventos que no lo indican.
+    """
+    events: List[RiskInput] = []
+    columns: Dict[str, list] | None = None
+    model_type: str = DEFAULT_MODEL_TYPE
+
+
+class SurfaceContext(BaseModel):
+    """
+    Contexto fijo para /team_risk_surface: todas las features salvo la
+    posición (ax, ay, zx, zy, zone_id) y el equipo. Los valores None se
+    imputan igual que en el entrenamiento.
+    """
+    a_type: str = "Pass"
+    play_pattern: str = "Regular Play"
+    period: int = 1
+    a_minute: float = 45
+    pass_length: float | None = None
+    pass_angle: float | None = None
+    pass_height: str = "Missing"
+    pass_type: str = "Missing"
+    pass_outcome: str = "Missing"
+    dribble_outcome: str = "Missing"
+    duel_type: str = "Missing"
+    duel_outcome: str = "Missing"
+    under_pressure: int = 0
+    counterpress: int = 0
+    dribble_overrun: int = 0
+    dribble_no_touch: int = 0
+    pass_cross: int = 0
+    pass_cut_back: int = 0
+    pass_switch: int = 0
+    pass_through_ball: int = 0
+    pass_straight: int = 0
+
+
+# resolución máxima de la superficie (celdas por eje): 240x160 = 1 m x 0.5 m
+SURFACE_MAX_BINS = 240
+
+
 class ModelOutput(BaseModel):
     data: dict
     
@@ -133,52 +457,119 @@ class ComparisonInput(BaseModel):
 #         ENDPOINTS
 # ==============================
 
-@app.post("/tactical-recommendations")
-def tactical_recommendations(payload: ModelOutput):
-    raw_text = gpt_service.generate_tactical_recommendations(payload.data)
+@app.get("/healthz")
+def healthz():
+    """El proceso está vivo (no implica que los assets estén cargados)."""
+    return {"status": "ok", "uptime_s": startup.report()["uptime_s"]}
+
+
+@app.get("/readyz")
+def readyz():
+    """
+    Listo cuando todos los assets terminaron de cargar.
+    Incluye estado y tiempo de carga (segundos) por asset.
+    """
+    report = startup.report()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+
+@app.get("/models")
+def list_models():
+    """Versión activa de cada modelo con sus metadatos (features, config, métricas)."""
+    return models_info()
+
+
+@app.post("/models/reload")
+def reload_model(model_type: str | None = None):
+    """
+    Revisa el registro de modelos y cambia a la versión activa en disco sin
+    reiniciar. Las peticiones en curso terminan con la versión anterior; los
+    cubos de zonas se recalculan para la nueva.
+    """
+    model_variant = _normalize_model_type(model_type) if model_type else None
+    try:
+        versions = reload_models(model_variant)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if WARM_ZONE_CUBES:
+        for key in versions:
+            _warm_zone_cube(key)
+    return {"versions": versions}
 
-    # 1. Quitar bloque de markdown ```json ... ```
-    cleaned = re.sub(r"```json|```", "", raw_text).strip()
 
-    # 2. Intentar convertir a JSON
+@app.post("/tactical-recommendations")
+async def tactical_recommendations(payload: ModelOutput):
+    # Async + caché por contenido + deduplicación de llamadas idénticas en curso
     try:
-        parsed_json = json.loads(cleaned)
+        parsed_json = await _get_gpt_service().tactical_recommendations(payload.data)
     except json.JSONDecodeError:
         raise HTTPException(
             status_code=500, detail="La respuesta del modelo no contiene JSON válido."
         )
 
     print(parsed_json)
-    # 3. Retornar JSON limpio
     return {"recommendations": parsed_json}
 
 @app.post("/compare-teams")
-def compare_teams(payload: ComparisonInput):
+async def compare_teams(payload: ComparisonInput):
     print( "payload team",payload.equipo_a, payload.equipo_b)
-    raw_text = gpt_service.generate_comparison_analysis(
-        payload.equipo_a, 
-        payload.equipo_b
-    )
-
-    # 1) Remover ```json ... ```
-    cleaned = re.sub(r"```json|```", "", raw_text).strip()
-    
-
-    # 2) Intentar parsear JSON
     try:
-        parsed_json = json.loads(cleaned)
+        parsed_json = await _get_gpt_service().comparison_analysis(
+            payload.equipo_a,
+            payload.equipo_b
+        )
     except json.JSONDecodeError as e:
-        print("⛔ ERROR JSON:", cleaned)
+        print("⛔ ERROR JSON:", e.doc)
         raise HTTPException(
             status_code=500,
             detail="La respuesta del modelo no contiene JSON válido."
         )
 
-    # 3) Retornar JSON limpio
     print("comparison",parsed_json)
     return {"comparison": parsed_json}
 
 
+# ==============================
+#   STREAMING SSE (LLM)
+# ==============================
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _sse_stream(events):
+    try:
+        async for event, data in events:
+            yield _sse(event, data)
+    except json.JSONDecodeError:
+        yield _sse("error", {"detail": "La respuesta del modelo no contiene JSON válido."})
+
+
+def _sse_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        _sse_stream(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/tactical-recommendations/stream")
+def tactical_recommendations_stream(payload: ModelOutput):
+    """
+    Igual que /tactical-recommendations pero por SSE: eventos `token`
+    (texto del modelo), `section` ({path, value} por cada sección del
+    esquema en cuanto parsea), `done` (JSON completo) o `error`.
+    """
+    return _sse_response(_get_gpt_service().stream_tactical_recommendations(payload.data))
+
+
+@app.post("/compare-teams/stream")
+def compare_teams_stream(payload: ComparisonInput):
+    """Igual que /compare-teams pero por SSE (mismos eventos que el anterior)."""
+    return _sse_response(
+        _get_gpt_service().stream_comparison_analysis(payload.equipo_a, payload.equipo_b)
+    )
+
+
 @app.post("/predict_risk")
 def predict_single(event: RiskInput):
     """
@@ -188,50 +579,283 @@ def predict_single(event: RiskInput):
     model_type = _normalize_model_type(event.model_type)
     payload = event.dict()
     payload.pop("model_type", None)
+    payload["zone_id"] = int(zone_codes([payload["zone_id"]])[0])
     prob = predict_risk(payload, model_type)
     return {"predicted_risk": prob, "model_type": model_type}
 
 
+@app.post("/predict_risk/batch")
+def predict_batch(payload: RiskBatchInput):
+    """
+    Predice el riesgo de muchos eventos a la vez: arma una sola matriz de
+    features y hace una única llamada a predict_proba por model_type.
+    """
+    if payload.columns is not None:
+        lengths = {len(v) for v in payload.columns.values()}
+        if len(lengths) > 1:
+            raise HTTPException(
+                status_code=400,
+                detail="Todas las columnas deben tener la misma longitud.",
+            )
+        df = pd.DataFrame(payload.columns)
+        if "model_type" not in df.columns:
+            df["model_type"] = payload.model_type
+    else:
+        # model_type global para los eventos que no lo traen explícito
+        df = pd.DataFrame([
+            {**event.dict(), "model_type": event.model_type
+             if "model_type" in event.model_fields_set else payload.model_type}
+            for event in payload.events
+        ])
+
+    if df.empty:
+        return {"predicted_risk": [], "model_type": []}
+    if "zone_id" in df.columns:
+        df["zone_id"] = zone_codes(df["zone_id"])
+
+    model_types = df["model_type"].fillna("").astype(str).map(_normalize_model_type)
+    risks = pd.Series(0.0, index=df.index)
+    for model_type, idx in model_types.groupby(model_types).groups.items():
+        risks.loc[idx] = predict_risk_batch(df.loc[idx], model_type)
+
+    return {
+        "predicted_risk": risks.tolist(),
+        "model_type": model_types.tolist(),
+    }
+
+
 @app.get("/team_risk_map/{team_id}")
-def team_risk_map(team_id: int, model_type: str = DEFAULT_MODEL_TYPE):
+def team_risk_map(
+    team_id: int,
+    filters: Annotated[dict, Depends(zone_filters)],
+    model_type: str = DEFAULT_MODEL_TYPE,
+    grid: str | None = None,
+):
     """
-    Devuelve el mapa de riesgo medio por zonas (12x8) para el equipo solicitado.
+    Devuelve el mapa de riesgo medio por zonas para el equipo solicitado.
+    `grid` (p. ej. 6x4, 12x8, 24x16; por defecto 12x8) elige la resolución:
+    todas salen de la misma pirámide, sin volver a puntuar. Los filtros
+    (period, minute_bucket, play_pattern, under_pressure, counterpress,
+    opponent) suman celdas del cubo precalculado.
     Usa el dataset local del backend (no requiere subir archivo).
     """
     model_variant = _normalize_model_type(model_type)
-    df = _get_dataset(model_variant)
-    risk_df = team_zone_risk(df, team_id, model_key=model_variant)
-    team_name = teams_map.get(team_id, f"Equipo {team_id}")
+    zone_grid = _parse_zone_grid(grid)
+    risk_df = _team_zones(model_variant, team_id, zone_grid, filters)
+    team_name = _get_teams_map().get(team_id, f"Equipo {team_id}")
     return {
         "team_id": team_id,
         "team_name": team_name,
+        "grid": list(zone_grid),
+        "filters": filters,
         "zones": risk_df.to_dict(orient="records"),
         "model_type": model_variant,
     }
 
 
-@app.get("/teams")
-def get_all_teams(model_type: str = DEFAULT_MODEL_TYPE):
+@app.get("/team_matchup_map/{team_id}/{opponent_id}")
+def team_matchup_map(
+    team_id: int,
+    opponent_id: int,
+    filters: Annotated[dict, Depends(zone_filters)],
+    model_type: str = DEFAULT_MODEL_TYPE,
+    grid: str | None = None,
+):
     """
-    Devuelve todos los equipos únicos con su cantidad de eventos.
+    Mapa de riesgo por zonas del equipo sólo en sus partidos contra
+    `opponent_id`. Sale del índice (equipo, rival, zona) de la pirámide:
+    búsqueda directa, sin recorrer filas ni volver a puntuar.
     """
     model_variant = _normalize_model_type(model_type)
-    df = _get_dataset(model_variant)
-    team_counts = (
-        df.groupby("team_id")
-        .size()
-        .reset_index(name="events")
-        .sort_values("team_id")
-    )
-    team_counts["team_name"] = (
-        team_counts["team_id"].map(teams_map).fillna("Desconocido")
+    zone_grid = _parse_zone_grid(grid)
+    cube = _get_zone_cube(model_variant)
+    risk_df = _zone_query(cube.matchup_zones, team_id, opponent_id, zone_grid, filters)
+    names = _get_teams_map()
+    return {
+        "team_id": team_id,
+        "team_name": names.get(team_id, f"Equipo {team_id}"),
+        "opponent_id": opponent_id,
+        "opponent_name": names.get(opponent_id, f"Equipo {opponent_id}"),
+        "grid": list(zone_grid),
+        "filters": filters,
+        "zones": risk_df.to_dict(orient="records"),
+        "model_type": model_variant,
+    }
+
+
+@app.get("/team_risk_surface/{team_id}")
+def team_risk_surface(
+    team_id: int,
+    context: Annotated[SurfaceContext, Depends()],
+    model_type: str = DEFAULT_MODEL_TYPE,
+    nx: int = Query(60, ge=2, le=SURFACE_MAX_BINS),
+    ny: int = Query(40, ge=2, le=SURFACE_MAX_BINS),
+):
+    """
+    Superficie de riesgo continua: evalúa el modelo en una grilla nx x ny de
+    posiciones (centros de celda sobre el campo 120x80) para el equipo y el
+    contexto dados, en un solo lote. `risk[j][i]` corresponde a (x[i], y[j]).
+    """
+    model_variant = _normalize_model_type(model_type)
+    surface = risk_surface(team_id, context.dict(), nx, ny, model_key=model_variant)
+    return {
+        "team_id": team_id,
+        "team_name": _get_teams_map().get(team_id, f"Equipo {team_id}"),
+        "model_type": model_variant,
+        **surface,
+    }
+
+
+def _team_map_summary(team_id: int, model_type: str, cells) -> dict:
+    sum_p, n = cells
+    zx, zy = np.nonzero(n)
+    p = sum_p[zx, zy] / n[zx, zy]
+    return {
+        "team_id": team_id,
+        "team_name": _get_teams_map().get(team_id, f"Equipo {team_id}"),
+        "model_type": model_type,
+        "average_risk": round(float(p.mean()), 4) if len(p) else None,
+        "n_zones": int(len(p)),
+        "zonas": dict(zip(zone_labels(zx * n.shape[1] + zy, n.shape[1]), p.tolist())),
+    }
+
+
+@app.get("/team_comparison")
+async def team_comparison(
+    team_a: int,
+    team_b: int,
+    filters: Annotated[dict, Depends(zone_filters)],
+    model_a: str = DEFAULT_MODEL_TYPE,
+    model_b: str | None = None,
+    grid: str | None = None,
+    top: int = Query(5, ge=1, le=50),
+    min_n: int = Query(1, ge=1),
+    head_to_head: bool = False,
+    zones: bool = False,
+    narrative: bool = False,
+):
+    """
+    Compara los mapas de riesgo de dos equipos (cada uno con su modelo) en
+    una sola llamada: deltas por zona (p_a - p_b), correlación de rangos y
+    zonas más divergentes. Ambos mapas salen de las pirámides precalculadas
+    y se buscan en paralelo; los filtros se aplican a los dos equipos. Con
+    `head_to_head=true` cada mapa usa sólo los partidos entre ambos (índice
+    de enfrentamientos, sin recorrer filas). Con `zones=true` cada equipo
+    incluye su mapa (`zonas`), listo para enviar a /compare-teams/stream. Con
+    `narrative=true` se agrega el análisis del LLM (`comparison`, igual que
+    /compare-teams); sin él responde en ms.
+    """
+    variant_a = _normalize_model_type(model_a)
+    variant_b = _normalize_model_type(model_b or model_a)
+    zone_grid = _parse_zone_grid(grid)
+
+    cube_a, cube_b = await asyncio.gather(
+        asyncio.to_thread(_get_zone_cube, variant_a),
+        asyncio.to_thread(_get_zone_cube, variant_b),
     )
+    if head_to_head:
+        cells_a = _zone_query(cube_a.matchup, team_a, team_b, zone_grid, filters)
+        cells_b = _zone_query(cube_b.matchup, team_b, team_a, zone_grid, filters)
+        if cells_a is None or cells_b is None:
+            raise HTTPException(status_code=404, detail=f"No hay partidos entre {team_a} y {team_b}")
+        cells_a, cells_b = cells_a[:2], cells_b[:2]
+    else:
+        cells_a = _zone_query(cube_a.team_cells, team_a, zone_grid, filters)
+        cells_b = _zone_query(cube_b.team_cells, team_b, zone_grid, filters)
+    missing = [t for t, c in ((team_a, cells_a), (team_b, cells_b)) if c is None]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"No hay datos para los equipos {missing}")
+
+    equipo_a = _team_map_summary(team_a, variant_a, cells_a)
+    equipo_b = _team_map_summary(team_b, variant_b, cells_b)
+    result = {
+        "grid": list(zone_grid),
+        "filters": filters,
+        "head_to_head": head_to_head,
+        "team_a": {k: v for k, v in equipo_a.items() if zones or k != "zonas"},
+        "team_b": {k: v for k, v in equipo_b.items() if zones or k != "zonas"},
+        **compare_zone_maps(cells_a, cells_b, top=top, min_n=min_n),
+    }
+    if narrative:
+        try:
+            result["comparison"] = await _get_gpt_service().comparison_analysis(
+                {k: equipo_a[k] for k in ("team_id", "team_name", "zonas")},
+                {k: equipo_b[k] for k in ("team_id", "team_name", "zonas")},
+            )
+        except json.JSONDecodeError:
+            raise HTTPException(
+                status_code=500, detail="La respuesta del modelo no contiene JSON válido."
+            )
+    return result
+
+
+@app.get("/league_risk_matrix")
+def league_risk_matrix(
+    filters: Annotated[dict, Depends(zone_filters)],
+    model_type: Annotated[list[str] | None, Query()] = None,
+    grid: str | None = None,
+    fmt: str = Query("json", alias="format", pattern="^(json|arrow)$"),
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    """
+    Riesgo de todos los equipos en todas las zonas para cada modelo
+    (`model_type` repetible; por defecto todos), con promedio de liga por
+    zona y desvío de cada equipo. `format=arrow` devuelve un stream Arrow IPC
+    en formato largo. Cacheado por versión de los modelos; responde ETag.
+    """
+    model_types = [_normalize_model_type(mt) for mt in model_type or MODEL_VARIANTS]
+    model_types = list(dict.fromkeys(model_types))
+    zone_grid = _parse_zone_grid(grid)
+
+    versions = {mt: model_version(mt) for mt in model_types}
+    key = content_key("league_risk_matrix", versions, zone_grid, filters, fmt)
+    etag = f'"{key[:32]}"'
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    payload = _league_cache.get(key)
+    if payload is None:
+        matrices = {}
+        for mt in model_types:
+            matrix = _zone_query(_get_zone_cube(mt).league_matrix, zone_grid, filters)
+            matrices[mt] = {**matrix, "version": versions[mt]}
+        payload = (_league_arrow if fmt == "arrow" else _league_json)(matrices, zone_grid)
+        _league_cache.set(key, payload)
+
+    media_type = ARROW_STREAM_MEDIA_TYPE if fmt == "arrow" else "application/json"
+    return Response(content=payload, media_type=media_type, headers={"ETag": etag})
+
+
+@app.get("/zone_filters")
+def get_zone_filters(model_type: str = DEFAULT_MODEL_TYPE):
+    """Valores disponibles de cada filtro de los mapas de zonas."""
+    model_variant = _normalize_model_type(model_type)
+    return {"model_type": model_variant, "filters": _get_zone_cube(model_variant).filter_levels()}
 
-    return team_counts.to_dict(orient="records")
+
+@app.get("/teams")
+def get_all_teams(model_type: str = DEFAULT_MODEL_TYPE):
+    """
+    Devuelve todos los equipos únicos con su cantidad de eventos
+    (conteos precalculados al cargar el dataset).
+    """
+    model_variant = _normalize_model_type(model_type)
+    _get_dataset(model_variant)
+    counts = team_counts[model_variant]
+    names = _get_teams_map()
+    return [
+        {"team_id": team_id, "events": events, "team_name": names.get(team_id, "Desconocido")}
+        for team_id, events in zip(counts.teams.tolist(), counts.counts.tolist())
+    ]
 
 
 @app.get("/team_summary/{team_id}")
-def team_summary(team_id: int, model_type: str = DEFAULT_MODEL_TYPE):
+def team_summary(
+    team_id: int,
+    filters: Annotated[dict, Depends(zone_filters)],
+    model_type: str = DEFAULT_MODEL_TYPE,
+    grid: str | None = None,
+):
     """
     Devuelve un resumen táctico del equipo:
     - Riesgo promedio
@@ -239,8 +863,7 @@ def team_summary(team_id: int, model_type: str = DEFAULT_MODEL_TYPE):
     - Recomendación principal
     """
     model_variant = _normalize_model_type(model_type)
-    df = _get_dataset(model_variant)
-    risk_df = team_zone_risk(df, team_id, model_key=model_variant)
+    risk_df = _team_zones(model_variant, team_id, _parse_zone_grid(grid), filters)
     if risk_df.empty:
         return {"error": "No hay datos para este equipo"}
 
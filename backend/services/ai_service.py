@@ -1,24 +1,146 @@
-from openai import OpenAI
+from openai import AsyncOpenAI
+from pathlib import Path
+import json
 import os
+import re
 from dotenv import load_dotenv
 
+from services.cache_service import TTLCache, SingleFlight, content_key
+from services.json_stream import JSONSectionParser, iter_sections
+
 load_dotenv()
 
+TEMPLATES_DIR = Path(__file__).parents[1] / "templates"
+
+# Subir al cambiar el texto de los prompts: invalida las respuestas cacheadas
+PROMPT_VERSION = "1"
+# Decimales de las probabilidades por zona en el prompt (y en la clave de caché)
+ZONE_DECIMALS = 3
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", "3600"))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "256"))
+
+
+def _round_floats(obj, ndigits: int):
+    if isinstance(obj, float):
+        return round(obj, ndigits)
+    if isinstance(obj, dict):
+        return {k: _round_floats(v, ndigits) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_round_floats(v, ndigits) for v in obj]
+    return obj
+
+
+def parse_json_response(raw_text: str) -> dict:
+    """Quita el bloque ```json ... ``` y parsea; lanza JSONDecodeError si no es JSON."""
+    cleaned = re.sub(r"```json|```", "", raw_text).strip()
+    return json.loads(cleaned)
+
 
 class GPTTacticalService:
     def __init__(self):
-        self.client = OpenAI(
+        self.async_client = AsyncOpenAI(
             api_key=os.getenv("OPENAI_API_KEY"),
             base_url=os.getenv("BASE_URL"),
         )
 
         self.model = "gpt-4o-mini"
 
-    def generate_tactical_recommendations(self, model_output: dict):
-        
-        schema = open("templates/tactical_schema.json").read()
-        
-        
+        # respuestas parseadas, direccionadas por contenido del prompt
+        self.cache = TTLCache(maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL_S)
+        self._single_flight = SingleFlight()
+
+    # ==============================
+    #  LLAMADAS ASYNC CON CACHÉ
+    # ==============================
+    async def _cached_completion(self, kind: str, inputs, prompt: str) -> dict:
+        """
+        Devuelve el JSON de la respuesta del modelo. Clave de caché:
+        (versión de prompt, modelo, tipo, entradas redondeadas). Las llamadas
+        idénticas en curso se comparten (single-flight).
+        """
+        key = content_key(PROMPT_VERSION, self.model, kind, inputs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        async def produce():
+            response = await self.async_client.chat.completions.create(
+                model=self.model, messages=[{"role": "user", "content": prompt}]
+            )
+            parsed = parse_json_response(response.choices[0].message.content)
+            self.cache.set(key, parsed)
+            return parsed
+
+        return await self._single_flight.do(key, produce)
+
+    async def tactical_recommendations(self, model_output: dict) -> dict:
+        zones = _round_floats(model_output, ZONE_DECIMALS)
+        return await self._cached_completion(
+            "tactical", zones, self._tactical_prompt(zones)
+        )
+
+    async def comparison_analysis(self, equipo_a: dict, equipo_b: dict) -> dict:
+        equipo_a = _round_floats(equipo_a, ZONE_DECIMALS)
+        equipo_b = _round_floats(equipo_b, ZONE_DECIMALS)
+        return await self._cached_completion(
+            "comparison", [equipo_a, equipo_b],
+            self._comparison_prompt(equipo_a, equipo_b),
+        )
+
+    # ==============================
+    #  STREAMING (tokens + secciones)
+    # ==============================
+    async def _stream_completion(self, kind: str, inputs, prompt: str):
+        """
+        Genera eventos (tipo, datos): "token" por cada delta del modelo,
+        "section" por cada sección del JSON en cuanto parsea y "done" con el
+        JSON completo (que se guarda en la misma caché que la versión no-stream).
+        Lanza JSONDecodeError si la respuesta final no es JSON válido.
+        """
+        key = content_key(PROMPT_VERSION, self.model, kind, inputs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            for path, value in iter_sections(cached):
+                yield "section", {"path": path, "value": value}
+            yield "done", cached
+            return
+
+        stream = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+        )
+        parser = JSONSectionParser()
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            yield "token", {"text": delta}
+            for path, value in parser.feed(delta):
+                yield "section", {"path": path, "value": value}
+
+        parsed = parse_json_response(parser.buf)
+        self.cache.set(key, parsed)
+        yield "done", parsed
+
+    def stream_tactical_recommendations(self, model_output: dict):
+        zones = _round_floats(model_output, ZONE_DECIMALS)
+        return self._stream_completion("tactical", zones, self._tactical_prompt(zones))
+
+    def stream_comparison_analysis(self, equipo_a: dict, equipo_b: dict):
+        equipo_a = _round_floats(equipo_a, ZONE_DECIMALS)
+        equipo_b = _round_floats(equipo_b, ZONE_DECIMALS)
+        return self._stream_completion(
+            "comparison", [equipo_a, equipo_b],
+            self._comparison_prompt(equipo_a, equipo_b),
+        )
+
+    # ==============================
+    #  PROMPTS
+    # ==============================
+    def _tactical_prompt(self, model_output: dict) -> str:
+        schema = (TEMPLATES_DIR / "tactical_schema.json").read_text(encoding="utf-8")
+
         prompt = f"""
 Quiero que actúes como analista táctico profesional. RESPONDE EN ESPAÑOL.
 Aquí están las probabilidades de mi modelo por zona (formato x_y):
@@ -55,15 +177,9 @@ Formato: claro, ordenado y **en JSON limpio**.
 que tenga este formato tu respuesta
 {schema}
 """
+        return prompt
 
-        response = self.client.chat.completions.create(
-            model=self.model, messages=[{"role": "user", "content": prompt}]
-        )
-
-        return response.choices[0].message.content
-    
-    
-    def generate_comparison_analysis(self, equipo_a: dict, equipo_b: dict):
+    def _comparison_prompt(self, equipo_a: dict, equipo_b: dict) -> str:
 
         team_a_name = equipo_a.get("team_name", "Equipo A")
         team_b_name = equipo_b.get("team_name", "Equipo B")
@@ -183,10 +299,4 @@ Devuelve la respuesta **en JSON limpio**, usando exactamente este esquema:
 
 {schema}
 """
-
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}]
-        )
-
-        return response.choices[0].message.content
+        return prompt
@@ -0,0 +1,62 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# =============================
+#   CARGA DE DATASETS
+# =============================
+# Formato preferido: Arrow IPC sin comprimir (models/columnarStore.py).
+# Se abre con memory-map: las columnas numéricas y los códigos de las
+# categóricas apuntan directo al archivo, así N workers comparten una sola
+# copia en page cache y el arranque no parsea nada.
+#
+# Los conteos por equipo (/teams) se calculan una vez al cargar (TeamCounts);
+# los mapas por equipo salen de la pirámide de zonas, no de las filas.
+
+
+def read_columnar(path: str) -> pd.DataFrame:
+    """Abre un dataset Arrow con memory-map (columnas de sólo lectura, sin copia)."""
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def check_zone_codes(df: pd.DataFrame, path: str) -> pd.DataFrame:
+    """
+    zone_id tiene que venir como código entero zx * ny + zy (lo escribe
+    models/featurePipeline.py). Un dataset con zone_id "zx_zy" se rechaza:
+    convertirlo aquí copiaría el frame mapeado en cada carga.
+    """
+    if "zone_id" in df.columns and not pd.api.types.is_integer_dtype(df["zone_id"]):
+        raise ValueError(
+            f"{path}: zone_id en formato 'zx_zy' (dataset anterior al código entero). "
+            "Regenerarlo con models/featurePipeline.py o migrarlo una vez con "
+            "models/migrateDatasets.py"
+        )
+    return df
+
+
+class TeamCounts:
+    """Equipos del dataset (sin los NaN) y su cantidad de eventos."""
+
+    def __init__(self, team_ids: np.ndarray):
+        team_ids = np.asarray(team_ids)
+        if team_ids.dtype.kind == "f":
+            team_ids = team_ids[~np.isnan(team_ids)].astype(np.int64)
+        self.teams, self.counts = np.unique(team_ids, return_counts=True)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "TeamCounts":
+        return cls(df["team_id"].to_numpy())
+
+
+def load_dataset(source_dir: str, config: dict) -> pd.DataFrame | None:
+    """
+    Carga el dataset Arrow de una variante (None si no existe). Tiene que
+    venir con zone_id entero; los datasets y CSV de versiones anteriores se
+    convierten una vez con models/migrateDatasets.py.
+    """
+    columnar_path = os.path.join(source_dir, config["columnar"])
+    if not os.path.exists(columnar_path):
+        return None
+    return check_zone_codes(read_columnar(columnar_path), columnar_path)
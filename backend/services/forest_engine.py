@@ -0,0 +1,129 @@
+import numpy as np
+import joblib
+
+from services.registry_layout import COMPILED_FORMAT
+
+# =============================
+#   MOTOR DE INFERENCIA COMPILADO
+# =============================
+# Evalúa un RandomForest "aplanado" por models/exportModel.py:
+#   - preprocesador (SimpleImputer + OneHotEncoder) como bloques de columnas
+#   - todos los árboles concatenados en arrays contiguos de nodos
+# Sin pandas ni sklearn en el camino caliente: sólo NumPy.
+
+# Tamaño máximo (filas x árboles) que se recorre de una vez
+_MAX_CELLS_PER_CHUNK = 2_000_000
+
+
+def _is_missing(v) -> bool:
+    return v is None or (isinstance(v, float) and v != v)
+
+
+class CompiledForest:
+    """RandomForest + preprocesador evaluados con recorrido vectorizado."""
+
+    def __init__(self, artifact: dict):
+        if artifact.get("format") != COMPILED_FORMAT:
+            raise ValueError(
+                f"Formato de modelo compilado no soportado: {artifact.get('format')}"
+            )
+        self.blocks = artifact["blocks"]
+        self.n_features = int(artifact["n_features"])
+        self.n_trees = int(artifact["n_trees"])
+        self.roots = artifact["roots"]
+        self.feature = artifact["feature"]
+        self.threshold = artifact["threshold"]
+        self.left = artifact["left"]
+        self.right = artifact["right"]
+        self.value = artifact["value"]
+        self.is_leaf = self.left == np.arange(len(self.left))
+
+        # índices {categoría: posición} para el one-hot
+        for block in self.blocks:
+            if block["kind"] == "cat":
+                block["index"] = [
+                    {c: i for i, c in enumerate(cats)} for cats in block["categories"]
+                ]
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: str | None = None) -> "CompiledForest":
+        # con mmap_mode="r" los arrays de nodos se mapean del archivo (sólo lectura)
+        return cls(joblib.load(path, mmap_mode=mmap_mode))
+
+    @property
+    def columns(self) -> list[str]:
+        return [c for block in self.blocks for c in block["columns"]]
+
+    # ---------- preprocesado ----------
+    def _column_getter(self, events):
+        """Normaliza dict / lista de dicts / dict columnar / DataFrame."""
+        if isinstance(events, dict):
+            first = next(iter(events.values()), None)
+            if isinstance(first, (list, tuple, np.ndarray)):
+                n = len(first)
+                return n, lambda c: events[c] if c in events else [-1] * n
+            events = [events]
+        if hasattr(events, "columns") and hasattr(events, "to_numpy"):
+            n = len(events)
+            return n, lambda c: events[c].to_numpy() if c in events.columns else [-1] * n
+        rows = list(events)
+        return len(rows), lambda c: [r.get(c, -1) for r in rows]
+
+    def transform(self, events) -> np.ndarray:
+        """Devuelve la matriz de features (float32) que vería el bosque."""
+        n, get = self._column_getter(events)
+        X = np.zeros((n, self.n_features), dtype=np.float64)
+        rows = np.arange(n)
+        offset = 0
+        for block in self.blocks:
+            if block["kind"] == "num":
+                for j, c in enumerate(block["columns"]):
+                    col = np.array(get(c), dtype=np.float64)
+                    col[np.isnan(col)] = block["fill"][j]
+                    X[:, offset] = col
+                    offset += 1
+            else:
+                for j, c in enumerate(block["columns"]):
+                    index = block["index"][j]
+                    fill = block["fill"][j]
+                    pos = np.fromiter(
+                        (index.get(fill if _is_missing(v) else v, -1) for v in get(c)),
+                        dtype=np.int64,
+                        count=n,
+                    )
+                    known = pos >= 0
+                    X[rows[known], offset + pos[known]] = 1.0
+                    offset += len(block["categories"][j])
+        # sklearn evalúa los árboles en float32
+        return X.astype(np.float32)
+
+    # ---------- recorrido de árboles ----------
+    def predict_proba_matrix(self, X: np.ndarray) -> np.ndarray:
+        """P(clase 1) para una matriz ya transformada (n, n_features)."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n = X.shape[0]
+        out = np.empty(n, dtype=np.float64)
+        chunk = max(1, _MAX_CELLS_PER_CHUNK // self.n_trees)
+        for start in range(0, n, chunk):
+            Xc = X[start:start + chunk]
+            m = Xc.shape[0]
+            n_features = Xc.shape[1]
+            Xflat = Xc.ravel()
+            # una celda por (fila, árbol); sólo se avanzan las que no están en hoja
+            node = np.tile(self.roots, m)
+            base = np.repeat(np.arange(m) * n_features, self.n_trees)
+            active = np.flatnonzero(~self.is_leaf[node])
+            while active.size:
+                nd = node[active]
+                go_left = Xflat[base[active] + self.feature[nd]] <= self.threshold[nd]
+                nxt = np.where(go_left, self.left[nd], self.right[nd])
+                node[active] = nxt
+                active = active[~self.is_leaf[nxt]]
+            out[start:start + chunk] = (
+                self.value[node].reshape(m, self.n_trees).sum(axis=1) / self.n_trees
+            )
+        return out
+
+    def predict_proba(self, events) -> np.ndarray:
+        """P(clase 1) directamente desde dict(s), dict columnar o DataFrame."""
+        return self.predict_proba_matrix(self.transform(events))
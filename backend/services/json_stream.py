@@ -0,0 +1,125 @@
+import json
+from typing import Any, Iterator
+
+# =============================
+#   PARSER INCREMENTAL DE SECCIONES JSON
+# =============================
+# El LLM devuelve un JSON del tipo {"raíz": {"sección": {...}, ...}, ...}.
+# Mientras llegan los tokens, se emite cada sección (valor a profundidad 2,
+# o valor no-objeto a profundidad 1) en cuanto su texto cierra y parsea.
+
+SECTION_DEPTH = 2
+
+
+def iter_sections(obj: dict) -> Iterator[tuple[list[str], Any]]:
+    """Mismas secciones que emite JSONSectionParser, a partir de un JSON completo."""
+    for key, value in obj.items():
+        if isinstance(value, dict):
+            for sub_key, sub_value in value.items():
+                yield [key, sub_key], sub_value
+        else:
+            yield [key], value
+
+
+class JSONSectionParser:
+    """Escanea texto JSON por partes y devuelve las secciones completas."""
+
+    def __init__(self):
+        self.buf = ""
+        self._pos = 0
+        self._started = False
+        self._stack: list[dict] = []  # frames {"kind": "{"|"[", "key", "expect_key"}
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._string_is_key = False
+        self._tracked: dict | None = None  # sección en curso
+
+    def _start_value(self, i: int, kind: str):
+        """Marca el inicio de un valor si es una sección a emitir."""
+        if self._tracked is not None or not self._stack:
+            return
+        top = self._stack[-1]
+        depth = len(self._stack)
+        if top["kind"] != "{" or depth > SECTION_DEPTH:
+            return
+        if depth < SECTION_DEPTH and kind == "{":
+            return  # objeto raíz: se emiten sus hijos
+        self._tracked = {
+            "start": i,
+            "depth": depth,
+            "kind": kind,
+            "path": [f["key"] for f in self._stack],
+        }
+
+    def _finish(self, end: int, out: list):
+        tracked, self._tracked = self._tracked, None
+        text = self.buf[tracked["start"]:end].strip()
+        try:
+            out.append((tracked["path"], json.loads(text)))
+        except json.JSONDecodeError:
+            pass
+
+    def _finish_primitive(self, i: int, out: list):
+        t = self._tracked
+        if t is not None and t["kind"] == "prim" and t["depth"] == len(self._stack):
+            self._finish(i, out)
+
+    def feed(self, chunk: str) -> list[tuple[list[str], Any]]:
+        self.buf += chunk
+        out: list[tuple[list[str], Any]] = []
+        while self._pos < len(self.buf):
+            i = self._pos
+            c = self.buf[i]
+            self._pos += 1
+
+            if not self._started:
+                # ignora texto previo (p. ej. ```json) hasta el objeto raíz
+                if c == "{":
+                    self._started = True
+                    self._stack.append({"kind": "{", "key": None, "expect_key": True})
+                continue
+            if not self._stack:
+                continue  # raíz cerrada: ignora el resto (```)
+
+            top = self._stack[-1]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._string_is_key:
+                        top["key"] = json.loads(self.buf[self._string_start:i + 1])
+                        top["expect_key"] = False
+                    else:
+                        t = self._tracked
+                        if t is not None and t["kind"] == '"' and t["depth"] == len(self._stack):
+                            self._finish(i + 1, out)
+                continue
+
+            if c.isspace() or c == ":":
+                continue
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+                self._string_is_key = top["kind"] == "{" and top["expect_key"]
+                if not self._string_is_key:
+                    self._start_value(i, '"')
+            elif c in "{[":
+                self._start_value(i, c)
+                self._stack.append({"kind": c, "key": None, "expect_key": c == "{"})
+            elif c in "}]":
+                self._finish_primitive(i, out)
+                self._stack.pop()
+                t = self._tracked
+                if t is not None and t["kind"] in "{[" and t["depth"] == len(self._stack):
+                    self._finish(i + 1, out)
+            elif c == ",":
+                self._finish_primitive(i, out)
+                if top["kind"] == "{":
+                    top["expect_key"] = True
+            else:
+                self._start_value(i, "prim")
+        return out
@@ -0,0 +1,195 @@
+import json
+import logging
+import os
+import threading
+import time
+
+import joblib
+
+from services.forest_engine import CompiledForest
+from services.registry_layout import (
+    COMPILED_FILE,
+    METADATA_FILE,
+    MODEL_FILE,
+    compiled_path_for,
+    current_version,
+    model_dir,
+    sha256_file,
+)
+
+# =============================
+#   REGISTRO DE MODELOS (VERSIONES + HOT RELOAD)
+# =============================
+# Lee el registro que escribe models/modelRegistry.py (layout en
+# services/registry_layout.py). Si una clave no tiene versiones publicadas se
+# usan los joblib legados (models/joblib/*.joblib) como versión "legacy-<mtime>".
+# Las claves en `pinned` (ruta fijada explícitamente por variable de entorno)
+# ignoran el registro y sirven siempre ese joblib.
+#
+# Cada versión cargada es un ModelBundle inmutable (pipeline + motor compilado
+# + metadatos). Recargar = cargar la versión nueva completa y reemplazar la
+# referencia en un dict: las peticiones en curso terminan con el bundle que ya
+# tenían y las nuevas usan el nuevo. Los joblib se abren con mmap_mode="r":
+# los arrays grandes se mapean del archivo y los workers comparten page cache.
+
+logger = logging.getLogger(__name__)
+
+
+def _zone_categories(pipeline, engine) -> list | None:
+    """Categorías de zone_id que vio el modelo (del compilado o del pipeline)."""
+    if engine is not None:
+        for block in engine.blocks:
+            if block["kind"] == "cat" and "zone_id" in block["columns"]:
+                return list(block["categories"][block["columns"].index("zone_id")])
+    if pipeline is not None and hasattr(pipeline, "named_steps"):
+        for _, trans, cols in pipeline.named_steps["prep"].transformers_:
+            if "zone_id" in list(cols) and hasattr(trans, "steps"):
+                encoder = trans.steps[-1][1]
+                if hasattr(encoder, "categories_"):
+                    return list(encoder.categories_[list(cols).index("zone_id")])
+    return None
+
+
+class ModelBundle:
+    """Una versión cargada de un modelo: pipeline sklearn y/o motor compilado."""
+
+    def __init__(self, key, version, pipeline, engine, metadata, model_path, compiled_path):
+        self.key = key
+        self.version = version
+        self.pipeline = pipeline
+        self.engine: CompiledForest | None = engine
+        self.metadata: dict = metadata
+        self.model_path = model_path
+        self.compiled_path = compiled_path
+        self.loaded_at = time.time()
+        # modelos entrenados antes del código entero esperan zone_id "zx_zy"
+        categories = _zone_categories(pipeline, engine) or []
+        self.zone_id_labels = any(isinstance(c, str) for c in categories)
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "compiled": self.engine is not None,
+            "pipeline": self.pipeline is not None,
+            "zone_id": "label" if self.zone_id_labels else "code",
+            "metadata": self.metadata,
+        }
+
+
+class ModelStore:
+    """
+    Modelos activos por clave con recarga atómica. `get` revisa como mucho
+    cada `check_interval_s` segundos si cambió la versión en disco (CURRENT o
+    mtime de los joblib legados); `reload` fuerza la revisión.
+    Precedencia por clave: ruta fijada (`pinned`) > CURRENT del registro >
+    joblib legado.
+    """
+
+    def __init__(
+        self,
+        registry_dir: str,
+        legacy_paths: dict[str, str],
+        check_interval_s: float = 5.0,
+        mmap_mode: str | None = "r",
+        pinned: set[str] | frozenset[str] = frozenset(),
+    ):
+        self.registry_dir = registry_dir
+        self.legacy_paths = legacy_paths
+        self.pinned = frozenset(pinned)
+        for key in sorted(self.pinned):
+            logger.info("Modelo '%s' fijado en %s; se ignora el registro", key, legacy_paths[key])
+        self.check_interval_s = check_interval_s
+        self.mmap_mode = mmap_mode
+        self._active: dict[str, ModelBundle] = {}
+        self._checked_at: dict[str, float] = {}
+        self._locks = {key: threading.Lock() for key in legacy_paths}
+
+    def keys(self) -> list[str]:
+        return list(self.legacy_paths)
+
+    # ---------- versión en disco ----------
+    def _current(self, key: str) -> str | None:
+        if key in self.pinned:
+            return None
+        return current_version(self.registry_dir, key)
+
+    def _resolve(self, key: str) -> tuple[str, str, str, dict | None]:
+        """(versión, ruta joblib, ruta compilado, metadatos o None si es legado)."""
+        version = self._current(key)
+        if version is not None:
+            vdir = os.path.join(model_dir(self.registry_dir, key), version)
+            with open(os.path.join(vdir, METADATA_FILE)) as f:
+                metadata = json.load(f)
+            return (version, os.path.join(vdir, MODEL_FILE),
+                    os.path.join(vdir, COMPILED_FILE), metadata)
+
+        model_path = self.legacy_paths[key]
+        compiled_path = compiled_path_for(model_path)
+        mtimes = [os.stat(p).st_mtime_ns for p in (model_path, compiled_path) if os.path.exists(p)]
+        if not mtimes:
+            raise FileNotFoundError(f"No se encontró el archivo del modelo en {model_path}")
+        return f"legacy-{max(mtimes)}", model_path, compiled_path, None
+
+    def _disk_version(self, key: str) -> str:
+        return self._current(key) or self._resolve(key)[0]
+
+    # ---------- carga ----------
+    def _load(self, key: str, version: str, model_path: str, compiled_path: str,
+              metadata: dict | None) -> ModelBundle:
+        if metadata is not None:
+            for name, expected in metadata.get("files", {}).items():
+                path = os.path.join(os.path.dirname(model_path), name)
+                if sha256_file(path) != expected:
+                    raise ValueError(f"Checksum inválido en {path} (versión {version})")
+        pipeline = (joblib.load(model_path, mmap_mode=self.mmap_mode)
+                    if os.path.exists(model_path) else None)
+        engine = (CompiledForest.load(compiled_path, mmap_mode=self.mmap_mode)
+                  if os.path.exists(compiled_path) else None)
+        return ModelBundle(key, version, pipeline, engine, metadata or {"version": version},
+                           model_path if pipeline is not None else None,
+                           compiled_path if engine is not None else None)
+
+    def reload(self, key: str) -> ModelBundle:
+        """
+        Carga la versión en disco si difiere de la activa y la publica con un
+        solo reemplazo de referencia. Si la carga falla se sigue sirviendo la
+        versión anterior (si la hay).
+        """
+        with self._locks[key]:
+            self._checked_at[key] = time.monotonic()
+            active = self._active.get(key)
+            try:
+                resolved = self._resolve(key)
+                if active is not None and active.version == resolved[0]:
+                    return active
+                bundle = self._load(key, *resolved)
+            except Exception:
+                if active is None:
+                    raise
+                logger.exception("No se pudo recargar el modelo '%s'; se mantiene %s",
+                                 key, active.version)
+                return active
+            self._active[key] = bundle
+            if active is not None:
+                logger.info("Modelo '%s': %s -> %s", key, active.version, bundle.version)
+            return bundle
+
+    def get(self, key: str) -> ModelBundle:
+        bundle = self._active.get(key)
+        if bundle is None:
+            return self.reload(key)
+        if self.check_interval_s > 0 and (
+            time.monotonic() - self._checked_at.get(key, 0.0) >= self.check_interval_s
+        ):
+            self._checked_at[key] = time.monotonic()
+            try:
+                changed = self._disk_version(key) != bundle.version
+            except (OSError, ValueError):
+                changed = False
+            if changed:
+                return self.reload(key)
+        return bundle
+
+    def info(self) -> dict:
+        return {key: bundle.info() for key, bundle in self._active.items()}
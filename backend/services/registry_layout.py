@@ -0,0 +1,47 @@
+import hashlib
+import os
+
+# =============================
+#   LAYOUT DEL REGISTRO DE MODELOS
+# =============================
+# Única definición del formato en disco, compartida por quien escribe
+# (models/modelRegistry.py, models/exportModel.py) y quien lee
+# (services/model_store.py, services/forest_engine.py):
+#   <registry>/<model_key>/<version>/{model.joblib, model.compiled.joblib, metadata.json}
+#   <registry>/<model_key>/CURRENT
+
+REGISTRY_FORMAT = "model_registry/1"
+# formato del forest compilado que escribe models/exportModel.py y valida
+# services/forest_engine.py al cargar
+COMPILED_FORMAT = "compiled_forest/1"
+MODEL_FILE = "model.joblib"
+COMPILED_FILE = "model.compiled.joblib"
+METADATA_FILE = "metadata.json"
+CURRENT_FILE = "CURRENT"
+
+
+def sha256_file(path: str, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(chunk):
+            h.update(block)
+    return h.hexdigest()
+
+
+def compiled_path_for(model_path: str) -> str:
+    """risk_model_rf.joblib -> risk_model_rf.compiled.joblib"""
+    root, ext = os.path.splitext(model_path)
+    return f"{root}.compiled{ext}"
+
+
+def model_dir(registry_dir: str, model_key: str) -> str:
+    return os.path.join(registry_dir, model_key)
+
+
+def current_version(registry_dir: str, model_key: str) -> str | None:
+    """Versión activa según CURRENT (None si la clave no tiene versiones publicadas)."""
+    try:
+        with open(os.path.join(model_dir(registry_dir, model_key), CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
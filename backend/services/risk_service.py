@@ -1,8 +1,18 @@
 import pandas as pd
 import numpy as np
-import joblib
 import os
-from typing import Any
+
+from services.cache_service import TTLCache, content_key
+from services.model_store import ModelBundle, ModelStore
+from services.zone_service import (
+    PITCH,
+    TRAIN_GRID,
+    ZonePyramid,
+    filter_dimensions,
+    zone_codes,
+    zone_index,
+    zone_labels,
+)
 
 # =============================
 #   CONFIGURACIÓN Y MODELO
@@ -12,14 +22,43 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, "..", ".."))
 JOBLIB_DIR = os.path.join(PROJECT_ROOT, "models", "joblib")
 
+# Registro versionado (models/modelRegistry.py); si una clave no tiene
+# versiones publicadas se usan los joblib de MODEL_REGISTRY.
+MODEL_STORE_DIR = os.getenv(
+    "MODEL_STORE_DIR", os.path.join(PROJECT_ROOT, "models", "registry")
+)
+# Cada cuántos segundos se revisa si hay una versión nueva (0 = sólo /models/reload)
+MODEL_RELOAD_CHECK_S = float(os.getenv("MODEL_RELOAD_CHECK_S", "5"))
+
+# Cualquier backend de models/trainPipeline.py (rf, rf_compact, hgb); ver
+# models/benchmarkModels.py para comparar latencia/precisión. Las variables
+# de entorno permiten servir otro artefacto sin tocar el código: una ruta
+# explícita gana sobre la versión activa del registro.
+MODEL_PATH_ENV = {"turnover": "TURNOVER_MODEL_PATH", "recovery": "RECOVERY_MODEL_PATH"}
 MODEL_REGISTRY = {
     # Modelo original entrenado con pérdidas (trainModel1.py / transformData1.py)
-    "turnover": os.path.join(JOBLIB_DIR, "risk_model_rf.joblib"),
+    "turnover": os.getenv(
+        "TURNOVER_MODEL_PATH", os.path.join(JOBLIB_DIR, "risk_model_rf.joblib")
+    ),
     # Modelo nuevo entrenado con recuperaciones (trainModel2.py / transformData2.py)
-    "recovery": os.path.join(JOBLIB_DIR, "recovery_risk_model_rf.joblib"),
+    "recovery": os.getenv(
+        "RECOVERY_MODEL_PATH", os.path.join(JOBLIB_DIR, "recovery_risk_model_rf.joblib")
+    ),
 }
 
-_MODEL_CACHE: dict[str, Any] = {}
+_STORE = ModelStore(
+    MODEL_STORE_DIR,
+    MODEL_REGISTRY,
+    check_interval_s=MODEL_RELOAD_CHECK_S,
+    pinned={key for key, env in MODEL_PATH_ENV.items() if os.getenv(env)},
+)
+
+# El motor compilado gana en eventos sueltos y lotes chicos (sin overhead de
+# pandas/sklearn); su costo crece con cada fila y el recorrido en C de sklearn
+# lo alcanza entre 32 y 64 filas (models/benchmarkCompiled.py: x1.7 a 32
+# filas, x0.9 a 64 y x0.3 a 1000). Con otro hardware o modelo, usar el
+# "compilado más rápido hasta lotes de N filas" que informa el benchmark.
+COMPILED_MAX_ROWS = int(os.getenv("COMPILED_MAX_ROWS", "32"))
 
 
 def _resolve_model_key(model_key: str) -> str:
@@ -29,16 +68,29 @@ def _resolve_model_key(model_key: str) -> str:
     return key
 
 
-def _load_model(model_key: str):
-    key = _resolve_model_key(model_key)
-    if key not in _MODEL_CACHE:
-        model_path = MODEL_REGISTRY[key]
-        if not os.path.exists(model_path):
-            raise FileNotFoundError(
-                f"No se encontró el archivo del modelo en {model_path}"
-            )
-        _MODEL_CACHE[key] = joblib.load(model_path)
-    return _MODEL_CACHE[key]
+def get_model(model_key: str) -> ModelBundle:
+    """Versión activa de model_key (la carga o recarga si cambió en disco)."""
+    return _STORE.get(_resolve_model_key(model_key))
+
+
+def warm_model(model_key: str) -> ModelBundle:
+    """Deja en memoria la versión activa de model_key (compilado y/o pipeline joblib)."""
+    return get_model(model_key)
+
+
+def model_version(model_key: str) -> str:
+    return get_model(model_key).version
+
+
+def reload_models(model_key: str | None = None) -> dict[str, str]:
+    """Fuerza la revisión de versiones en disco. Devuelve {clave: versión activa}."""
+    keys = [_resolve_model_key(model_key)] if model_key else list(MODEL_REGISTRY)
+    return {key: _STORE.reload(key).version for key in keys}
+
+
+def models_info() -> dict:
+    return _STORE.info()
+
 
 NUM = ["ax", "ay", "zx", "zy", "a_minute", "period", "pass_length", "pass_angle"]
 CAT = [
@@ -67,57 +119,175 @@ BIN = [
 FEATURES = NUM + CAT + BIN
 
 
+def _n_rows(events) -> int:
+    if isinstance(events, dict):
+        first = next(iter(events.values()), None)
+        return len(first) if isinstance(first, (list, tuple, np.ndarray)) else 1
+    return len(events)
+
+
+def _predict_proba(events, model_key: str) -> np.ndarray:
+    """P(clase 1) con el motor compilado si existe; si no, con el pipeline joblib."""
+    # una sola versión por llamada, aunque otra hebra recargue el modelo
+    return _predict_with(get_model(model_key), events)
+
+
+def _with_zone_ids(events, labels: bool):
+    """
+    zone_id al formato del modelo: código entero (modelos nuevos) o texto
+    "zx_zy" (modelos entrenados antes del código). Acepta ambos de entrada.
+    """
+    def convert(values):
+        codes = zone_codes(values)
+        return zone_labels(codes) if labels else codes
+
+    if isinstance(events, pd.DataFrame):
+        if "zone_id" not in events.columns:
+            return events
+        return events.assign(zone_id=convert(events["zone_id"]))
+    if isinstance(events, dict):
+        if "zone_id" not in events:
+            return events
+        value = events["zone_id"]
+        if isinstance(value, (list, tuple, np.ndarray)):
+            return {**events, "zone_id": convert(value)}
+        converted = convert([value])[0]
+        return {**events, "zone_id": converted if labels else int(converted)}
+    return [_with_zone_ids(e, labels) for e in events]
+
+
+def _predict_with(model: ModelBundle, events) -> np.ndarray:
+    events = _with_zone_ids(events, model.zone_id_labels)
+    engine = model.engine
+    if engine is not None and (
+        _n_rows(events) <= COMPILED_MAX_ROWS or model.pipeline is None
+    ):
+        return engine.predict_proba(events)
+    clf = model.pipeline
+    df = events if isinstance(events, pd.DataFrame) else pd.DataFrame(events)
+    if df.empty:
+        return np.empty(0)
+    df = df.reindex(columns=FEATURES, fill_value=-1)
+    return clf.predict_proba(df)[:, 1]
+
+
 # =============================
-#   FUNCIÓN 1: PREDICCIÓN INDIVIDUAL
+#   FUNCIÓN 1: PREDICCIÓN INDIVIDUAL Y POR LOTES
 # =============================
 def predict_risk(event: dict, model_key: str = "turnover") -> float:
     """Predice riesgo (0-1) para un solo evento."""
-    clf = _load_model(model_key)
-    df = pd.DataFrame([event])
-    df = df.reindex(columns=FEATURES, fill_value=-1)
-    proba = clf.predict_proba(df[FEATURES])[:, 1][0]
+    proba = _predict_proba([event], model_key)[0]
     return round(float(proba), 4)
 
 
+def predict_risk_batch(events, model_key: str = "turnover") -> list[float]:
+    """
+    Predice riesgo (0-1) para muchos eventos con una sola llamada a predict_proba.
+    `events` puede ser una lista de dicts, un dict columnar {col: [valores]}
+    o un DataFrame.
+    """
+    proba = _predict_proba(events, model_key)
+    return [round(float(p), 4) for p in proba]
+
+
 # =============================
-#   FUNCIÓN 2: MAPA DE RIESGO POR EQUIPO
+#   FUNCIÓN 2: PIRÁMIDE DE ZONAS PRECALCULADA (model_type, team_id, grilla)
 # =============================
-def team_zone_risk(
-        df: pd.DataFrame,
-    team_id: int,
-    filter_expr: str | None = None,
-    model_key: str = "turnover",
-) -> pd.DataFrame:
-    """Calcula riesgo medio (p_model) y frecuencia (freq) por zona para el equipo."""
-    clf = _load_model(model_key)
-    d = df.copy()
-    if filter_expr:
-        d = d.query(filter_expr)
-
-    d = d[d["team_id"] == team_id]
-    if d.empty:
-        return pd.DataFrame(columns=["zone_id", "zx", "zy", "p_model", "n", "freq"])
-
-    # Completar columnas faltantes
-    for c in FEATURES:
-        if c not in d.columns:
-            d[c] = -1
-
-    # Predicciones
-    p = clf.predict_proba(d[FEATURES])[:, 1]
-    out = (
-        pd.DataFrame({"zone_id": d["zone_id"].values, "p": p})
-        .groupby("zone_id", as_index=False)
-        .agg(p_model=("p", "mean"), n=("p", "size"))
-        .sort_values("p_model", ascending=False)
+# Única fuente de los mapas por equipo: cada endpoint consulta la pirámide
+# (grilla, filtros, rival) en vez de puntuar las filas del equipo.
+def _prepare_features(d: pd.DataFrame) -> pd.DataFrame:
+    """Completa columnas faltantes con -1 y devuelve la matriz de FEATURES."""
+    missing = [c for c in FEATURES if c not in d.columns]
+    if missing:
+        d = d.assign(**{c: -1 for c in missing})
+    return d[FEATURES]
+
+
+def build_zone_pyramid(df: pd.DataFrame, model_key: str = "turnover") -> ZonePyramid:
+    """
+    Puntúa TODAS las filas del dataset en una sola pasada y las agrega por
+    (team_id, celda) para la pirámide de grillas, y por las dimensiones
+    filtrables para el cubo de filtros.
+    """
+    p = _predict_proba(_prepare_features(df), model_key) if len(df) else np.empty(0)
+    return ZonePyramid(
+        df["team_id"].values, df["ax"].values, df["ay"].values,
+        df["zx"].values, df["zy"].values, p,
+        dims=filter_dimensions(df),
     )
-    out["freq"] = out["n"] / len(d)
-    coords = out["zone_id"].str.split("_", expand=True)
-    out["zx"] = pd.to_numeric(coords[0], errors="coerce")
-    out["zy"] = pd.to_numeric(coords[1], errors="coerce")
 
-    out = out.dropna(subset=["zx", "zy"])
-    out["zx"] = out["zx"].astype(int)
-    out["zy"] = out["zy"].astype(int)
 
-    return out[["zone_id", "zx", "zy", "p_model", "n", "freq"]]
+# =============================
+#   FUNCIÓN 3: SUPERFICIE DE RIESGO CONTINUA
+# =============================
+SURFACE_CACHE_SIZE = int(os.getenv("SURFACE_CACHE_SIZE", "128"))
+SURFACE_CACHE_TTL_S = float(os.getenv("SURFACE_CACHE_TTL_S", "3600"))
+_SURFACE_CACHE = TTLCache(maxsize=SURFACE_CACHE_SIZE, ttl=SURFACE_CACHE_TTL_S)
+
+
+def surface_lattice(nx: int, ny: int) -> tuple[np.ndarray, np.ndarray]:
+    """Centros de celda (x, y) de una grilla nx x ny sobre el campo."""
+    xs = (np.arange(nx) + 0.5) * PITCH[0] / nx
+    ys = (np.arange(ny) + 0.5) * PITCH[1] / ny
+    return xs, ys
+
+
+def _surface_events(team_id: int, context: dict, nx: int, ny: int) -> pd.DataFrame:
+    xs, ys = surface_lattice(nx, ny)
+    ax = np.tile(xs, ny)      # fila a fila: y fija, x variando
+    ay = np.repeat(ys, nx)
+    # zx/zy/zone_id en la grilla con la que se entrenó (transformData*.py)
+    zx = zone_index(ax, PITCH[0], TRAIN_GRID[0])
+    zy = zone_index(ay, PITCH[1], TRAIN_GRID[1])
+    n = nx * ny
+    events = pd.DataFrame({
+        "ax": ax,
+        "ay": ay,
+        "zx": zx,
+        "zy": zy,
+        "zone_id": zx * TRAIN_GRID[1] + zy,
+        "team_id": np.full(n, team_id),
+    })
+    for col, value in context.items():
+        if col in FEATURES and col not in events.columns:
+            events[col] = np.nan if value is None else value
+    return events
+
+
+def risk_surface(
+    team_id: int,
+    context: dict | None = None,
+    nx: int = 60,
+    ny: int = 40,
+    model_key: str = "turnover",
+) -> dict:
+    """
+    Evalúa el modelo sobre una grilla densa nx x ny de posiciones (ax, ay)
+    para un equipo y un contexto fijo (a_type, play_pattern, under_pressure...),
+    en un solo lote. `risk[j][i]` es el riesgo en (x[i], y[j]). Cacheado por
+    (versión del modelo, equipo, contexto, resolución).
+    """
+    key = _resolve_model_key(model_key)
+    model = get_model(key)
+    context = {k: v for k, v in (context or {}).items() if k in FEATURES}
+    cache_key = content_key(key, model.version, team_id, nx, ny, context)
+    cached = _SURFACE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    p = _predict_with(model, _surface_events(team_id, context, nx, ny))
+    xs, ys = surface_lattice(nx, ny)
+    result = {
+        "nx": nx,
+        "ny": ny,
+        "pitch": list(PITCH),
+        "x": np.round(xs, 4).tolist(),
+        "y": np.round(ys, 4).tolist(),
+        "risk": np.round(p.reshape(ny, nx), 4).tolist(),
+        "min": round(float(p.min()), 4),
+        "max": round(float(p.max()), 4),
+        "model_version": model.version,
+        "context": context,
+    }
+    _SURFACE_CACHE.set(cache_key, result)
+    return result
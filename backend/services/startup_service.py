@@ -0,0 +1,80 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+
+class StartupService:
+    """
+    Carga assets (datasets, modelos, cubos) en segundo plano y en paralelo,
+    registrando estado y tiempo de carga de cada uno para /healthz y /readyz.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="startup"
+        )
+        self._futures: dict[str, Future] = {}
+        self._status: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def _set(self, name: str, **info):
+        with self._lock:
+            self._status[name] = {**self._status.get(name, {}), **info}
+
+    def submit(self, name: str, fn: Callable, depends_on: tuple[str, ...] = ()) -> Future:
+        """
+        Encola la carga de un asset. Las dependencias deben haberse encolado
+        antes (la cola es FIFO, así que nunca quedan esperando sin worker).
+        Si fn devuelve None el asset queda como "missing" (p. ej. archivo ausente).
+        """
+
+        def run():
+            for dep in depends_on:
+                self.wait(dep)
+            self._set(name, status="loading")
+            t0 = time.perf_counter()
+            try:
+                result = fn()
+            except Exception as e:
+                self._set(name, status="error", error=str(e),
+                          seconds=round(time.perf_counter() - t0, 4))
+                raise
+            self._set(name, status="ready" if result is not None else "missing",
+                      seconds=round(time.perf_counter() - t0, 4))
+            return result
+
+        with self._lock:
+            self._status[name] = {"status": "pending"}
+            future = self._executor.submit(run)
+            self._futures[name] = future
+        return future
+
+    def wait(self, name: str, timeout: float | None = None):
+        """Bloquea hasta que el asset termine de cargar (si fue encolado)."""
+        future = self._futures.get(name)
+        if future is not None:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass
+
+    def status(self, name: str) -> str | None:
+        with self._lock:
+            return self._status.get(name, {}).get("status")
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return bool(self._status) and all(
+                s["status"] in ("ready", "missing") for s in self._status.values()
+            )
+
+    def report(self) -> dict:
+        with self._lock:
+            assets = {name: dict(info) for name, info in self._status.items()}
+        return {
+            "ready": self.is_ready(),
+            "uptime_s": round(time.time() - self.started_at, 3),
+            "assets": assets,
+        }
@@ -0,0 +1,427 @@
+import numpy as np
+import pandas as pd
+
+from services.cache_service import TTLCache
+
+# =============================
+#   PIRÁMIDE DE ZONAS (MULTI-RESOLUCIÓN)
+# =============================
+# Las filas del dataset se puntúan UNA vez; aquí sólo se agregan. Por equipo
+# se guardan (Σp, n) en una grilla base fina (24x16) anidada en la grilla de
+# entrenamiento (12x8, la de zx/zy). Los niveles cuyo tamaño divide a la base
+# (12x8, 6x4, 3x2) son sumas de bloques de la base: hacer zoom no vuelve a
+# puntuar ni a recorrer filas. Otras grillas (p. ej. 10x10) se agregan desde
+# las probabilidades por fila ya calculadas; sólo las más usadas quedan en un
+# LRU acotado (GRID_CACHE_SIZE), los niveles de la pirámide son permanentes.
+#
+# Filtros (periodo, tramo de minutos, play_pattern, presión, contrapresión,
+# rival): junto a la pirámide se guarda un cubo disperso con Σp y n por
+# (equipo, celda base, valor de cada dimensión filtrable), armado en la misma
+# pasada. Un mapa filtrado suma las celdas del cubo que cumplen el filtro;
+# no se vuelve a puntuar ni a recorrer filas.
+#
+# Celdas con código entero zx * ny + zy; el zone_id "zx_zy" sólo se arma al
+# responder. Los datasets y los modelos nuevos usan el mismo código entero en
+# la grilla de entrenamiento (zone_id = zx * ny + zy con ny = TRAIN_GRID[1], -1 sin zona).
+
+PITCH = (120.0, 80.0)
+TRAIN_GRID = (12, 8)
+BASE_GRID = (24, 16)
+# grillas fuera de la pirámide en caché por ZonePyramid (hasta 120x80 cada una)
+GRID_CACHE_SIZE = 8
+GRID_CACHE_TTL_S = 3600
+
+ZONE_COLUMNS = ["zone_id", "zx", "zy", "p_model", "n", "freq"]
+
+# dimensiones filtrables -> columna del dataset (minute_bucket sale de a_minute)
+FILTER_COLUMNS = {
+    "period": "period",
+    "minute_bucket": "a_minute",
+    "play_pattern": "play_pattern",
+    "under_pressure": "under_pressure",
+    "counterpress": "counterpress",
+    "opponent": "opponent_id",
+}
+MINUTE_BUCKET_EDGES = (0, 15, 30, 45, 60, 75, 90)
+
+
+def zone_index(values: np.ndarray, length: float, bins: int) -> np.ndarray:
+    """Igual que pd.cut(..., include_lowest=True) sobre bins iguales de [0, length]."""
+    edges = np.linspace(0, length, bins + 1)
+    return np.clip(np.searchsorted(edges, values, side="left") - 1, 0, bins - 1)
+
+
+def _zone_code(value, ny: int) -> int:
+    if value is None or (isinstance(value, float) and value != value):
+        return -1
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value)
+    zx, sep, zy = str(value).partition("_")
+    try:
+        return int(zx) * ny + int(zy) if sep else int(zx)
+    except ValueError:
+        return -1  # "<NA>_<NA>" u otro texto sin zona
+
+
+def zone_codes(values, ny: int = TRAIN_GRID[1]) -> np.ndarray:
+    """Códigos enteros zx*ny + zy desde códigos o textos "zx_zy" (-1 sin zona)."""
+    if isinstance(values, pd.Series) and isinstance(values.dtype, pd.CategoricalDtype):
+        categories = zone_codes(values.cat.categories, ny)
+        codes = values.cat.codes.to_numpy()
+        return np.where(codes >= 0, categories[codes], -1)
+    arr = np.asarray(values)
+    if arr.dtype.kind in "iu":
+        return arr.astype(np.int64)
+    if arr.dtype.kind == "f":
+        return np.where(np.isfinite(arr), arr, -1).astype(np.int64)
+    return np.fromiter((_zone_code(v, ny) for v in arr.ravel()), dtype=np.int64, count=arr.size)
+
+
+def zone_labels(codes, ny: int = TRAIN_GRID[1]) -> np.ndarray:
+    """Códigos -> textos "zx_zy" (sólo para responder o para modelos viejos)."""
+    codes = np.asarray(codes, dtype=np.int64)
+    zx, zy = np.divmod(codes, ny)
+    labels = np.char.add(np.char.add(zx.astype(str), "_"), zy.astype(str)).astype(object)
+    labels[codes < 0] = "<NA>_<NA>"  # así aparecían en los datasets con texto
+    return labels
+
+
+def minute_buckets(minutes) -> np.ndarray:
+    """Minuto -> tramo "0-15", "15-30", ..., "75-90", "90+"."""
+    edges = MINUTE_BUCKET_EDGES
+    labels = np.array([f"{a}-{b}" for a, b in zip(edges, edges[1:])] + [f"{edges[-1]}+"], dtype=object)
+    minutes = np.asarray(minutes, dtype=np.float64)
+    idx = np.clip(np.searchsorted(edges, minutes, side="right") - 1, 0, len(edges) - 1)
+    return labels[idx]
+
+
+def filter_dimensions(df: pd.DataFrame) -> dict[str, np.ndarray]:
+    """Valores por fila de cada dimensión filtrable presente en el dataset."""
+    dims = {}
+    for name, column in FILTER_COLUMNS.items():
+        if column not in df.columns:
+            continue
+        values = df[column].to_numpy()
+        dims[name] = minute_buckets(values) if name == "minute_bucket" else values
+    return dims
+
+
+def parse_grid(text: str) -> tuple[int, int]:
+    """'12x8' -> (12, 8)"""
+    nx, ny = (int(v) for v in text.lower().split("x"))
+    if nx < 1 or ny < 1:
+        raise ValueError(f"Grilla inválida: {text}")
+    return nx, ny
+
+
+def pyramid_levels(base=BASE_GRID) -> list[tuple[int, int]]:
+    """Grillas que son sumas de bloques de la base (factor común de ambos ejes)."""
+    return [(base[0] // k, base[1] // k) for k in range(1, min(base) + 1)
+            if base[0] % k == 0 and base[1] % k == 0]
+
+
+class ZonePyramid:
+    """Σp y n por (equipo, celda) para varias grillas a partir de un solo scoring."""
+
+    def __init__(self, team_ids, ax, ay, zx, zy, p, base=BASE_GRID, train_grid=TRAIN_GRID,
+                 dims: dict[str, np.ndarray] | None = None):
+        if base[0] % train_grid[0] or base[1] % train_grid[1]:
+            raise ValueError(f"La grilla base {base} debe refinar a {train_grid}")
+        self.base = base
+        self.teams = np.unique(np.asarray(team_ids))
+        team_idx = np.searchsorted(self.teams, team_ids)
+        # denominador de freq: todas las filas del equipo (también sin zona)
+        self.team_rows = np.bincount(team_idx, minlength=len(self.teams))
+
+        ax = np.asarray(ax, dtype=np.float64)
+        ay = np.asarray(ay, dtype=np.float64)
+        zx = np.asarray(zx, dtype=np.float64)
+        zy = np.asarray(zy, dtype=np.float64)
+        valid = (zx >= 0) & (zy >= 0) & np.isfinite(ax) & np.isfinite(ay)
+
+        # filas con zona, para grillas fuera de la pirámide
+        self._rows = (team_idx[valid], ax[valid], ay[valid], np.asarray(p, dtype=np.float64)[valid])
+
+        # celda base anidada dentro de la celda de entrenamiento guardada (zx, zy)
+        fx, fy = base[0] // train_grid[0], base[1] // train_grid[1]
+        tzx, tzy = zx[valid].astype(np.int64), zy[valid].astype(np.int64)
+        bx = np.clip(zone_index(ax[valid], PITCH[0], base[0]), tzx * fx, tzx * fx + fx - 1)
+        by = np.clip(zone_index(ay[valid], PITCH[1], base[1]), tzy * fy, tzy * fy + fy - 1)
+
+        self._levels: dict[tuple[int, int], tuple[np.ndarray, np.ndarray]] = {}
+        self._levels[base] = self._accumulate(self._rows[0], bx, by, self._rows[3], base)
+        for grid in pyramid_levels(base)[1:]:
+            self._levels[grid] = self._coarsen(grid)
+        self._grid_cache = TTLCache(maxsize=GRID_CACHE_SIZE, ttl=GRID_CACHE_TTL_S)
+
+        base_cell = np.full(len(team_idx), -1, dtype=np.int64)
+        base_cell[valid] = bx * base[1] + by
+        self._build_cube(team_idx, base_cell, np.asarray(p, dtype=np.float64), dims or {})
+
+    def _build_cube(self, team_idx, base_cell, p, dims):
+        """
+        Cubo disperso: una celda por combinación presente de (equipo, código
+        de cada dimensión, celda base o -1 sin zona) con Σp y n. El rival va
+        justo después del equipo, así las celdas de cada enfrentamiento
+        (equipo, rival) quedan contiguas y se indexan por offset.
+        """
+        self.dim_levels: dict[str, np.ndarray] = {}
+        names = sorted(dims, key=lambda name: name != "opponent")
+        columns, radices = [team_idx], [len(self.teams)]
+        for name in names:
+            codes, levels = pd.factorize(np.asarray(dims[name]), sort=True)
+            self.dim_levels[name] = np.asarray(levels)
+            columns.append(codes + 1)  # 0 = valor faltante
+            radices.append(len(levels) + 1)
+        columns.append(base_cell + 1)
+        radices.append(self.base[0] * self.base[1] + 1)
+        keys, inverse = np.unique(np.ravel_multi_index(columns, radices), return_inverse=True)
+        cells = np.unravel_index(keys, radices)
+        self._cube_team, self._cube_cell = cells[0], cells[-1] - 1
+        self._cube_dims = {name: cells[1 + k] - 1 for k, name in enumerate(names)}
+        self._cube_sum_p = np.bincount(inverse, weights=p, minlength=len(keys))
+        self._cube_n = np.bincount(inverse, minlength=len(keys))
+
+        # índice (equipo, rival) -> [inicio, fin) de sus celdas en el cubo
+        self._matchup_pairs = self._matchup_start = None
+        if "opponent" in self._cube_dims:
+            self._matchup_radix = radices[1]
+            pairs = self._cube_team * self._matchup_radix + self._cube_dims["opponent"] + 1
+            self._matchup_pairs, self._matchup_start = np.unique(pairs, return_index=True)
+
+    def filter_levels(self) -> dict[str, list]:
+        """Valores disponibles de cada dimensión filtrable."""
+        return {name: levels.tolist() for name, levels in self.dim_levels.items()}
+
+    def _accumulate(self, team_idx, cx, cy, p, grid, counts=None):
+        nx, ny = grid
+        flat = team_idx * (nx * ny) + cx * ny + cy
+        size = len(self.teams) * nx * ny
+        sum_p = np.bincount(flat, weights=p, minlength=size).reshape(len(self.teams), nx, ny)
+        n = np.bincount(flat, weights=counts, minlength=size)
+        n = n.astype(np.int64).reshape(len(self.teams), nx, ny)
+        return sum_p, n
+
+    def _check_filter_grid(self, grid):
+        if self.base[0] % grid[0] or self.base[1] % grid[1]:
+            raise ValueError(
+                f"Con filtros la grilla debe ser un nivel de la pirámide: {pyramid_levels(self.base)}"
+            )
+
+    def _filtered(self, grid, filters: dict, cells: np.ndarray | None = None):
+        """
+        (Σp, n, filas por equipo) sumando las celdas del cubo (todas o sólo
+        `cells`) que cumplen `filters`.
+        """
+        self._check_filter_grid(grid)
+        idx = np.arange(len(self._cube_n)) if cells is None else cells
+        for name, wanted in filters.items():
+            if name not in self.dim_levels:
+                raise ValueError(f"El filtro '{name}' no está disponible en este dataset")
+            levels = self.dim_levels[name]
+            codes = np.flatnonzero(np.isin(levels, np.asarray(wanted, dtype=levels.dtype)))
+            idx = idx[np.isin(self._cube_dims[name][idx], codes)]
+        team_rows = np.bincount(self._cube_team[idx], weights=self._cube_n[idx],
+                                minlength=len(self.teams)).astype(np.int64)
+        idx = idx[self._cube_cell[idx] >= 0]
+        bx, by = np.divmod(self._cube_cell[idx], self.base[1])
+        kx, ky = self.base[0] // grid[0], self.base[1] // grid[1]
+        sum_p, n = self._accumulate(self._cube_team[idx], bx // kx, by // ky,
+                                    self._cube_sum_p[idx], grid, self._cube_n[idx])
+        return sum_p, n, team_rows
+
+    def _matchup_cells(self, team_idx: int, opponent_id: int) -> np.ndarray | None:
+        """Índices de las celdas del cubo de team_idx contra opponent_id (búsqueda binaria)."""
+        if self._matchup_pairs is None:
+            raise ValueError("El dataset no tiene rival (opponent_id) para armar enfrentamientos")
+        levels = self.dim_levels["opponent"]
+        j = np.searchsorted(levels, opponent_id)
+        if j >= len(levels) or levels[j] != opponent_id:
+            return None
+        pair = team_idx * self._matchup_radix + j + 1
+        k = np.searchsorted(self._matchup_pairs, pair)
+        if k >= len(self._matchup_pairs) or self._matchup_pairs[k] != pair:
+            return None
+        end = self._matchup_start[k + 1] if k + 1 < len(self._matchup_start) else len(self._cube_n)
+        return np.arange(self._matchup_start[k], end)
+
+    def matchup(self, team_id: int, opponent_id: int, grid: tuple[int, int] = TRAIN_GRID,
+                filters: dict | None = None):
+        """
+        (Σp, n, filas) de team_id contra opponent_id con forma (nx, ny), o
+        None si no se enfrentaron. El rival ya es opponent_id: un filtro
+        `opponent` en `filters` es un error (no se ignora en silencio).
+        """
+        if filters and "opponent" in filters:
+            raise ValueError("El filtro 'opponent' no aplica a un enfrentamiento: el rival ya es opponent_id")
+        i = self._team_index(team_id)
+        cells = self._matchup_cells(i, opponent_id) if i is not None else None
+        if cells is None:
+            return None
+        sum_p, n, team_rows = self._filtered(tuple(grid), filters or {}, cells)
+        return sum_p[i], n[i], team_rows[i]
+
+    def _coarsen(self, grid):
+        """Suma bloques kx x ky de la grilla base."""
+        sum_p, n = self._levels[self.base]
+        kx, ky = self.base[0] // grid[0], self.base[1] // grid[1]
+        shape = (len(self.teams), grid[0], kx, grid[1], ky)
+        return sum_p.reshape(shape).sum(axis=(2, 4)), n.reshape(shape).sum(axis=(2, 4))
+
+    @property
+    def levels(self) -> list[tuple[int, int]]:
+        return sorted(self._levels)
+
+    def level(self, grid: tuple[int, int], filters: dict | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """(Σp, n) con forma (equipos, nx, ny); con `filters`, sólo las filas que los cumplen."""
+        grid = tuple(grid)
+        if filters:
+            return self._filtered(grid, filters)[:2]
+        cached = self._levels.get(grid)
+        if cached is not None:
+            return cached
+        key = f"{grid[0]}x{grid[1]}"
+        cached = self._grid_cache.get(key)
+        if cached is None:
+            if self.base[0] % grid[0] == 0 and self.base[1] % grid[1] == 0:
+                cached = self._coarsen(grid)
+            else:
+                team_idx, ax, ay, p = self._rows
+                cx = zone_index(ax, PITCH[0], grid[0])
+                cy = zone_index(ay, PITCH[1], grid[1])
+                cached = self._accumulate(team_idx, cx, cy, p, grid)
+            self._grid_cache.set(key, cached)
+        return cached
+
+    def _level_rows(self, grid, filters):
+        """Como level, más las filas por equipo (denominador de freq)."""
+        if filters:
+            return self._filtered(tuple(grid), filters)
+        return (*self.level(grid), self.team_rows)
+
+    def _team_index(self, team_id: int) -> int | None:
+        i = np.searchsorted(self.teams, team_id)
+        if i >= len(self.teams) or self.teams[i] != team_id:
+            return None
+        return int(i)
+
+    def team_cells(self, team_id: int, grid: tuple[int, int] = TRAIN_GRID, filters: dict | None = None):
+        """(Σp, n) del equipo con forma (nx, ny), o None si no hay datos."""
+        i = self._team_index(team_id)
+        if i is None:
+            return None
+        sum_p, n = self.level(grid, filters)
+        return sum_p[i], n[i]
+
+    @staticmethod
+    def _zones_frame(sum_p: np.ndarray, n: np.ndarray, rows: int) -> pd.DataFrame:
+        zx, zy = np.nonzero(n)
+        counts = n[zx, zy]
+        out = pd.DataFrame({
+            "zone_id": [f"{x}_{y}" for x, y in zip(zx, zy)],
+            "zx": zx,
+            "zy": zy,
+            "p_model": sum_p[zx, zy] / counts,
+            "n": counts,
+            "freq": counts / rows,
+        })
+        return out.sort_values("p_model", ascending=False, kind="mergesort").reset_index(drop=True)
+
+    def team_zones(self, team_id: int, grid: tuple[int, int] = TRAIN_GRID,
+                   filters: dict | None = None) -> pd.DataFrame:
+        """Riesgo medio (p_model), n y freq por zona del equipo, de mayor a menor riesgo."""
+        i = self._team_index(team_id)
+        if i is None:
+            return pd.DataFrame(columns=ZONE_COLUMNS)
+        sum_p, n, team_rows = self._level_rows(grid, filters)
+        return self._zones_frame(sum_p[i], n[i], team_rows[i])
+
+    def matchup_zones(self, team_id: int, opponent_id: int, grid: tuple[int, int] = TRAIN_GRID,
+                      filters: dict | None = None) -> pd.DataFrame:
+        """Como team_zones, sólo con los eventos de team_id contra opponent_id."""
+        cells = self.matchup(team_id, opponent_id, grid, filters)
+        if cells is None:
+            return pd.DataFrame(columns=ZONE_COLUMNS)
+        return self._zones_frame(*cells)
+
+    def league_matrix(self, grid: tuple[int, int] = TRAIN_GRID, filters: dict | None = None) -> dict:
+        """
+        Matriz equipos x zonas (zonas aplanadas zx * ny + zy) con promedios de
+        liga y desvíos. Promedios ponderados por eventos: liga = Σp / Σn de
+        todos los equipos; p y desvíos son NaN en celdas sin eventos.
+        """
+        sum_p, n = self.level(grid, filters)
+        sum_p = sum_p.reshape(len(self.teams), -1)
+        n = n.reshape(len(self.teams), -1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            p = sum_p / n
+            league = sum_p.sum(axis=0) / n.sum(axis=0)
+            team_average = sum_p.sum(axis=1) / n.sum(axis=1)
+        league_average = sum_p.sum() / n.sum() if n.sum() else np.nan
+        return {
+            "teams": self.teams,
+            "p": p,
+            "n": n,
+            "league": league,
+            "deviation": p - league,
+            "team_average": team_average,
+            "league_average": league_average,
+            "team_deviation": team_average - league_average,
+        }
+
+
+# =============================
+#   COMPARACIÓN ENTRE MAPAS
+# =============================
+def _spearman(a: np.ndarray, b: np.ndarray) -> float | None:
+    """Correlación de rangos (rangos promedio en empates); None si no es calculable."""
+    if len(a) < 2:
+        return None
+    ra = pd.Series(a).rank().to_numpy()
+    rb = pd.Series(b).rank().to_numpy()
+    if ra.std() == 0 or rb.std() == 0:
+        return None
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def compare_zone_maps(cells_a, cells_b, top: int = 5, min_n: int = 1) -> dict:
+    """
+    Compara dos mapas (Σp, n) de la misma grilla (pueden venir de modelos
+    distintos). Sólo se comparan las celdas con al menos `min_n` filas en
+    ambos: delta = p_a - p_b por zona, correlación de Spearman entre los
+    riesgos y las `top` zonas con mayor |delta|.
+    """
+    (sum_a, n_a), (sum_b, n_b) = cells_a, cells_b
+    if sum_a.shape != sum_b.shape:
+        raise ValueError(f"Grillas distintas: {sum_a.shape} vs {sum_b.shape}")
+    ny = sum_a.shape[1]
+    has_a, has_b = n_a >= min_n, n_b >= min_n
+    zx, zy = np.nonzero(has_a & has_b)
+    p_a = sum_a[zx, zy] / n_a[zx, zy]
+    p_b = sum_b[zx, zy] / n_b[zx, zy]
+    delta = p_a - p_b
+    labels = zone_labels(zx * ny + zy, ny)
+
+    zones = pd.DataFrame({
+        "zone_id": labels,
+        "zx": zx,
+        "zy": zy,
+        "p_a": p_a,
+        "p_b": p_b,
+        "delta": delta,
+        "n_a": n_a[zx, zy],
+        "n_b": n_b[zx, zy],
+    })
+    order = np.argsort(-np.abs(delta), kind="stable")
+    only_a = np.argwhere(has_a & ~has_b)
+    only_b = np.argwhere(has_b & ~has_a)
+    return {
+        "n_common": int(len(zones)),
+        "rank_correlation": _spearman(p_a, p_b),
+        "mean_delta": float(delta.mean()) if len(delta) else None,
+        "mean_abs_delta": float(np.abs(delta).mean()) if len(delta) else None,
+        "zones": zones.to_dict(orient="records"),
+        "top_divergent": zones.iloc[order[:top]].to_dict(orient="records"),
+        "only_a": zone_labels(only_a[:, 0] * ny + only_a[:, 1], ny).tolist(),
+        "only_b": zone_labels(only_b[:, 0] * ny + only_b[:, 1], ny).tolist(),
+    }
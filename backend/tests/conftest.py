@@ -0,0 +1,6 @@
+import os
+import sys
+
+# los tests importan los servicios como lo hace main.py (desde backend/)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
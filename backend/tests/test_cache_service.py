@@ -0,0 +1,153 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from services import ai_service, cache_service
+from services.cache_service import SingleFlight, TTLCache, content_key
+
+# Caché del LLM: expiración y desalojo de TTLCache, deduplicación de
+# SingleFlight y claves de ai_service (redondeo de las zonas a ZONE_DECIMALS).
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(t=1000.0)
+    monkeypatch.setattr(cache_service.time, "monotonic", lambda: now.t)
+    return now
+
+
+def test_ttl_cache_expira_por_ttl(clock):
+    cache = TTLCache(maxsize=4, ttl=10)
+    cache.set("a", 1)
+    clock.t += 9.9
+    assert cache.get("a") == 1
+    clock.t += 0.2
+    assert cache.get("a") is None
+    assert cache.get("a", "default") == "default"
+    assert len(cache) == 0
+
+
+def test_ttl_cache_desaloja_el_menos_usado(clock):
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" pasa a ser el menos usado
+    cache.set("c", 3)
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_set_renueva_el_ttl(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    clock.t += 8
+    cache.set("a", 2)
+    clock.t += 8
+    assert cache.get("a") == 2
+
+
+def test_single_flight_comparte_la_llamada_en_curso():
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"ok": len(calls)}
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("k", fn) for _ in range(5)))
+        other = await flight.do("otra", fn)
+        # terminada la llamada, la clave se libera y se vuelve a ejecutar
+        again = await flight.do("k", fn)
+        return results, other, again, flight
+
+    results, other, again, flight = asyncio.run(run())
+    assert results == [{"ok": 1}] * 5
+    assert other == {"ok": 2}
+    assert again == {"ok": 3}
+    assert len(calls) == 3
+    assert flight._inflight == {}
+
+
+def test_single_flight_propaga_el_error_a_todos():
+    async def fn():
+        await asyncio.sleep(0.01)
+        raise ValueError("falló")
+
+    async def run():
+        flight = SingleFlight()
+        return await asyncio.gather(*(flight.do("k", fn) for _ in range(3)),
+                                    return_exceptions=True)
+
+    errors = asyncio.run(run())
+    assert all(isinstance(e, ValueError) for e in errors)
+
+
+def test_content_key_estable():
+    a = content_key("v1", "tactical", {"0_1": 0.5, "1_0": 0.25})
+    b = content_key("v1", "tactical", {"1_0": 0.25, "0_1": 0.5})
+    assert a == b
+    assert len(a) == 64
+    assert a != content_key("v2", "tactical", {"0_1": 0.5, "1_0": 0.25})
+    assert a != content_key("v1", "comparison", {"0_1": 0.5, "1_0": 0.25})
+
+
+class _FakeCompletions:
+    """Reemplaza chat.completions del cliente OpenAI y cuenta las llamadas."""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def create(self, model, messages):
+        self.prompts.append(messages[0]["content"])
+        await asyncio.sleep(0.01)
+        content = "```json\n" + json.dumps({"llamada": len(self.prompts)}) + "\n```"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    svc = ai_service.GPTTacticalService()
+    completions = _FakeCompletions()
+    svc.async_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return svc, completions
+
+
+def test_ai_service_clave_redondea_las_zonas(service):
+    svc, completions = service
+
+    async def run():
+        first = await svc.tactical_recommendations({"0_1": 0.12341, "1_0": 0.5})
+        # mismas zonas a ZONE_DECIMALS decimales: sale de la caché
+        same = await svc.tactical_recommendations({"0_1": 0.12339, "1_0": 0.50004})
+        other = await svc.tactical_recommendations({"0_1": 0.124, "1_0": 0.5})
+        return first, same, other
+
+    first, same, other = asyncio.run(run())
+    assert first == same == {"llamada": 1}
+    assert other == {"llamada": 2}
+    assert len(completions.prompts) == 2
+    # el prompt lleva las probabilidades ya redondeadas
+    assert "0.123" in completions.prompts[0] and "0.12341" not in completions.prompts[0]
+
+
+def test_ai_service_comparte_llamadas_concurrentes(service):
+    svc, completions = service
+    equipo_a = {"team_id": 1, "zonas": {"0_1": 0.2}}
+    equipo_b = {"team_id": 2, "zonas": {"0_1": 0.3}}
+
+    async def run():
+        return await asyncio.gather(
+            *(svc.comparison_analysis(equipo_a, equipo_b) for _ in range(4))
+        )
+
+    results = asyncio.run(run())
+    assert results == [{"llamada": 1}] * 4
+    assert len(completions.prompts) == 1
+    assert len(svc.cache) == 1
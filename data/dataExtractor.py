@@ -1,58 +1,206 @@
 # %%
-from statsbombpy import sb
 import pandas as pd
-import time
+import argparse
+import json
 import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Descarga de eventos StatsBomb (open-data) con:
+#   - concurrencia acotada (MAX_WORKERS) y límite de peticiones/s compartido
+#   - reintentos con backoff exponencial
+#   - checkpoint por partido: cada partido se escribe a su parquet apenas llega
+#     (nada se acumula en memoria) y al reiniciar se saltan los ya descargados
+#   - varias competiciones/temporadas por ejecución
+#
+# La fuente es la URL de open-data o un directorio local con la misma estructura
+# (competitions.json, matches/<comp>/<season>.json, events/<match_id>.json), p. ej.
+# un clon de github.com/statsbomb/open-data o un servidor HTTP de prueba:
+#
+#   python data/dataExtractor.py --season 37:90 --season 37:42 --workers 4
+#   python data/dataExtractor.py --source /ruta/open-data/data --season 37:90
 
 # CONFIG
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))   # carpeta donde está este script
 SOURCE_DIR = os.path.join(BASE_DIR, "source")          # data/source/
-OUT_FILE = os.path.join(SOURCE_DIR, "events_all_37_90.parquet")
 
-os.makedirs(SOURCE_DIR, exist_ok=True)
+OPEN_DATA_URL = os.getenv(
+    "STATSBOMB_OPEN_DATA", "https://raw.githubusercontent.com/statsbomb/open-data/master/data"
+)
+SEASONS        = [(37, 90)]   # (competition_id, season_id)
+MAX_WORKERS    = 4
+MAX_RPS        = 2.0          # peticiones por segundo (todas las hebras)
+RETRIES        = 4
+BACKOFF_S      = 2.0
+TIMEOUT_S      = 30
+
+
+def season_dir(out_root, competition_id, season_id):
+    """Un parquet por partido: data/source/events_<comp>_<season>/<match_id>.parquet"""
+    return os.path.join(out_root, f"events_{competition_id}_{season_id}")
 
-COMPETITION_ID = 37
-SEASON_ID      = 90
-SLEEP_BETWEEN  = 1.5
 
 # %%
-# listar partidos
-matches = sb.matches(COMPETITION_ID, SEASON_ID)
-match_ids = matches.match_id.tolist()
+# Acceso a la fuente (HTTP o directorio local)
+class RateLimiter:
+    """Espacia el inicio de las peticiones a >= 1/rps segundos entre hebras."""
+
+    def __init__(self, rps):
+        self.interval = 1.0 / rps if rps and rps > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class OpenDataSource:
+    """Lee JSON de open-data desde una URL base o un directorio local."""
+
+    def __init__(self, base=OPEN_DATA_URL, rps=MAX_RPS, retries=RETRIES,
+                 backoff_s=BACKOFF_S, timeout_s=TIMEOUT_S):
+        self.base = base.rstrip("/")
+        self.is_local = os.path.isdir(base)
+        self.limiter = RateLimiter(0 if self.is_local else rps)
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self.timeout_s = timeout_s
+
+    def get_json(self, rel_path):
+        if self.is_local:
+            with open(os.path.join(self.base, rel_path), encoding="utf-8") as f:
+                return json.load(f)
+
+        url = f"{self.base}/{rel_path}"
+        for attempt in range(1, self.retries + 1):
+            self.limiter.wait()
+            try:
+                with urllib.request.urlopen(url, timeout=self.timeout_s) as resp:
+                    return json.loads(resp.read().decode("utf-8"))
+            except urllib.error.HTTPError as e:
+                if e.code == 404 or attempt == self.retries:
+                    raise
+            except (urllib.error.URLError, TimeoutError, ConnectionError):
+                if attempt == self.retries:
+                    raise
+            # backoff exponencial con jitter (429/5xx/red)
+            time.sleep(self.backoff_s * 2 ** (attempt - 1) * (0.5 + random.random()))
+
+    def matches(self, competition_id, season_id):
+        return self.get_json(f"matches/{competition_id}/{season_id}.json")
+
+    def events(self, match_id):
+        return self.get_json(f"events/{match_id}.json")
+
 
-print(f"Partidos encontrados: {len(match_ids)}")
-all_events = []  # buffer para unificar todo en memoria
 # %%
-# descargar eventos y guardarlos
-for i, match_id in enumerate(match_ids, start=1):
-    home = matches.iloc[i-1]["home_team"]
-    away = matches.iloc[i-1]["away_team"]
-
-    print(f"[{i}/{len(match_ids)}] {home} vs {away} (match_id={match_id})")
-
-    ok = False
-    for attempt in range(1, 4):
-        try:
-            df = sb.events(match_id=match_id)
-            all_events.append(df)
-            print(f"   ✅ {len(df)} eventos descargados")
-            ok = True
-            break
-        except Exception as e:
-            print(f"Error intento {attempt}: {e}")
-            time.sleep(5)
-
-    if not ok:
-        print(f"   ❌ No se pudo descargar match_id={match_id}, se continúa.")
-    
-    time.sleep(SLEEP_BETWEEN)
+# Aplanado de eventos (mismo formato de columnas que statsbombpy: sb.events)
+def _flatten(prefix, value, out):
+    if isinstance(value, dict):
+        if "name" in value and "id" in value:
+            out[prefix] = value["name"]
+            out[f"{prefix}_id"] = value["id"]
+            return
+        for k, v in value.items():
+            _flatten(f"{prefix}_{k}", v, out)
+    elif isinstance(value, list) and value and isinstance(value[0], (dict, list)):
+        out[prefix] = json.dumps(value)  # p. ej. freeze_frame, lineup de tactics
+    else:
+        out[prefix] = value
+
+
+def flatten_events(raw_events, match_id):
+    rows = []
+    for ev in raw_events:
+        row = {}
+        for k, v in ev.items():
+            _flatten(k, v, row)
+        row["match_id"] = match_id
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def write_atomic(df, path):
+    """Escribe a .tmp y renombra: un corte nunca deja un parquet a medias."""
+    tmp = path + ".tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
 
 # %%
-# unir todo en un solo archivo
-if all_events:
-    full_df = pd.concat(all_events, ignore_index=True)
-    full_df.to_parquet(OUT_FILE, index=False)
-    print(f"\n🎉 Listo. Archivo final guardado: {OUT_FILE}")
-    print(f"Total de eventos: {len(full_df)}")
-else:
-    print("No se descargó ningún evento")
+# Descarga por partido (checkpoint + reanudación)
+def fetch_match(source, match_id, out_dir):
+    out_file = os.path.join(out_dir, f"{match_id}.parquet")
+    df = flatten_events(source.events(match_id), match_id)
+    write_atomic(df, out_file)
+    return len(df)
+
+
+def extract_season(source, competition_id, season_id, out_root=SOURCE_DIR,
+                   max_workers=MAX_WORKERS, refresh=False):
+    """Descarga los partidos que falten de una temporada. Devuelve resumen."""
+    out_dir = season_dir(out_root, competition_id, season_id)
+    os.makedirs(out_dir, exist_ok=True)
+
+    matches = source.matches(competition_id, season_id)
+    done = {int(os.path.splitext(n)[0]) for n in os.listdir(out_dir)
+            if n.endswith(".parquet") and n[:-8].isdigit()}
+    todo = [m for m in matches if refresh or m["match_id"] not in done]
+    print(f"[{competition_id}/{season_id}] {len(matches)} partidos | "
+          f"{len(matches) - len(todo)} ya descargados | {len(todo)} por descargar")
+
+    ok, failed = 0, []
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sb") as pool:
+        futures = {pool.submit(fetch_match, source, m["match_id"], out_dir): m for m in todo}
+        for i, fut in enumerate(as_completed(futures), start=1):
+            m = futures[fut]
+            home = m.get("home_team", {}).get("home_team_name")
+            away = m.get("away_team", {}).get("away_team_name")
+            try:
+                n = fut.result()
+                ok += 1
+                print(f"   [{i}/{len(todo)}] ✅ {home} vs {away} (match_id={m['match_id']}): {n} eventos")
+            except Exception as e:
+                failed.append(m["match_id"])
+                print(f"   [{i}/{len(todo)}] ❌ {home} vs {away} (match_id={m['match_id']}): {e}")
+
+    return {"dir": out_dir, "matches": len(matches), "downloaded": ok,
+            "skipped": len(matches) - len(todo), "failed": failed}
+
+
+def parse_season(text):
+    comp, season = text.split(":")
+    return int(comp), int(season)
+
+
+# %%
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--season", type=parse_season, action="append",
+                    help="competition_id:season_id (repetible), p. ej. 37:90")
+    ap.add_argument("--source", default=OPEN_DATA_URL, help="URL base de open-data o directorio local")
+    ap.add_argument("--out", default=SOURCE_DIR)
+    ap.add_argument("--workers", type=int, default=MAX_WORKERS)
+    ap.add_argument("--rps", type=float, default=MAX_RPS, help="peticiones por segundo")
+    ap.add_argument("--refresh", action="store_true", help="volver a descargar partidos existentes")
+    args = ap.parse_args()
+
+    source = OpenDataSource(args.source, rps=args.rps)
+    failed = 0
+    for competition_id, season_id in args.season or SEASONS:
+        summary = extract_season(source, competition_id, season_id, args.out, args.workers, args.refresh)
+        failed += len(summary["failed"])
+        print(f"🎉 {summary['downloaded']} nuevos, {summary['skipped']} ya estaban, "
+              f"{len(summary['failed'])} fallidos -> {summary['dir']}")
+    if failed:
+        print("Hay partidos fallidos: vuelve a ejecutar para reanudar.")
+        raise SystemExit(1)
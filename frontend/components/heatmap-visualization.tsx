@@ -26,9 +26,9 @@ export default function HeatmapVisualization({
   highlightZone?: string | null;
   color: string;
 }) {
-  // === Tamaño del campo y bins ===
-  const xBins = 12;
-  const yBins = 8;
+  // === Tamaño del campo y bins (los de la grilla recibida, 12x8 por defecto) ===
+  const yBins = data.heatmap_data.length || 8;
+  const xBins = data.heatmap_data[0]?.length || 12;
   const xScale = 120 / xBins;
   const yScale = 80 / yBins;
 
@@ -130,7 +130,7 @@ export default function HeatmapVisualization({
     },
   ];
 
-  // === Cuadrícula (12x8) ===
+  // === Cuadrícula (xBins x yBins) ===
   const gridLines = [];
   for (let i = 1; i < xBins; i++) {
     const x = i * xScale;
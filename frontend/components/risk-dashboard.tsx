@@ -26,6 +26,7 @@ import {
 } from "@/components/ui/select";
 
 import { trackEvent } from "@/lib/analytics";
+import { postSSE } from "@/lib/sse";
 
 interface Zone {
   zone_id: string;
@@ -143,6 +144,34 @@ export default function RiskDashboard() {
     fetchTeams();
   }, [modelType, modelType_2]);
 
+  // ===============================
+  // 🔹 2. Ranking de la liga (una sola llamada para todos los equipos)
+  // ===============================
+  useEffect(() => {
+    const fetchLeague = async () => {
+      try {
+        const res = await fetch(
+          `http://localhost:8000/league_risk_matrix?model_type=${modelType}`
+        );
+        if (!res.ok) throw new Error("No se pudo obtener la matriz de liga");
+        const data = await res.json();
+        const league = data.models[modelType];
+
+        setAllTeamsRisk(
+          data.team_names
+            .map((team_name: string, i: number) => ({
+              team_name,
+              risk: league.team_average[i],
+            }))
+            .filter((t: { risk: number | null }) => t.risk !== null)
+        );
+      } catch (err) {
+        console.error("Error cargando matriz de liga:", err);
+      }
+    };
+    fetchLeague();
+  }, [modelType]);
+
   async function fetchTeamRisk(
     teamId: number,
     modelVariant: ModelType
@@ -154,8 +183,8 @@ export default function RiskDashboard() {
     const data = await res.json();
     const raw: Zone[] = data.zones || [];
 
-    const ybins = 8;
-    const xbins = 12;
+    // la grilla la decide el backend (?grid=6x4, 12x8, 24x16...)
+    const [xbins, ybins]: [number, number] = data.grid ?? [12, 8];
     const grid = Array(ybins)
       .fill(0)
       .map(() => Array(xbins).fill(0));
@@ -204,60 +233,90 @@ export default function RiskDashboard() {
   }
 
   useEffect(() => {
+    // al cambiar de equipo o modelo se corta el stream anterior
+    const controller = new AbortController();
+
     const loadComparison = async () => {
       if (!selectedTeam || !selectedTeamB) return;
 
       try {
         setComparison(null);
 
-        const teamA = await fetchTeamRisk(selectedTeam, modelType);
-        const teamB = await fetchTeamRisk(selectedTeamB, modelType_2);
-        // Guardar datos individuales (puede servir luego)
-        setTeamData(teamA);
-        setTeamDataB(teamB);
-
-        // Llamar análisis comparativo
-        const cmp = await fetchTeamComparison(teamA, teamB);
-        setComparison(cmp);
+        // 1. Números de la comparación (ms): mapas, deltas y zonas divergentes
+        const stats = await fetchTeamComparison(
+          selectedTeam,
+          modelType,
+          selectedTeamB,
+          modelType_2,
+          controller.signal
+        );
+        console.log("COMPARACIÓN (números):", stats);
 
-        console.log("COMPARACIÓN TÁCTICA:", cmp);
+        // 2. Análisis del LLM por separado, en stream
+        await streamComparisonNarrative(
+          stats.team_a,
+          stats.team_b,
+          controller.signal
+        );
       } catch (err) {
+        if (controller.signal.aborted) return;
         console.error("Error en comparación:", err);
       }
     };
 
     loadComparison();
+    return () => controller.abort();
   }, [selectedTeam, selectedTeamB, modelType, modelType_2]);
 
-  async function fetchTeamComparison(teamA: TeamRiskData, teamB: TeamRiskData) {
-    // Convertir formato → { "x_y": prob }
-    const modelOutputA: Record<string, number> = {};
-    teamA.zones.forEach((z) => (modelOutputA[z.zone_id] = z.risk_level));
-
-    const modelOutputB: Record<string, number> = {};
-    teamB.zones.forEach((z) => (modelOutputB[z.zone_id] = z.risk_level));
-
-    const res = await fetch("http://localhost:8000/compare-teams", {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({
-        equipo_a: {
-          team_id: teamA.team_id,
-          team_name: teamA.team_name,
-          zonas: modelOutputA,
-        },
-        equipo_b: {
-          team_id: teamB.team_id,
-          team_name: teamB.team_name,
-          zonas: modelOutputB,
-        },
-      }),
+  async function fetchTeamComparison(
+    teamA: number,
+    modelA: ModelType,
+    teamB: number,
+    modelB: ModelType,
+    signal: AbortSignal
+  ) {
+    // El backend arma ambos mapas y los compara (deltas, correlación, zonas
+    // divergentes); zones=true incluye los mapas para pedir el análisis
+    const params = new URLSearchParams({
+      team_a: String(teamA),
+      model_a: modelA,
+      team_b: String(teamB),
+      model_b: modelB,
+      zones: "true",
+    });
+    const res = await fetch(`http://localhost:8000/team_comparison?${params}`, {
+      signal,
     });
 
     if (!res.ok) throw new Error("Error al obtener comparación táctica");
 
-    const json = await res.json();
-    return json.comparison;
+    return res.json();
+  }
+
+  async function streamComparisonNarrative(
+    teamA: { team_id: number; team_name: string; zonas: Record<string, number> },
+    teamB: { team_id: number; team_name: string; zonas: Record<string, number> },
+    signal: AbortSignal
+  ) {
+    const pick = (t: typeof teamA) => ({
+      team_id: t.team_id,
+      team_name: t.team_name,
+      zonas: t.zonas,
+    });
+
+    await postSSE(
+      "http://localhost:8000/compare-teams/stream",
+      { equipo_a: pick(teamA), equipo_b: pick(teamB) },
+      (event, data) => {
+        if (event === "done") {
+          setComparison(data);
+          console.log("COMPARACIÓN TÁCTICA:", data);
+        } else if (event === "error") {
+          console.error("Error en comparación:", data.detail);
+        }
+      },
+      signal
+    );
   }
 
   // ==================================================
@@ -269,8 +328,10 @@ export default function RiskDashboard() {
         setLoading(true);
         setError(null);
 
-        const riskData = await fetchTeamRisk(selectedTeam, modelType);
-        const riskDataB = await fetchTeamRisk(selectedTeamB, modelType_2);
+        const [riskData, riskDataB] = await Promise.all([
+          fetchTeamRisk(selectedTeam, modelType),
+          fetchTeamRisk(selectedTeamB, modelType_2),
+        ]);
         setTeamData(riskData);
         setTeamDataB(riskDataB);
       } catch (err) {
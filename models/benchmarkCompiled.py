@@ -0,0 +1,78 @@
+import pandas as pd
+import numpy as np
+import joblib
+import time
+import sys
+import os
+
+# Compara el motor compilado (backend/services/forest_engine.py) contra
+# clf.predict_proba: igualdad de probabilidades (con tolerancia) y latencia.
+# Informa el lote más grande en que el compilado sigue ganando: de ahí sale
+# COMPILED_MAX_ROWS en backend/services/risk_service.py.
+#   python models/benchmarkCompiled.py
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "backend"))
+from services.forest_engine import CompiledForest
+from exportModel import compiled_path_for
+
+MODELS = {
+    "turnover": ("risk_model_rf.joblib", "train_outfield_K8_T15s.arrow"),
+    "recovery": ("recovery_risk_model_rf.joblib", "train_recoveries_K8_T15s.arrow"),
+}
+ATOL = 1e-9
+N_SINGLE = 50
+BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64, 100, 1000, 10000]
+
+
+def timeit(fn, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+for key, (model_name, data_name) in MODELS.items():
+    model_path = os.path.join(BASE_DIR, "joblib", model_name)
+    data_path = os.path.join(BASE_DIR, "source", data_name)
+    compiled_path = compiled_path_for(model_path)
+    if not all(os.path.exists(p) for p in [model_path, data_path, compiled_path]):
+        print(f"[{key}] faltan artefactos (modelo, compilado o dataset), se omite.")
+        continue
+
+    clf = joblib.load(model_path)
+    engine = CompiledForest.load(compiled_path)
+    df = pd.read_feather(data_path)
+    cols = engine.columns
+    X = df[cols]
+
+    # --- Igualdad de probabilidades ---
+    p_ref = clf.predict_proba(X)[:, 1]
+    p_cmp = engine.predict_proba(X)
+    diff = np.abs(p_ref - p_cmp).max()
+    print(f"[{key}] filas={len(df)} | max |Δp|={diff:.2e} | exactas={np.mean(p_ref == p_cmp):.1%}")
+    assert diff <= ATOL, f"Diferencia {diff} > {ATOL}"
+
+    # --- Latencia de un evento (dict) ---
+    events = X.head(N_SINGLE).to_dict(orient="records")
+    t_ref = timeit(lambda: [clf.predict_proba(pd.DataFrame([e])[cols]) for e in events]) / N_SINGLE
+    t_cmp = timeit(lambda: [engine.predict_proba(e) for e in events]) / N_SINGLE
+    print(f"  1 evento:  sklearn {t_ref*1e3:8.2f} ms | compilado {t_cmp*1e3:8.2f} ms | x{t_ref/t_cmp:.1f}")
+
+    # --- Latencia por lotes ---
+    crossover, winning = 0, True
+    for n in BATCH_SIZES:
+        Xb = X.sample(n=min(n, len(X)), replace=n > len(X), random_state=0)
+        t_ref = timeit(lambda: clf.predict_proba(Xb))
+        t_cmp = timeit(lambda: engine.predict_proba(Xb))
+        winning = winning and t_cmp < t_ref
+        if winning:
+            crossover = n
+        print(f"  lote {n:>6}: sklearn {t_ref*1e3:8.2f} ms | compilado {t_cmp*1e3:8.2f} ms | x{t_ref/t_cmp:.1f}")
+    print(f"  compilado más rápido hasta lotes de {crossover} filas")
+
+    size_ref = os.path.getsize(model_path) / 1e6
+    size_cmp = os.path.getsize(compiled_path) / 1e6
+    print(f"  tamaño: joblib {size_ref:.1f} MB | compilado {size_cmp:.1f} MB")
@@ -0,0 +1,113 @@
+import pandas as pd
+import numpy as np
+import argparse
+import joblib
+import time
+import sys
+import os
+
+# Latencia vs. precisión de los backends de trainPipeline.py (rf, rf_compact,
+# hgb) para elegir qué modelo servir en MODEL_REGISTRY
+# (backend/services/risk_service.py). Por backend:
+#   - AUC/AP con GroupKFold por partido (misma CV que el entrenamiento)
+#   - tamaño del joblib (y del compilado, si es un forest)
+#   - tiempo de carga (joblib.load)
+#   - latencia de un evento y por lotes, como en el backend: eventos sueltos
+#     con el motor compilado si existe, lotes con predict_proba
+#
+#   python models/benchmarkModels.py outfield
+#   python models/benchmarkModels.py recoveries --backend rf_compact hgb --folds 5
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "backend"))
+from services.forest_engine import CompiledForest
+from exportModel import compiled_path_for
+from trainPipeline import (
+    BACKENDS, DATASETS, N_SPLITS, REPORTS_DIR, SOURCE_DIR,
+    cross_validate, default_grid, fit_final, load_training_data, model_file,
+)
+
+OUT_DIR = os.path.join(REPORTS_DIR, "models")  # modelos del benchmark (no los servidos)
+N_SINGLE = 50
+BATCH_SIZES = [1000, 10000]
+
+
+def timeit(fn, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def benchmark_backend(dataset, backend, data_path, n_splits=N_SPLITS, workers=None, out_dir=OUT_DIR):
+    combos, _, summary = cross_validate(data_path, default_grid(backend), n_splits, workers, backend)
+    best = summary.iloc[0]
+
+    model_path = os.path.join(out_dir, model_file(dataset, backend))
+    t0 = time.perf_counter()
+    fit_final(data_path, model_path, combos[best["combo"]], backend)
+    fit_s = time.perf_counter() - t0
+
+    load_s = timeit(lambda: joblib.load(model_path))
+    clf = joblib.load(model_path)
+    compiled_path = compiled_path_for(model_path)
+    engine = CompiledForest.load(compiled_path) if os.path.exists(compiled_path) else None
+
+    df, features, _, _ = load_training_data(data_path)
+    X = df[[c for block in features for c in block]]
+
+    # --- un evento (dict), como /predict ---
+    events = X.head(N_SINGLE).to_dict(orient="records")
+    single_s = timeit(lambda: [clf.predict_proba(pd.DataFrame([e])) for e in events]) / N_SINGLE
+    single_cmp_s = (timeit(lambda: [engine.predict_proba(e) for e in events]) / N_SINGLE
+                    if engine is not None else np.nan)
+
+    row = {
+        "backend": backend,
+        "auc": best["auc"], "auc_std": best["auc_std"],
+        "ap": best["ap"], "ap_std": best["ap_std"],
+        "size_mb": os.path.getsize(model_path) / 1e6,
+        "compiled_mb": os.path.getsize(compiled_path) / 1e6 if engine is not None else np.nan,
+        "load_s": load_s,
+        "fit_s": fit_s,
+        "single_ms": single_s * 1e3,
+        "single_compiled_ms": single_cmp_s * 1e3,
+    }
+    # --- lotes ---
+    for n in BATCH_SIZES:
+        Xb = X.sample(n=n, replace=n > len(X), random_state=0)
+        row[f"batch_{n}_ms"] = timeit(lambda: clf.predict_proba(Xb)) * 1e3
+    row["model_path"] = model_path
+    return row
+
+
+def benchmark(dataset, backends=None, n_splits=N_SPLITS, workers=None, data_path=None, out_dir=OUT_DIR):
+    data_path = data_path or os.path.join(SOURCE_DIR, DATASETS[dataset][0])
+    rows = [benchmark_backend(dataset, b, data_path, n_splits, workers, out_dir)
+            for b in backends or list(BACKENDS)]
+    report = pd.DataFrame(rows)
+
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    report_path = os.path.join(REPORTS_DIR, f"models_{dataset}_{time.strftime('%Y%m%d_%H%M%S')}.csv")
+    report.to_csv(report_path, index=False)
+
+    print(f"\nLatencia vs. precisión — {dataset} (GroupKFold, {n_splits} folds)")
+    print(report.drop(columns="model_path").to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    print("Reporte en:", report_path)
+    print("Modelos en:", out_dir, "(publicar el elegido con: python models/modelRegistry.py publish <clave> <joblib>)")
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("dataset", choices=list(DATASETS))
+    ap.add_argument("--backend", choices=list(BACKENDS), nargs="+", default=list(BACKENDS))
+    ap.add_argument("--folds", type=int, default=N_SPLITS)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--data", default=None, help="dataset .arrow (por defecto, el del tipo)")
+    ap.add_argument("--out", default=OUT_DIR, help="carpeta para los modelos entrenados")
+    args = ap.parse_args()
+
+    benchmark(args.dataset, args.backend, args.folds, args.workers, args.data, args.out)
@@ -0,0 +1,185 @@
+import pandas as pd
+import numpy as np
+import argparse
+import subprocess
+import tempfile
+import time
+import re
+import sys
+import os
+
+from columnarStore import sort_by_team
+from featurePipeline import GRID, dataset_name
+
+# Benchmark de transformData1.py / transformData2.py sobre una tabla de eventos
+# sintética multi-temporada, con verificación fila a fila contra el oráculo de
+# los scripts originales (models/tests/legacyTransforms.py) o contra una salida
+# de referencia (p. ej. generada con la versión anterior de los scripts).
+#
+#   python models/benchmarkTransform.py --seasons 3 --matches 132 --check
+#   python models/benchmarkTransform.py --keep-events /tmp/ev.csv --out /tmp/ref   # versión vieja
+#   python models/benchmarkTransform.py --events /tmp/ev.csv --reference /tmp/ref  # versión nueva
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = ["transformData1.py", "transformData2.py"]
+
+TYPES = ["Pass", "Carry", "Ball Receipt*", "Pressure", "Duel", "Dribble",
+         "Shot", "Ball Recovery", "Clearance"]
+TYPE_P = [.35, .25, .20, .06, .04, .03, .02, .03, .02]
+PATTERNS = ["Regular Play", "From Throw In", "From Corner", "From Counter", "From Free Kick"]
+
+
+def make_synthetic_events(n_seasons=3, matches_per_season=132,
+                          events_per_period=1700, n_teams=12, seed=7):
+    """Tabla de eventos estilo StatsBomb (columnas que usan los transforms)."""
+    rng = np.random.default_rng(seed)
+    n_matches = n_seasons * matches_per_season
+    E = events_per_period
+    N = n_matches * 2 * E
+
+    match_id = np.repeat(np.arange(n_matches) + 3_000_000, 2 * E)
+    period = np.tile(np.repeat([1, 2], E), n_matches)
+    index = np.tile(np.arange(1, 2 * E + 1), n_matches)
+    mp = (match_id - 3_000_000) * 2 + (period - 1)          # id de partido/periodo
+    starts = np.r_[0, np.flatnonzero(np.diff(mp)) + 1]
+
+    def cumsum_by_mp(v):
+        c = np.cumsum(v)
+        return c - np.repeat(c[starts] - v[starts], np.diff(np.r_[starts, N]))
+
+    home = rng.integers(0, n_teams, n_matches)
+    away = (home + rng.integers(1, n_teams, n_matches)) % n_teams
+    team_ids = np.array([746, 749, 965, 967, 968, 969, 970, 971, 972, 2647, 4959, 1475])[:n_teams]
+
+    flip = rng.random(N) < 0.12
+    new_pos = flip | (rng.random(N) < 0.02)
+    flip[starts] = False
+    side = (cumsum_by_mp(flip.astype(np.int64)) + (period - 1)) % 2
+    m = match_id - 3_000_000
+    team = np.where(side == 0, team_ids[home[m]], team_ids[away[m]])
+    possession = cumsum_by_mp(new_pos.astype(np.int64)) + (period - 1) * 10_000 + 1
+
+    t = cumsum_by_mp(rng.exponential(3.0, N)) + (period - 1) * 45 * 60
+    gk = rng.random(N) < 0.05
+    typ = np.array(TYPES)[rng.choice(len(TYPES), N, p=TYPE_P)]
+
+    x = np.round(rng.uniform(0, 120, N), 1)
+    y = np.round(rng.uniform(0, 80, N), 1)
+    location = pd.Series("[" + pd.Series(x).astype(str) + ", " + pd.Series(y).astype(str) + "]")
+    location[rng.random(N) < 0.03] = None
+
+    def flag(p):
+        return np.where(rng.random(N) < p, True, None)
+
+    is_pass = typ == "Pass"
+    df = pd.DataFrame({
+        "match_id": match_id, "period": period, "index": index,
+        "team_id": team, "possession": possession, "possession_team_id": team,
+        "player_id": team * 100 + np.where(gk, 0, rng.integers(1, 11, N)),
+        "minute": (t // 60).astype(int), "second": (t % 60).astype(int),
+        "type": typ, "location": location,
+        "position": np.where(gk, "Goalkeeper", "Center Back"),
+        "play_pattern": np.array(PATTERNS)[rng.integers(0, len(PATTERNS), N)],
+        "pass_length": np.where(is_pass, rng.uniform(2, 60, N), np.nan),
+        "pass_angle": np.where(is_pass, rng.uniform(-3.14, 3.14, N), np.nan),
+        "pass_height": np.where(is_pass, np.array(["Ground Pass", "High Pass", "Low Pass"])[rng.integers(0, 3, N)], None),
+        "under_pressure": flag(0.2), "counterpress": flag(0.05),
+        "pass_cross": np.where(is_pass, flag(0.05), None),
+        "goalkeeper_type": np.where(gk, "Shot Saved", None),
+    })
+    return df
+
+
+def run_script(script, events_path, out_dir):
+    env = {**os.environ, "EVENTS_PATH": events_path, "OUTPUT_DIR": out_dir}
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(BASE_DIR, script)], env=env,
+                   check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - t0
+
+
+def _normalized(df, name):
+    """
+    Categóricas como texto, zone_id como código y filas ordenadas por team_id
+    como las escribe save_columnar (para comparar entre formatos y versiones).
+    """
+    df = sort_by_team(df).reset_index(drop=True)
+    if "zone_id" in df.columns and not pd.api.types.is_integer_dtype(df["zone_id"]):
+        # referencias viejas con zone_id "zx_zy": al código entero zx*ny + zy
+        grid = re.search(r"_G(\d+)x(\d+)", name)
+        ny = int(grid.group(2)) if grid else GRID[1]
+        zx, zy = df["zx"].astype(np.int64), df["zy"].astype(np.int64)
+        df["zone_id"] = np.where((zx >= 0) & (zy >= 0), zx * ny + zy, -1)
+    cats = df.select_dtypes(["category", "object"]).columns
+    return df.astype({c: str for c in cats})
+
+
+def _read_normalized(path):
+    """Lee CSV o Arrow normalizado con _normalized."""
+    df = pd.read_feather(path) if path.endswith(".arrow") else pd.read_csv(path)
+    return _normalized(df, os.path.basename(path))
+
+
+def _assert_same(a, b, name, source):
+    extra = [c for c in b.columns if c not in a.columns]
+    pd.testing.assert_frame_equal(a, b[a.columns], check_dtype=False)
+    print(f"  {name}: {len(a)} filas idénticas a {source}"
+          + (f" (columnas nuevas: {', '.join(extra)})" if extra else ""))
+
+
+def check_against_legacy(events_path, out_dir):
+    """Compara las salidas por defecto (K8, T15, 12x8) con el oráculo de los scripts originales."""
+    sys.path.insert(0, os.path.join(BASE_DIR, "tests"))
+    from legacyTransforms import LEGACY, legacy_load
+
+    events = legacy_load(events_path)
+    for kind, legacy in LEGACY.items():
+        name = dataset_name(kind)
+        a = _normalized(legacy(events), name)
+        b = _read_normalized(os.path.join(out_dir, name))
+        _assert_same(a, b, name, "los scripts originales")
+
+
+def compare_outputs(out_dir, ref_dir):
+    for name in sorted(os.listdir(ref_dir)):
+        if not name.startswith("train_"):
+            continue
+        stem = os.path.splitext(name)[0]
+        new_name = next((n for n in os.listdir(out_dir) if os.path.splitext(n)[0] == stem), None)
+        if new_name is None:
+            continue
+        a = _read_normalized(os.path.join(ref_dir, name))
+        b = _read_normalized(os.path.join(out_dir, new_name))
+        _assert_same(a, b, name, "la referencia")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seasons", type=int, default=3)
+    ap.add_argument("--matches", type=int, default=132, help="partidos por temporada")
+    ap.add_argument("--events", help="usar este CSV de eventos en vez de generar uno")
+    ap.add_argument("--keep-events", help="guardar el CSV sintético generado en esta ruta")
+    ap.add_argument("--out", help="directorio de salida (por defecto, temporal)")
+    ap.add_argument("--reference", help="directorio con salidas de referencia a comparar")
+    ap.add_argument("--check", action="store_true",
+                    help="comparar fila a fila con el oráculo de los scripts originales")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="r2s_bench_")
+    events_path = args.events
+    if events_path is None:
+        t0 = time.perf_counter()
+        events = make_synthetic_events(args.seasons, args.matches)
+        events_path = args.keep_events or os.path.join(tmp, "events.csv")
+        events.to_csv(events_path, index=False)
+        print(f"Eventos sintéticos: {len(events):,} filas ({time.perf_counter() - t0:.1f}s) -> {events_path}")
+
+    out_dir = args.out or os.path.join(tmp, "out")
+    os.makedirs(out_dir, exist_ok=True)
+    for script in SCRIPTS:
+        print(f"{script}: {run_script(script, events_path, out_dir):.2f}s")
+
+    if args.check:
+        check_against_legacy(events_path, out_dir)
+    if args.reference:
+        compare_outputs(out_dir, args.reference)
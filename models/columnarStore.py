@@ -0,0 +1,50 @@
+import pandas as pd
+import numpy as np
+
+from pandas.api.types import is_bool_dtype, is_float_dtype, is_integer_dtype
+
+# Almacén columnar de los datasets de entrenamiento (Arrow IPC / Feather v2):
+#   - categóricas codificadas como diccionario (category)
+#   - numéricas al dtype más angosto posible
+#   - sin compresión y en un solo chunk, para que el backend lo abra con
+#     memory-map y todos los workers compartan la misma copia en page cache
+#   - filas ordenadas por team_id (orden estable): el backend sólo verifica
+#     el orden al cargar y no reordena el frame mapeado
+
+
+def narrow_dtypes(df):
+    """Devuelve una copia con categóricas como 'category' y numéricas angostas."""
+    out = {}
+    for c in df.columns:
+        s = df[c]
+        if is_bool_dtype(s):
+            out[c] = s.astype(np.int8)
+        elif is_integer_dtype(s):
+            out[c] = pd.to_numeric(s, downcast="integer")
+        elif is_float_dtype(s):
+            integral = s.notna().all() and (s % 1 == 0).all()
+            out[c] = pd.to_numeric(s, downcast="integer" if integral else "float")
+        else:
+            out[c] = s.astype(str).astype("category")
+    return pd.DataFrame(out)
+
+
+def is_team_sorted(team_ids):
+    """team_id ascendente con los faltantes (NaN) al final."""
+    n = int(team_ids.notna().sum())
+    return bool(team_ids.iloc[:n].is_monotonic_increasing and team_ids.iloc[n:].isna().all())
+
+
+def sort_by_team(df):
+    """Orden estable por team_id (dentro de cada equipo se mantiene el orden de df; NaN al final)."""
+    if "team_id" not in df.columns or is_team_sorted(df["team_id"]):
+        return df
+    return df.iloc[np.argsort(df["team_id"].to_numpy(), kind="stable")]
+
+
+def save_columnar(df, path):
+    """Guarda df ordenado por team_id como Arrow IPC sin comprimir (un solo chunk) y devuelve la ruta."""
+    df = narrow_dtypes(sort_by_team(df)).reset_index(drop=True)
+    df.to_feather(path, compression="uncompressed", chunksize=max(len(df), 1))
+    return path
+
@@ -0,0 +1,96 @@
+import numpy as np
+import joblib
+import sys
+import os
+
+from sklearn.pipeline import Pipeline
+from sklearn.impute import SimpleImputer
+from sklearn.preprocessing import OneHotEncoder
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "backend"))
+from services.registry_layout import COMPILED_FORMAT, compiled_path_for
+
+# Aplana un Pipeline(prep=ColumnTransformer, mdl=RandomForestClassifier) en
+# arrays contiguos de NumPy para el motor compilado del backend
+# (backend/services/forest_engine.py). COMPILED_FORMAT viene del layout
+# compartido (backend/services/registry_layout.py).
+
+
+def _export_blocks(pre):
+    blocks = []
+    for name, trans, cols in pre.transformers_:
+        if trans == "drop" or name == "remainder":
+            continue
+        steps = trans.steps if isinstance(trans, Pipeline) else [(name, trans)]
+        imp = next((s for _, s in steps if isinstance(s, SimpleImputer)), None)
+        ohe = next((s for _, s in steps if isinstance(s, OneHotEncoder)), None)
+        fill = imp.statistics_.tolist() if imp is not None else [np.nan] * len(cols)
+        if ohe is None:
+            blocks.append({"kind": "num", "columns": list(cols),
+                           "fill": np.asarray(fill, dtype=np.float64)})
+        else:
+            blocks.append({"kind": "cat", "columns": list(cols), "fill": fill,
+                           "categories": [c.tolist() for c in ohe.categories_]})
+    return blocks
+
+
+def _export_trees(rf):
+    pos_class = list(rf.classes_).index(1)
+    feat_dtype = np.int16 if rf.n_features_in_ < np.iinfo(np.int16).max else np.int32
+
+    roots, feature, threshold, left, right, value = [], [], [], [], [], []
+    offset = 0
+    for est in rf.estimators_:
+        t = est.tree_
+        ids = np.arange(t.node_count)
+        leaf = t.children_left == -1
+
+        v = t.value[:, 0, :]
+        norm = v.sum(axis=1)
+        norm[norm == 0] = 1.0
+
+        roots.append(offset)
+        # hojas: se apuntan a sí mismas (el motor las detecta con left == nodo)
+        feature.append(np.where(leaf, 0, t.feature))
+        threshold.append(np.where(leaf, np.inf, t.threshold))
+        left.append(np.where(leaf, ids, t.children_left) + offset)
+        right.append(np.where(leaf, ids, t.children_right) + offset)
+        value.append(np.where(leaf, v[:, pos_class] / norm, 0.0))
+        offset += t.node_count
+
+    return {
+        "n_trees": len(rf.estimators_),
+        "roots": np.asarray(roots, dtype=np.int32),
+        "feature": np.concatenate(feature).astype(feat_dtype),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "left": np.concatenate(left).astype(np.int32),
+        "right": np.concatenate(right).astype(np.int32),
+        "value": np.concatenate(value).astype(np.float64),
+    }
+
+
+def export_compiled(clf, out_path):
+    """Exporta el pipeline entrenado al formato compilado y lo guarda en out_path."""
+    pre = clf.named_steps["prep"]
+    rf = clf.named_steps["mdl"]
+    artifact = {
+        "format": COMPILED_FORMAT,
+        "blocks": _export_blocks(pre),
+        "n_features": int(rf.n_features_in_),
+        **_export_trees(rf),
+    }
+    joblib.dump(artifact, out_path)
+    return out_path
+
+
+if __name__ == "__main__":
+    # Exporta los modelos ya entrenados sin reentrenar
+    JOBLIB_DIR = os.path.join(BASE_DIR, "joblib")
+    for model_name in ["risk_model_rf.joblib", "recovery_risk_model_rf.joblib"]:
+        model_path = os.path.join(JOBLIB_DIR, model_name)
+        if not os.path.exists(model_path):
+            print("No existe:", model_path)
+            continue
+        out = export_compiled(joblib.load(model_path), compiled_path_for(model_path))
+        print("Modelo compilado guardado en:", out)
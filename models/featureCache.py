@@ -0,0 +1,166 @@
+import pandas as pd
+import pyarrow.parquet as pq
+import argparse
+import hashlib
+import json
+import os
+
+from columnarStore import save_columnar
+from featurePipeline import (
+  FeaturePipeline, dataset_name, parse_grid, partition_files, preprocess_events,
+  read_partitioned_events,
+  BACK_LOOK, CAT_KEEP, END_XY_KEEP, FLAG_KEEP, GRID, K_LOOKBACK, KINDS,
+  NUMERIC_KEEP, OUTPUT_DIR, PARTITIONS_DIR, PITCH, TIME_WINDOW_S,
+)
+
+# Construcción incremental de los datasets a partir de un parquet por partido
+# (data/dataExtractor.py). Las filas de anchors de cada partido se guardan en
+# caché por (match_id, hash de la configuración del pipeline):
+#
+#   <cache>/<config_hash>/<match_id>.arrow  + manifest.json
+#
+# El manifest guarda, por partido, la huella del archivo fuente (tamaño+mtime)
+# y las/os porteras/os de la temporada que juegan ese partido (la detección de
+# GK es por jugador/a en toda la temporada). En cada build sólo se procesan los
+# partidos nuevos o cambiados; el resto se concatena desde la caché en orden de
+# match_id, igual que un build completo.
+#
+#   python models/featureCache.py --k 4 8 --t 15
+
+CACHE_VERSION = "3"  # 2: zone_id como código entero; 3: opponent_id
+CACHE_DIR = os.getenv("FEATURE_CACHE_DIR", os.path.join(OUTPUT_DIR, "cache"))
+
+
+def config_hash(kind, k, time_window_s, grid):
+  """Hash de todo lo que determina las filas de un partido para una configuración."""
+  cfg = {
+    "version": CACHE_VERSION, "kind": kind, "k": k, "t": time_window_s, "grid": list(grid),
+    "back_look": BACK_LOOK, "pitch": list(PITCH),
+    "num": NUMERIC_KEEP, "end_xy": END_XY_KEEP, "cat": CAT_KEEP, "flags": FLAG_KEEP,
+  }
+  payload = json.dumps(cfg, sort_keys=True).encode("utf-8")
+  return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def fingerprint(path):
+  st = os.stat(path)
+  return f"{st.st_size}-{st.st_mtime_ns}"
+
+
+def season_goalkeepers(files):
+  """
+  (GK de toda la temporada, {match_id: GK presentes en el partido}) leyendo
+  sólo player_id/position de cada partido.
+  """
+  players, gk = {}, set()
+  for match_id, path in files.items():
+    names = pq.read_schema(path).names
+    if "player_id" not in names:
+      players[match_id] = set()
+      continue
+    df = pq.read_table(path, columns=[c for c in ("player_id", "position") if c in names]).to_pandas()
+    ids = pd.to_numeric(df["player_id"], errors="coerce")
+    pos = df.get("position", pd.Series(index=df.index, dtype="object")).astype(str).str.lower()
+    gk |= set(ids[pos.str.contains("goalkeeper", na=False)].dropna())
+    players[match_id] = set(ids.dropna())
+  return gk, {m: sorted(int(x) for x in p & gk) for m, p in players.items()}
+
+
+class FeatureCache:
+  """Caché de filas de dataset por partido para una configuración (kind, K, T, grilla)."""
+
+  def __init__(self, cache_dir, kind, k, time_window_s, grid):
+    self.config = (kind, k, time_window_s, tuple(grid))
+    self.dir = os.path.join(cache_dir, config_hash(*self.config))
+    self.manifest_path = os.path.join(self.dir, "manifest.json")
+    os.makedirs(self.dir, exist_ok=True)
+    self.manifest = {}  # {match_id: {"source": huella, "gk": [...]}}
+    if os.path.exists(self.manifest_path):
+      with open(self.manifest_path) as f:
+        self.manifest = json.load(f)["matches"]
+
+  def _path(self, match_id):
+    return os.path.join(self.dir, f"{match_id}.arrow")
+
+  def is_fresh(self, match_id, key):
+    return self.manifest.get(str(match_id)) == key and os.path.exists(self._path(match_id))
+
+  def put(self, match_id, key, rows):
+    # tipos crudos (sin angostar): el dataset final se angosta al concatenar
+    rows.reset_index(drop=True).to_feather(self._path(match_id))
+    self.manifest[str(match_id)] = key
+
+  def get(self, match_id):
+    return pd.read_feather(self._path(match_id))
+
+  def prune(self, match_ids):
+    """Borra partidos que ya no están en la fuente."""
+    keep = {str(m) for m in match_ids}
+    for m in [m for m in self.manifest if m not in keep]:
+      self.manifest.pop(m)
+      if os.path.exists(self._path(m)):
+        os.remove(self._path(m))
+
+  def save_manifest(self):
+    tmp = self.manifest_path + ".tmp"
+    with open(tmp, "w") as f:
+      json.dump({"config": list(self.config), "matches": self.manifest}, f)
+    os.replace(tmp, self.manifest_path)
+
+
+def build_incremental(configs, kinds=KINDS, source_dir=PARTITIONS_DIR,
+                      output_dir=OUTPUT_DIR, cache_dir=CACHE_DIR):
+  """
+  Actualiza la caché procesando sólo partidos nuevos/cambiados (una sola
+  lectura de eventos para todas las configuraciones) y escribe un .arrow por
+  (tipo, K, T, grilla). Devuelve {ruta: partidos reprocesados}.
+  """
+  files = partition_files(source_dir)
+  gk, gk_by_match = season_goalkeepers(files)
+  keys = {m: {"source": fingerprint(p), "gk": gk_by_match[m]} for m, p in files.items()}
+
+  caches = [FeatureCache(cache_dir, kind, k, t, grid) for k, t, grid in configs for kind in kinds]
+
+  todo = {c.dir: [m for m in files if not c.is_fresh(m, keys[m])] for c in caches}
+  stale = sorted({m for ms in todo.values() for m in ms})
+
+  if stale:
+    pipe = FeaturePipeline(preprocess_events(read_partitioned_events(source_dir, stale), gk))
+    for cache in caches:
+      if not todo[cache.dir]:
+        continue
+      rows = pipe.dataset(*cache.config)
+      by_match = dict(tuple(rows.groupby("match_id", sort=False)))
+      for m in todo[cache.dir]:
+        cache.put(m, keys[m], by_match.get(m, rows.iloc[:0]))
+
+  os.makedirs(output_dir, exist_ok=True)
+  paths = {}
+  for cache in caches:
+    cache.prune(files)
+    cache.save_manifest()
+    frames = [cache.get(m) for m in files]
+    df_train = pd.concat([f for f in frames if len(f)], ignore_index=True)
+    kind, k, t, grid = cache.config
+    out_path = os.path.join(output_dir, dataset_name(kind, k, t, grid))
+    save_columnar(df_train, out_path)
+    n_new = len(todo[cache.dir])
+    print(f"{kind:>10} K={k:<3} T={t:<3} grilla={grid[0]}x{grid[1]}: {len(df_train)} filas "
+          f"| {len(files)} partidos ({n_new} reprocesados) -> {out_path}")
+    paths[out_path] = todo[cache.dir]
+  return paths
+
+
+if __name__ == "__main__":
+  ap = argparse.ArgumentParser()
+  ap.add_argument("--k", type=int, nargs="+", default=[K_LOOKBACK])
+  ap.add_argument("--t", type=int, nargs="+", default=[TIME_WINDOW_S])
+  ap.add_argument("--grid", type=parse_grid, nargs="+", default=[GRID], help="p. ej. 12x8 16x10")
+  ap.add_argument("--kind", choices=KINDS, nargs="+", default=list(KINDS))
+  ap.add_argument("--source", default=PARTITIONS_DIR, help="directorio con <match_id>.parquet")
+  ap.add_argument("--out", default=OUTPUT_DIR)
+  ap.add_argument("--cache", default=CACHE_DIR)
+  args = ap.parse_args()
+
+  configs = [(k, t, g) for k in args.k for t in args.t for g in args.grid]
+  build_incremental(configs, args.kind, args.source, args.out, args.cache)
@@ -0,0 +1,434 @@
+import pandas as pd
+import numpy as np
+import pyarrow.parquet as pq
+import argparse
+import os
+
+from columnarStore import save_columnar
+from locationParser import LOCATION_COLUMNS, add_xy_columns, extract_xy
+
+# Pipeline de features compartido por ambos modelos:
+#   - "outfield":   últimos K eventos de CAMPO de posesiones que terminan en pérdida
+#                   (target: tiro RIVAL <= T s tras la pérdida)
+#   - "recoveries": primeros K eventos de CAMPO de posesiones que empiezan en
+#                   recuperación (target: tiro PROPIO <= T s tras la recuperación)
+#
+# Los eventos se cargan y preprocesan una sola vez; etiquetas, anchors y bins se
+# calculan una vez por T / K / grilla y se reutilizan entre configuraciones, así
+# que un barrido K x T x grilla cuesta una única lectura de los eventos.
+#
+# Los eventos se leen directamente del parquet de data/dataExtractor.py (sólo
+# las columnas usadas, opcionalmente filtrando partidos): un directorio con un
+# parquet por partido (<match_id>.parquet) o un único archivo. El CSV de
+# fromParquet.py sigue aceptándose. Para reconstruir sólo partidos nuevos o
+# modificados, ver featureCache.py.
+#
+#   python models/featurePipeline.py --k 4 8 12 --t 10 15 20 --grid 12x8 16x10
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PARTITIONS_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "data", "source", "events_37_90"))
+PARQUET_PATH = os.path.abspath(os.path.join(BASE_DIR, "..", "data", "source", "events_all_37_90.parquet"))
+CSV_PATH = os.path.join(BASE_DIR, "source", "events_all_37_90.csv")
+DATA_PATH = os.getenv("EVENTS_PATH") or next(
+  (p for p in (PARTITIONS_DIR, PARQUET_PATH) if os.path.exists(p)), CSV_PATH
+)
+OUTPUT_DIR = os.getenv("OUTPUT_DIR", os.path.join(BASE_DIR, "source"))
+
+TIME_WINDOW_S = 15      # ventana para el target
+GRID          = (12, 8) # grilla 12x8 (campo 120x80)
+K_LOOKBACK    = 8       # nº de eventos de CAMPO por posesión
+BACK_LOOK     = 6       # rescate de coords dentro de posesión si faltan (pérdidas)
+PITCH         = (120, 80)
+
+KINDS = ("outfield", "recoveries")
+
+# Features cortas y robustas (si no existen, se ignoran)
+NUMERIC_KEEP = ["pass_length","pass_angle"]
+END_XY_KEEP  = ["pass_end_x","pass_end_y","carry_end_x","carry_end_y"]  # de *_end_location
+CAT_KEEP     = ["play_pattern","pass_height","pass_type","pass_outcome",
+                "dribble_outcome","duel_type","duel_outcome"]
+FLAG_KEEP    = ["under_pressure","counterpress","dribble_overrun","dribble_no_touch",
+                "pass_cross","pass_cut_back","pass_switch","pass_through_ball","pass_straight"]
+
+KEYS = ["match_id","period","possession"]
+
+# columnas que lee el pipeline (el parquet de StatsBomb trae ~116)
+EVENT_COLUMNS = ["match_id","period","index","team_id","possession","possession_team_id",
+                 "player_id","minute","second","type","position","x","y"] \
+                + list(LOCATION_COLUMNS) + NUMERIC_KEEP + CAT_KEEP + FLAG_KEEP
+
+
+# ---------- 1) Carga + preprocesado (una vez) ----------
+def preprocess_events(df, gk_players=None):
+  """
+  Ordena, tipa, calcula tiempo absoluto, coords x/y y flag de portera/o.
+  gk_players: ids de quienes jugaron de GK en TODA la temporada (si sólo se
+  procesan algunos partidos); por defecto se deduce de df.
+  """
+  df = df.sort_values(["match_id","period","index"], kind="mergesort").reset_index(drop=True)
+
+  # tipos y tiempo absoluto
+  for c in ["match_id","period","team_id","possession","possession_team_id","player_id","index"]:
+    if c in df.columns:
+      df[c] = pd.to_numeric(df[c], errors="coerce")
+  df["minute"] = pd.to_numeric(df["minute"], errors="coerce")
+  df["second"] = pd.to_numeric(df["second"], errors="coerce")
+  df["t"] = df["minute"]*60 + df["second"]
+
+  # coordenadas robustas (location -> x/y, *_end_location -> *_end_x/y), vectorizado
+  df = add_xy_columns(df)
+  if "x" not in df.columns or "y" not in df.columns:
+    df["x"] = np.nan; df["y"] = np.nan
+
+  # porteras/os: por evento o por jugador/a que alguna vez jugó de GK
+  pos_str = df.get("position", pd.Series(index=df.index, dtype="object")).astype(str).str.lower()
+  df["is_gk_event"]  = pos_str.str.contains("goalkeeper", na=False)
+  if gk_players is None:
+    is_gk_by_player = df.groupby("player_id")["is_gk_event"].max().rename("is_gk_player")
+    df["is_gk_player"] = df["player_id"].map(is_gk_by_player).fillna(False)
+  else:
+    df["is_gk_player"] = df["player_id"].isin(list(gk_players))
+  df["is_gk"] = df["is_gk_event"] | df["is_gk_player"]
+
+  # borrar todas las columnas de portería de una vez
+  return df.drop(columns=[c for c in df.columns if c.startswith("goalkeeper_")], errors="ignore")
+
+
+def read_parquet_events(path, match_ids=None):
+  """
+  Lee del parquet sólo EVENT_COLUMNS, filtrando partidos en la lectura
+  (predicate pushdown). Texto -> category; las coordenadas (listas) se
+  convierten a x/y desde Arrow sin materializar listas en pandas.
+  """
+  names = pq.read_schema(path).names
+  table = pq.read_table(
+    path,
+    columns=[c for c in EVENT_COLUMNS if c in names],
+    filters=[("match_id", "in", list(match_ids))] if match_ids is not None else None,
+  )
+  xy = {}
+  for col, (cx, cy) in LOCATION_COLUMNS.items():
+    if col in table.column_names and not {cx, cy} <= set(table.column_names):
+      xy[cx], xy[cy] = extract_xy(table.column(col))
+      table = table.drop_columns([col])
+  return table.to_pandas(strings_to_categorical=True).assign(**xy)
+
+
+def partition_files(source_dir):
+  """{match_id: ruta} de un directorio con un parquet por partido."""
+  files = {}
+  for name in os.listdir(source_dir):
+    stem, ext = os.path.splitext(name)
+    if ext == ".parquet" and stem.isdigit():
+      files[int(stem)] = os.path.join(source_dir, name)
+  return dict(sorted(files.items()))
+
+
+def read_partitioned_events(source_dir, match_ids=None):
+  """Lee sólo los archivos de los partidos pedidos (el esquema puede variar entre partidos)."""
+  files = partition_files(source_dir)
+  if match_ids is not None:
+    wanted = {int(m) for m in match_ids}
+    files = {m: p for m, p in files.items() if m in wanted}
+  frames = [read_parquet_events(p) for p in files.values()]
+  if not frames:
+    return pd.DataFrame(columns=[c for c in EVENT_COLUMNS if c not in LOCATION_COLUMNS])
+  return pd.concat(frames, ignore_index=True)
+
+
+def read_csv_events(path, match_ids=None):
+  df = pd.read_csv(path, usecols=lambda c: c in EVENT_COLUMNS, low_memory=False)
+  if match_ids is not None:
+    df = df[df["match_id"].isin(list(match_ids))]
+  return df
+
+
+def load_events(path=DATA_PATH, match_ids=None, gk_players=None):
+  """Eventos preprocesados desde parquet por partido / único (recomendado) o CSV."""
+  if os.path.isdir(path):
+    read = read_partitioned_events
+  else:
+    read = read_parquet_events if path.endswith(".parquet") else read_csv_events
+  return preprocess_events(read(path, match_ids), gk_players)
+
+
+# ---------- 2) Etiquetas (independientes de K y de la grilla) ----------
+def _shots(df):
+  shots = df[df["type"].eq("Shot")][["match_id","period","team_id","t"]].rename(
+      columns={"team_id":"shot_team_id","t":"t_shot"}
+  )
+  return shots[shots["t_shot"].notna() & shots["shot_team_id"].notna()]
+
+
+def _first_shot_after(left, right, time_col, by):
+  """PRIMER tiro de `right` con t_shot >= left[time_col] (merge_asof forward por `by`)."""
+  left = left.sort_values(time_col, kind="mergesort")
+  as_float = {c: float for c in by if c not in ("match_id","period")}
+  valid = left[time_col].notna()
+  for c in as_float:
+    valid &= left[c].notna()
+  right = right.sort_values("t_shot", kind="mergesort")
+  matched = pd.merge_asof(
+    left[valid].astype({time_col: float, **as_float}),
+    right[by + ["t_shot","shot_team_id"]].astype({"t_shot": float, **as_float}),
+    left_on=time_col, right_on="t_shot", by=by,
+    direction="forward", allow_exact_matches=True,
+  )
+  return pd.concat([matched, left[~valid]], ignore_index=True)
+
+
+def turnover_table(df):
+  """Posesiones que terminan en pérdida, con coords de la pérdida y primer tiro rival."""
+  gpos = df.groupby(KEYS, sort=False, observed=True)
+  pos_core = gpos.agg(
+      end_index=("index","max"),
+      end_time=("t","max"),
+      pos_team=("possession_team_id","first")
+  ).reset_index()
+
+  # último evento de CAMPO (df ya está ordenado por match/period/index)
+  of = df.loc[~df["is_gk"], KEYS + ["index","minute","x","y"]]
+  of_from_end = of.groupby(KEYS, sort=False).cumcount(ascending=False)  # 0 = último
+
+  # primer evento con coords entre los BACK_LOOK últimos (final -> atrás)
+  with_xy = of[(of_from_end < BACK_LOOK) & of["x"].notna() & of["y"].notna()]
+  with_xy = with_xy.loc[with_xy.groupby(KEYS, sort=False)["index"].idxmax()]
+  # sin coords: se usa igualmente el último evento de campo
+  last_of = of[of_from_end == 0]
+
+  pos_out = last_of[KEYS + ["index","minute"]].merge(
+    with_xy[KEYS + ["index","minute","x","y"]], on=KEYS, how="left", suffixes=("_last","")
+  )
+  has_xy = pos_out["index"].notna()
+  pos_out = pd.DataFrame({
+    **{k: pos_out[k] for k in KEYS},
+    "idx_outfield": pos_out["index"].where(has_xy, pos_out["index_last"]).astype(float),
+    "loss_x": pos_out["x"].astype(float),
+    "loss_y": pos_out["y"].astype(float),
+    "end_minute_evt": pos_out["minute"].where(has_xy, pos_out["minute_last"]),
+  })
+  pos_tbl = pos_core.merge(pos_out, on=KEYS, how="left")
+
+  # pérdida = cambio de equipo en la posesión siguiente
+  pos_tbl = pos_tbl.sort_values(KEYS, kind="mergesort")
+  pos_tbl["next_pos_team"] = pos_tbl.groupby(["match_id","period"])["pos_team"].shift(-1)
+  turn = pos_tbl[(pos_tbl["next_pos_team"].notna()) &
+                 (pos_tbl["next_pos_team"] != pos_tbl["pos_team"])].copy()
+  turn["opp_team"] = turn["next_pos_team"]  # quien recupera
+
+  # Cada tiro es "rival" para todo equipo con posesión en ese partido/periodo salvo el que tira
+  shots = _shots(df)
+  mp_teams = turn[["match_id","period","pos_team"]].dropna().drop_duplicates()
+  opp_shots = shots.merge(mp_teams, on=["match_id","period"])
+  opp_shots = opp_shots[opp_shots["pos_team"] != opp_shots["shot_team_id"]]
+
+  has_team = turn["pos_team"].notna()
+  losses = pd.concat([
+    _first_shot_after(turn[has_team], opp_shots, "end_time", ["match_id","period","pos_team"]),
+    # posesión sin equipo: cualquier tiro cuenta como rival
+    _first_shot_after(turn[~has_team], shots, "end_time", ["match_id","period"]),
+  ], ignore_index=True)
+  losses["dt"] = losses["t_shot"] - losses["end_time"]
+  return losses
+
+
+def recovery_table(df):
+  """Posesiones que empiezan en recuperación, con el primer tiro propio posterior."""
+  gpos = df.groupby(KEYS, sort=False, observed=True)
+  pos_core = gpos.agg(
+    start_index=("index","min"),
+    start_time=("t","min"),
+    pos_team=("possession_team_id","first")
+  ).reset_index()
+
+  # recuperación = cambio de equipo respecto a la posesión anterior
+  pos_tbl = pos_core.sort_values(KEYS, kind="mergesort")
+  pos_tbl["prev_pos_team"] = pos_tbl.groupby(["match_id","period"])["pos_team"].shift(1)
+  recoveries = pos_tbl[(pos_tbl["prev_pos_team"].notna()) &
+                       (pos_tbl["prev_pos_team"] != pos_tbl["pos_team"])].copy()
+  recoveries["opp_team"] = recoveries["prev_pos_team"]  # quien perdió
+
+  shots = _shots(df)
+  own = shots.assign(pos_team=shots["shot_team_id"])
+  rec_df = _first_shot_after(recoveries, own, "start_time", ["match_id","period","pos_team"])
+  rec_df["dt"] = rec_df["t_shot"] - rec_df["start_time"]
+  return rec_df
+
+
+def label_window(tbl, time_window_s):
+  """y_shot = 1 si el primer tiro llega dentro de la ventana [0, T] s."""
+  return tbl.assign(y_shot=((tbl["dt"] >= 0) & (tbl["dt"] <= time_window_s)).astype(int))
+
+
+# ---------- 3) Eventos de CAMPO candidatos a anchor ----------
+def outfield_events(df):
+  """Eventos de CAMPO con features ya rellenadas y su rango dentro de la posesión."""
+  cols_for_anchor = ["match_id","period","possession","index","team_id","t","minute","x","y","type"] \
+                    + [c for c in NUMERIC_KEEP if c in df.columns] \
+                    + [c for c in END_XY_KEEP  if c in df.columns] \
+                    + [c for c in CAT_KEEP     if c in df.columns] \
+                    + [c for c in FLAG_KEEP    if c in df.columns]
+  outfield = df[~df["is_gk"]][cols_for_anchor]
+
+  # rango desde el inicio / desde el final, y orden de aparición de la posesión
+  g_out = outfield.groupby(KEYS, sort=False)
+  outfield = outfield.assign(
+    _from_start=g_out.cumcount(), _from_end=g_out.cumcount(ascending=False), _grp=g_out.ngroup()
+  )
+  outfield = outfield[outfield["possession"].notna()]
+  outfield = outfield.sort_values("_grp", kind="mergesort").reset_index(drop=True)
+
+  outfield = outfield.rename(columns={"x":"ax","y":"ay","minute":"a_minute","type":"a_type"})
+
+  # rellenar para que no queden NaNs visibles:
+  #   num -> -1, cat -> 'Missing', flags 0/1 (si hubiera NaN, a 0)
+  # (ax/ay se rellenan al final: antes hacen falta para los bins)
+  for c in ["a_minute"] + [c for c in NUMERIC_KEEP + END_XY_KEEP if c in outfield.columns]:
+    outfield[c] = pd.to_numeric(outfield[c], errors="coerce").fillna(-1)
+
+  for c in [c for c in CAT_KEEP + ["a_type"] if c in outfield.columns]:
+    outfield[c] = outfield[c].astype(str)
+    outfield.loc[outfield[c].isin(["nan","None","NaN"]) | outfield[c].isna(), c] = "Missing"
+
+  for c in [c for c in FLAG_KEEP if c in outfield.columns]:
+    outfield[c] = pd.to_numeric(outfield[c], errors="coerce").fillna(0).astype(int)
+  return outfield
+
+
+def grid_zones(outfield, grid=GRID):
+  """
+  zx, zy, zone_id de cada evento para una grilla (nx, ny) sobre el campo 120x80.
+  zone_id es un código entero zx*ny + zy (-1 sin posición); el texto "zx_zy"
+  sólo lo arma el backend al responder.
+  """
+  nx, ny = grid
+  xbins = np.linspace(0, PITCH[0], nx+1); ybins = np.linspace(0, PITCH[1], ny+1)
+  zx = pd.cut(outfield["ax"], xbins, labels=False, include_lowest=True)
+  zy = pd.cut(outfield["ay"], ybins, labels=False, include_lowest=True)
+  return pd.DataFrame({
+    "zx": zx.fillna(-1),
+    "zy": zy.fillna(-1),
+    "zone_id": (zx * ny + zy).fillna(-1).astype(np.int32),
+  }, index=outfield.index)
+
+
+# ---------- 4) Dataset final por configuración ----------
+def final_columns(columns):
+  cols = ["match_id","period","possession","team_id"]
+  cols += [c for c in ["opponent_id"] if c in columns]
+  cols += ["ax","ay","zx","zy","zone_id","a_minute","a_type","y_shot"]
+  cols += [c for c in NUMERIC_KEEP if c in columns]
+  cols += [c for c in END_XY_KEEP  if c in columns]
+  cols += [c for c in CAT_KEEP     if c in columns]
+  cols += [c for c in FLAG_KEEP    if c in columns]
+  return cols
+
+
+def assemble(outfield, zones, labels, kind, k):
+  """Filtra los K anchors de cada posesión etiquetada y arma el dataset de entrenamiento."""
+  rank = outfield["_from_end"] if kind == "outfield" else outfield["_from_start"]
+  anchors = outfield[rank < k].join(zones)
+  anchor_tbl = anchors.merge(labels[KEYS + ["y_shot","pos_team","opp_team"]], on=KEYS, how="inner")
+  # rival del equipo que ejecuta el anchor: los eventos del equipo sin la
+  # posesión (p. ej. Pressure) tienen como rival al dueño de la posesión
+  anchor_tbl["opponent_id"] = (
+    anchor_tbl["opp_team"].where(anchor_tbl["team_id"] != anchor_tbl["opp_team"], anchor_tbl["pos_team"])
+    .fillna(-1).astype(np.int32)
+  )
+
+  df_train = anchor_tbl[final_columns(anchor_tbl.columns)].copy()
+  for c in ["ax","ay"]:
+    df_train[c] = pd.to_numeric(df_train[c], errors="coerce").fillna(-1)
+  df_train["y_shot"] = df_train["y_shot"].fillna(0).astype(int)
+  return df_train
+
+
+def dataset_name(kind, k=K_LOOKBACK, time_window_s=TIME_WINDOW_S, grid=GRID):
+  """train_<kind>_K8_T15s.arrow (la grilla por defecto no se añade al nombre)."""
+  suffix = "" if tuple(grid) == GRID else f"_G{grid[0]}x{grid[1]}"
+  return f"train_{kind}_K{k}_T{time_window_s}s{suffix}.arrow"
+
+
+class FeaturePipeline:
+  """
+  Eventos preprocesados una vez + cachés por T (etiquetas), por grilla (zonas)
+  y por tipo (tablas de pérdidas / recuperaciones).
+  """
+
+  def __init__(self, df):
+    self.df = df
+    self._tables = {}
+    self._labels = {}
+    self._zones = {}
+    self._outfield = None
+
+  @classmethod
+  def from_events(cls, path=DATA_PATH, match_ids=None, gk_players=None):
+    return cls(load_events(path, match_ids, gk_players))
+
+  @property
+  def outfield(self):
+    if self._outfield is None:
+      self._outfield = outfield_events(self.df)
+    return self._outfield
+
+  def table(self, kind):
+    if kind not in self._tables:
+      self._tables[kind] = turnover_table(self.df) if kind == "outfield" else recovery_table(self.df)
+    return self._tables[kind]
+
+  def labels(self, kind, time_window_s=TIME_WINDOW_S):
+    key = (kind, time_window_s)
+    if key not in self._labels:
+      self._labels[key] = label_window(self.table(kind), time_window_s)
+    return self._labels[key]
+
+  def zones(self, grid=GRID):
+    grid = tuple(grid)
+    if grid not in self._zones:
+      self._zones[grid] = grid_zones(self.outfield, grid)
+    return self._zones[grid]
+
+  def dataset(self, kind, k=K_LOOKBACK, time_window_s=TIME_WINDOW_S, grid=GRID):
+    if kind not in KINDS:
+      raise ValueError(f"kind debe ser uno de {KINDS}")
+    return assemble(self.outfield, self.zones(grid), self.labels(kind, time_window_s), kind, k)
+
+  def datasets(self, configs, kinds=KINDS):
+    """Genera (kind, (k, T, grid), df_train) para cada configuración y tipo."""
+    for k, time_window_s, grid in configs:
+      for kind in kinds:
+        yield kind, (k, time_window_s, tuple(grid)), self.dataset(kind, k, time_window_s, grid)
+
+
+def build_datasets(configs, kinds=KINDS, events_path=DATA_PATH, output_dir=OUTPUT_DIR):
+  """Carga los eventos una vez y guarda un .arrow por (tipo, K, T, grilla)."""
+  pipe = FeaturePipeline.from_events(events_path)
+  os.makedirs(output_dir, exist_ok=True)
+  paths = []
+  for kind, (k, time_window_s, grid), df_train in pipe.datasets(configs, kinds):
+    out_path = os.path.join(output_dir, dataset_name(kind, k, time_window_s, grid))
+    save_columnar(df_train, out_path)
+    print(f"{kind:>10} K={k:<3} T={time_window_s:<3} grilla={grid[0]}x{grid[1]}: "
+          f"{len(df_train)} filas | positivas {int(df_train['y_shot'].sum())} -> {out_path}")
+    paths.append(out_path)
+  return paths
+
+
+def parse_grid(text):
+  nx, ny = text.lower().split("x")
+  return int(nx), int(ny)
+
+
+if __name__ == "__main__":
+  ap = argparse.ArgumentParser()
+  ap.add_argument("--k", type=int, nargs="+", default=[K_LOOKBACK])
+  ap.add_argument("--t", type=int, nargs="+", default=[TIME_WINDOW_S])
+  ap.add_argument("--grid", type=parse_grid, nargs="+", default=[GRID], help="p. ej. 12x8 16x10")
+  ap.add_argument("--kind", choices=KINDS, nargs="+", default=list(KINDS))
+  ap.add_argument("--events", default=DATA_PATH, help="directorio de parquets por partido, parquet o CSV")
+  ap.add_argument("--out", default=OUTPUT_DIR)
+  args = ap.parse_args()
+
+  configs = [(k, t, g) for k in args.k for t in args.t for g in args.grid]
+  build_datasets(configs, args.kind, args.events, args.out)
@@ -1,6 +1,9 @@
 import pandas as pd
 import os
 
+# Opcional: featurePipeline.py lee el parquet directamente (sólo las columnas
+# usadas). Este CSV sólo hace falta para inspeccionar los eventos a mano.
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 PARQUET_PATH = os.path.join(
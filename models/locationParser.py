@@ -0,0 +1,135 @@
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import re
+
+# Extracción vectorizada de coordenadas de columnas tipo `location`:
+#   - parquet (dataExtractor.py): listas [x, y(, z)] -> offsets/valores de Arrow
+#   - CSV (fromParquet.py):       texto "[x, y]"      -> regex de Arrow (RE2, en C++)
+# Sin bucles por fila en Python; sólo los textos que no siguen ningún patrón
+# (raros) pasan por el parser genérico parse_xy.
+
+LOCATION_COLUMNS = {
+  "location":           ("x", "y"),
+  "pass_end_location":  ("pass_end_x", "pass_end_y"),
+  "carry_end_location": ("carry_end_x", "carry_end_y"),
+  "shot_end_location":  ("shot_end_x", "shot_end_y"),
+}
+
+_FLOAT = r"[-+]?(?:\d*\.\d+|\d+\.?)(?:[eE][-+]?\d+)?"
+# dos primeros números: prefijo sin dígitos, x, separador sin dígitos/signo/punto, y
+XY_PATTERN = rf"^[^-+0-9.]*(?P<x>{_FLOAT})[^-+0-9.]+(?P<y>{_FLOAT})"
+float_re = re.compile(_FLOAT)
+
+
+def parse_xy(val):
+  """Parser genérico (por fila) de un valor de coordenadas."""
+  if isinstance(val,(list,tuple,np.ndarray)) and len(val)>=2: return float(val[0]), float(val[1])
+  if isinstance(val,str):
+    nums = float_re.findall(val)
+    if len(nums)>=2:
+      try: return float(nums[0]), float(nums[1])
+      except: return (np.nan,np.nan)
+  return (np.nan,np.nan)
+
+
+def _first_two(arr):
+  """Índices (en arr.values) de los 2 primeros elementos de cada lista; -1 si no hay."""
+  lens = pc.fill_null(pc.list_value_length(arr), 0).to_numpy(zero_copy_only=False)
+  starts = arr.offsets.to_numpy(zero_copy_only=False)[:-1].astype(np.int64)
+  return np.where(lens >= 2, starts, -1)
+
+
+def _xy_from_lists(arr):
+  """x, y de un ListArray de Arrow (listas cortas o nulas -> NaN)."""
+  starts = _first_two(arr)
+  values = pc.cast(arr.values, pa.float64()).to_numpy(zero_copy_only=False)
+  ok = starts >= 0
+  x = np.full(len(arr), np.nan); y = np.full(len(arr), np.nan)
+  x[ok] = values[starts[ok]]
+  y[ok] = values[starts[ok] + 1]
+  return x, y
+
+
+def _xy_from_split(arr):
+  """Camino rápido para "[x, y(, z)]": recorta corchetes, separa por comas y castea."""
+  parts = pc.split_pattern(pc.utf8_trim(arr, "[]() "), ",", max_splits=2)
+  starts = _first_two(parts)
+  ok = np.flatnonzero(starts >= 0)
+  idx = pa.array(np.concatenate([starts[ok], starts[ok] + 1]))
+  nums = pc.cast(pc.utf8_trim_whitespace(parts.values.take(idx)), pa.float64())  # ArrowInvalid si no son números
+  nums = nums.to_numpy(zero_copy_only=False)
+  x = np.full(len(arr), np.nan); y = np.full(len(arr), np.nan)
+  x[ok] = nums[:len(ok)]
+  y[ok] = nums[len(ok):]
+  return x, y
+
+
+def _xy_from_regex(arr):
+  parts = pc.extract_regex(arr, XY_PATTERN)
+  x = pc.cast(pc.struct_field(parts, "x"), pa.float64()).to_numpy(zero_copy_only=False)
+  y = pc.cast(pc.struct_field(parts, "y"), pa.float64()).to_numpy(zero_copy_only=False)
+  return x, y
+
+
+def _xy_from_strings(arr):
+  """x, y de un StringArray con listas serializadas ("[60.0, 40.0]", "[60. 40.]")."""
+  try:
+    x, y = _xy_from_split(arr)
+  except pa.ArrowInvalid:
+    x, y = _xy_from_regex(arr)
+
+  # textos no nulos sin resultado (p. ej. repr de numpy sin comas): regex y,
+  # si tampoco, el parser genérico, sólo para esas filas
+  odd = np.flatnonzero((np.isnan(x) | np.isnan(y)) & arr.is_valid().to_numpy(zero_copy_only=False))
+  if len(odd):
+    sub = arr.take(pa.array(odd))
+    sx, sy = _xy_from_regex(sub)
+    rest = np.flatnonzero(np.isnan(sx))
+    for i, val in zip(rest, sub.take(pa.array(rest)).to_pylist()):
+      sx[i], sy[i] = parse_xy(val)
+    x[odd], y[odd] = sx, sy
+  return x, y
+
+
+def extract_xy(values):
+  """
+  Devuelve (x, y) como arrays float64 a partir de una Series/Array de Arrow con
+  listas, textos "[x, y]" o nulos. Columnas mixtas se resuelven por tipo.
+  """
+  if isinstance(values, pa.ChunkedArray):
+    values = values.combine_chunks()
+  if not isinstance(values, pa.Array):
+    s = pd.Series(values)
+    try:
+      values = pa.array(s, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+      # mezcla de listas y textos: se separan y se une el resultado
+      is_str = s.map(type).eq(str).to_numpy()
+      x = np.full(len(s), np.nan); y = np.full(len(s), np.nan)
+      for mask in (is_str, ~is_str):
+        if mask.any():
+          x[mask], y[mask] = extract_xy(s[mask].where(s[mask].notna(), None).reset_index(drop=True))
+      return x, y
+
+  if pa.types.is_null(values.type):
+    return np.full(len(values), np.nan), np.full(len(values), np.nan)
+  if pa.types.is_dictionary(values.type):
+    values = values.dictionary_decode()
+  if pa.types.is_list(values.type) or pa.types.is_large_list(values.type) or pa.types.is_fixed_size_list(values.type):
+    if pa.types.is_fixed_size_list(values.type):
+      values = values.cast(pa.list_(values.type.value_type))
+    return _xy_from_lists(values)
+  if pa.types.is_string(values.type) or pa.types.is_large_string(values.type):
+    return _xy_from_strings(values)
+  raise TypeError(f"tipo de coordenadas no soportado: {values.type}")
+
+
+def add_xy_columns(df, columns=LOCATION_COLUMNS):
+  """Añade columnas numéricas x/y por cada columna de coordenadas presente en df."""
+  new = {}
+  for col, (cx, cy) in columns.items():
+    if col in df.columns and (cx not in df.columns or cy not in df.columns):
+      new[cx], new[cy] = extract_xy(df[col])
+  return df.assign(**new) if new else df
@@ -0,0 +1,77 @@
+import argparse
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from columnarStore import is_team_sorted, save_columnar, sort_by_team
+from featurePipeline import GRID
+
+# Migración única de datasets de entrenamiento generados con versiones
+# anteriores de los transforms. El backend ya no los adapta al cargar (eso
+# copiaba el frame mapeado en cada arranque): o se regeneran con
+# featurePipeline.py o se migran una vez con este script.
+#   - zone_id "zx_zy" -> código entero zx * ny + zy (-1 sin zona)
+#   - sin opponent_id: el rival es el otro equipo del mismo partido. Sólo es
+#     exacto con dos equipos por partido (si no, -1); regenerar desde los
+#     eventos da el rival por posesión.
+#   - filas ordenadas por team_id (lo hace save_columnar al reescribir)
+# Cada archivo (.arrow o .csv legado) se reescribe como .arrow junto al original.
+#
+#   python models/migrateDatasets.py models/source/train_outfield_K8_T15s.arrow \
+#                                    models/source/train_recoveries_K8_T15s.arrow
+
+
+def grid_of(path):
+    """Grilla del dataset según el sufijo _G<nx>x<ny> del nombre (12x8 si no tiene)."""
+    match = re.search(r"_G(\d+)x(\d+)", os.path.basename(path))
+    return (int(match.group(1)), int(match.group(2))) if match else GRID
+
+
+def zone_codes(df, grid):
+    zx = df["zx"].to_numpy().astype(np.int64)
+    zy = df["zy"].to_numpy().astype(np.int64)
+    return np.where((zx >= 0) & (zy >= 0), zx * grid[1] + zy, -1).astype(np.int32)
+
+
+def opponents(df):
+    pairs = df[["match_id", "team_id"]].drop_duplicates().groupby("match_id")["team_id"]
+    total = df["match_id"].map(pairs.sum()).to_numpy()
+    teams = df["match_id"].map(pairs.size()).to_numpy()
+    team_id = df["team_id"].to_numpy().astype(np.int64)
+    return np.where(teams == 2, total - team_id, -1).astype(np.int32)
+
+
+def migrate(df, grid):
+    """Devuelve (df migrado, lista de cambios aplicados)."""
+    changes = []
+    if "zone_id" in df.columns and not pd.api.types.is_integer_dtype(df["zone_id"]):
+        df["zone_id"] = zone_codes(df, grid)
+        changes.append("zone_id -> código entero")
+    if "opponent_id" not in df.columns and {"match_id", "team_id"} <= set(df.columns):
+        df.insert(df.columns.get_loc("team_id") + 1, "opponent_id", opponents(df))
+        unknown = int((df["opponent_id"] < 0).sum())
+        changes.append("opponent_id" + (f" ({unknown} filas sin rival: partidos sin 2 equipos)" if unknown else ""))
+    if "team_id" in df.columns and not is_team_sorted(df["team_id"]):
+        df = sort_by_team(df)
+        changes.append("orden por team_id")
+    return df, changes
+
+
+def migrate_file(path):
+    df = pd.read_feather(path) if path.endswith(".arrow") else pd.read_csv(path, low_memory=False)
+    df, changes = migrate(df, grid_of(path))
+    out_path = os.path.splitext(path)[0] + ".arrow"
+    if changes or not path.endswith(".arrow"):
+        save_columnar(df, out_path)
+    print(f"{path}: {', '.join(changes) or 'sin cambios'} -> {out_path}")
+    return out_path
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("paths", nargs="+", help="datasets train_*.arrow / train_*.csv")
+    args = ap.parse_args()
+    for path in args.paths:
+        migrate_file(path)
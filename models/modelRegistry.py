@@ -0,0 +1,143 @@
+import argparse
+import json
+import joblib
+import os
+import shutil
+import sklearn
+import sys
+import time
+
+from sklearn.ensemble import RandomForestClassifier
+
+from exportModel import export_compiled
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "..", "backend"))
+from services.registry_layout import (
+    COMPILED_FILE, CURRENT_FILE, METADATA_FILE, MODEL_FILE, REGISTRY_FORMAT,
+    current_version as _current_version, model_dir as _model_dir, sha256_file,
+)
+
+# Registro versionado de modelos (lo lee backend/services/model_store.py;
+# layout compartido en backend/services/registry_layout.py):
+#
+#   models/registry/<model_key>/<version>/model.joblib           (sin comprimir)
+#                                         model.compiled.joblib  (sólo forests)
+#                                         metadata.json
+#   models/registry/<model_key>/CURRENT                          (versión activa)
+#
+# Cada versión se escribe en un directorio temporal y se renombra entera; el
+# puntero CURRENT se reemplaza con os.replace. El backend detecta el cambio y
+# cambia de modelo sin reiniciar (hot reload). Los joblib van sin comprimir
+# para poder abrirlos con joblib.load(mmap_mode="r").
+#
+#   python models/modelRegistry.py list turnover
+#   python models/modelRegistry.py publish turnover models/joblib/risk_model_rf.joblib
+#   python models/modelRegistry.py activate turnover 20261018-140325-ab12cd34
+
+REGISTRY_DIR = os.getenv("MODEL_STORE_DIR", os.path.join(BASE_DIR, "registry"))
+
+
+def model_dir(model_key, registry_dir=REGISTRY_DIR):
+    return _model_dir(registry_dir, model_key)
+
+
+def current_version(model_key, registry_dir=REGISTRY_DIR):
+    return _current_version(registry_dir, model_key)
+
+
+def activate(model_key, version, registry_dir=REGISTRY_DIR):
+    """Apunta CURRENT a una versión existente (publicar o hacer rollback)."""
+    root = model_dir(model_key, registry_dir)
+    if not os.path.exists(os.path.join(root, version, METADATA_FILE)):
+        raise FileNotFoundError(f"No existe la versión {version} de '{model_key}'")
+    tmp = os.path.join(root, CURRENT_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp, os.path.join(root, CURRENT_FILE))
+    return version
+
+
+def list_versions(model_key, registry_dir=REGISTRY_DIR):
+    """Metadatos de cada versión publicada, de la más vieja a la más nueva."""
+    root = model_dir(model_key, registry_dir)
+    if not os.path.isdir(root):
+        return []
+    out = []
+    for version in sorted(os.listdir(root)):
+        meta_path = os.path.join(root, version, METADATA_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                out.append(json.load(f))
+    return out
+
+
+def publish(model_key, clf, metadata=None, registry_dir=REGISTRY_DIR, make_current=True):
+    """
+    Guarda el pipeline entrenado como nueva versión de model_key con sus
+    metadatos (features, configuración, métricas) y checksums. Devuelve la versión.
+    """
+    root = model_dir(model_key, registry_dir)
+    os.makedirs(root, exist_ok=True)
+    tmp_dir = os.path.join(root, f".tmp-{os.getpid()}-{time.time_ns()}")
+    os.makedirs(tmp_dir)
+    try:
+        model_path = os.path.join(tmp_dir, MODEL_FILE)
+        joblib.dump(clf, model_path, compress=0)
+        files = {MODEL_FILE: sha256_file(model_path)}
+        if isinstance(clf.named_steps["mdl"], RandomForestClassifier):
+            compiled_path = export_compiled(clf, os.path.join(tmp_dir, COMPILED_FILE))
+            files[COMPILED_FILE] = sha256_file(compiled_path)
+
+        version = f"{time.strftime('%Y%m%d-%H%M%S')}-{files[MODEL_FILE][:8]}"
+        meta = {
+            "format": REGISTRY_FORMAT,
+            "model_key": model_key,
+            "version": version,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "sklearn_version": sklearn.__version__,
+            "estimator": type(clf.named_steps["mdl"]).__name__,
+            "files": files,
+            **(metadata or {}),
+        }
+        with open(os.path.join(tmp_dir, METADATA_FILE), "w") as f:
+            json.dump(meta, f, indent=2, default=str)
+        os.rename(tmp_dir, os.path.join(root, version))
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    if make_current:
+        activate(model_key, version, registry_dir)
+    return version
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_list = sub.add_parser("list", help="versiones publicadas")
+    p_list.add_argument("model_key")
+    p_pub = sub.add_parser("publish", help="publica un joblib ya entrenado")
+    p_pub.add_argument("model_key")
+    p_pub.add_argument("model_path")
+    p_pub.add_argument("--no-activate", action="store_true")
+    p_act = sub.add_parser("activate", help="cambia la versión activa (rollback)")
+    p_act.add_argument("model_key")
+    p_act.add_argument("version")
+    ap.add_argument("--registry", default=REGISTRY_DIR)
+    args = ap.parse_args()
+
+    if args.cmd == "list":
+        active = current_version(args.model_key, args.registry)
+        for meta in list_versions(args.model_key, args.registry):
+            mark = "*" if meta["version"] == active else " "
+            metrics = meta.get("metrics", {})
+            print(f"{mark} {meta['version']}  {meta.get('estimator')}  "
+                  f"AUC={metrics.get('auc', float('nan')):.3f}  AP={metrics.get('ap', float('nan')):.3f}")
+    elif args.cmd == "publish":
+        clf = joblib.load(args.model_path)
+        version = publish(args.model_key, clf, {"source": os.path.abspath(args.model_path)},
+                          args.registry, not args.no_activate)
+        print("Versión publicada:", version)
+    else:
+        print("Versión activa:", activate(args.model_key, args.version, args.registry))
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# los módulos de models/ (y data/dataExtractor.py) se importan como scripts sueltos (sin paquete)
+MODELS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MODELS_DIR)
+sys.path.insert(0, os.path.join(MODELS_DIR, "..", "data"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,256 @@
+import pandas as pd, numpy as np, re
+
+# Oráculo de los transforms: versión en funciones de los scripts originales
+# (bucles por posesión / por partido), sin cambios de lógica. Sólo lo usan los
+# tests de equivalencia para comparar fila a fila con featurePipeline.py.
+
+TIME_WINDOW_S = 15
+XBINS, YBINS  = 12, 8
+BACK_LOOK     = 6
+K_LOOKBACK    = 8
+
+NUMERIC_KEEP = ["pass_length","pass_angle"]
+CAT_KEEP     = ["play_pattern","pass_height","pass_type","pass_outcome",
+                "dribble_outcome","duel_type","duel_outcome"]
+FLAG_KEEP    = ["under_pressure","counterpress","dribble_overrun","dribble_no_touch",
+                "pass_cross","pass_cut_back","pass_switch","pass_through_ball","pass_straight"]
+
+
+# ---------- 1-3) Cargar + ordenar, coordenadas, porteras/os ----------
+float_re = re.compile(r"[-+]?(?:\d*\.\d+|\d+\.?)(?:[eE][-+]?\d+)?")
+def parse_xy(val):
+  if isinstance(val,(list,tuple)) and len(val)>=2: return float(val[0]), float(val[1])
+  if isinstance(val,str):
+    nums = float_re.findall(val)
+    if len(nums)>=2:
+      try: return float(nums[0]), float(nums[1])
+      except: return (np.nan,np.nan)
+  return (np.nan,np.nan)
+
+
+def legacy_load(path):
+  df = pd.read_csv(path, low_memory=False)
+  df = df.sort_values(["match_id","period","index"], kind="mergesort").reset_index(drop=True)
+
+  for c in ["match_id","period","team_id","possession","possession_team_id","player_id","index"]:
+    if c in df.columns:
+      df[c] = pd.to_numeric(df[c], errors="coerce")
+  df["minute"] = pd.to_numeric(df["minute"], errors="coerce")
+  df["second"] = pd.to_numeric(df["second"], errors="coerce")
+  df["t"] = df["minute"]*60 + df["second"]
+
+  if "x" not in df.columns or "y" not in df.columns:
+    xy = df.get("location", pd.Series([None]*len(df))).apply(parse_xy)
+    df["x"] = [a for a,b in xy]; df["y"] = [b for a,b in xy]
+
+  pos_str = df.get("position", pd.Series(index=df.index, dtype="object")).astype(str).str.lower()
+  df["is_gk_event"]  = pos_str.str.contains("goalkeeper", na=False)
+  is_gk_by_player = df.groupby("player_id")["is_gk_event"].max().rename("is_gk_player")
+  df["is_gk_player"] = df["player_id"].map(is_gk_by_player).fillna(False)
+  df["is_gk"] = df["is_gk_event"] | df["is_gk_player"]
+
+  return df.drop(columns=[c for c in df.columns if c.startswith("goalkeeper_")], errors="ignore")
+
+
+def _anchor_columns(df):
+  return ["match_id","period","possession","index","team_id","t","minute","x","y","type"] \
+         + [c for c in NUMERIC_KEEP if c in df.columns] \
+         + [c for c in CAT_KEEP     if c in df.columns] \
+         + [c for c in FLAG_KEEP    if c in df.columns]
+
+
+def _finish(anchor_tbl):
+  """Pasos 8-9: bins 12x8, zone_id "zx_zy", columnas finales y rellenos."""
+  anchor_tbl = anchor_tbl.rename(columns={"x":"ax","y":"ay","minute":"a_minute","type":"a_type"})
+  xbins = np.linspace(0,120, XBINS+1); ybins = np.linspace(0,80, YBINS+1)
+  anchor_tbl["zx"] = pd.cut(anchor_tbl["ax"], xbins, labels=False, include_lowest=True)
+  anchor_tbl["zy"] = pd.cut(anchor_tbl["ay"], ybins, labels=False, include_lowest=True)
+  anchor_tbl["zone_id"] = anchor_tbl["zx"].astype("Int64").astype(str) + "_" + anchor_tbl["zy"].astype("Int64").astype(str)
+
+  final_cols = [
+    "match_id","period","possession","team_id",
+    "ax","ay","zx","zy","zone_id","a_minute","a_type","y_shot"
+  ]
+  final_cols += [c for c in NUMERIC_KEEP if c in anchor_tbl.columns]
+  final_cols += [c for c in CAT_KEEP     if c in anchor_tbl.columns]
+  final_cols += [c for c in FLAG_KEEP    if c in anchor_tbl.columns]
+  df_train = anchor_tbl[final_cols].copy()
+
+  num_cols = ["ax","ay","zx","zy","a_minute"] + [c for c in NUMERIC_KEEP if c in df_train.columns]
+  for c in num_cols:
+    df_train[c] = pd.to_numeric(df_train[c], errors="coerce").fillna(-1)
+
+  for c in [c for c in CAT_KEEP + ["a_type"] if c in df_train.columns]:
+    df_train[c] = df_train[c].astype(str)
+    df_train.loc[df_train[c].isin(["nan","None","NaN"]) | df_train[c].isna(), c] = "Missing"
+
+  for c in [c for c in FLAG_KEEP if c in df_train.columns]:
+    df_train[c] = pd.to_numeric(df_train[c], errors="coerce").fillna(0).astype(int)
+
+  df_train["y_shot"] = df_train["y_shot"].fillna(0).astype(int)
+  return df_train
+
+
+# ---------- transformData1.py: pérdidas -> tiro rival ----------
+def legacy_outfield(df, k=K_LOOKBACK, time_window_s=TIME_WINDOW_S):
+  gpos = df.groupby(["match_id","period","possession"], sort=False, observed=True)
+
+  pos_core = gpos.agg(
+      end_index=("index","max"),
+      end_time=("t","max"),
+      pos_team=("possession_team_id","first")
+  ).reset_index()
+
+  def last_outfield_with_xy(gr):
+    out = gr[~gr["is_gk"]].sort_values("index")
+    if out.empty:
+      return pd.Series({"idx_outfield": np.nan, "loss_x": np.nan, "loss_y": np.nan, "end_minute_evt": np.nan})
+    tail = out.tail(BACK_LOOK).iloc[::-1]
+    idx_used = np.nan; lx = ly = np.nan
+    for _, r in tail.iterrows():
+      if pd.notna(r.get("x")) and pd.notna(r.get("y")):
+        lx, ly = float(r["x"]), float(r["y"]); idx_used = r["index"]; break
+    if np.isnan(idx_used):
+      idx_used = float(out["index"].iloc[-1])
+    end_minute_evt = out[out["index"]==idx_used]["minute"].iloc[-1] if not np.isnan(idx_used) else np.nan
+    return pd.Series({"idx_outfield": idx_used, "loss_x": lx, "loss_y": ly, "end_minute_evt": end_minute_evt})
+
+  pos_out = gpos.apply(last_outfield_with_xy).reset_index()
+  pos_tbl = pos_core.merge(pos_out, on=["match_id","period","possession"], how="left")
+
+  pos_tbl = pos_tbl.sort_values(["match_id","period","possession"], kind="mergesort")
+  pos_tbl["next_pos_team"] = pos_tbl.groupby(["match_id","period"])["pos_team"].shift(-1)
+  turn = pos_tbl[(pos_tbl["next_pos_team"].notna()) &
+                 (pos_tbl["next_pos_team"] != pos_tbl["pos_team"])].copy()
+
+  shots = df[df["type"].eq("Shot")][["match_id","period","team_id","t"]].rename(
+      columns={"team_id":"shot_team_id","t":"t_shot"}
+  )
+
+  def first_opp_shot(gt, gs):
+    if gt.empty: return gt.assign(t_shot=np.nan, shot_team_id=np.nan)
+    if gs.empty: return gt.assign(t_shot=np.nan, shot_team_id=np.nan)
+    gt = gt.sort_values("end_time", kind="mergesort").reset_index(drop=True)
+    gs = gs.sort_values("t_shot",   kind="mergesort").reset_index(drop=True)
+    t0  = gt["end_time"].to_numpy()
+    tm0 = pd.to_numeric(gt["pos_team"], errors="coerce").to_numpy()
+    tS  = gs["t_shot"].to_numpy()
+    tmS = pd.to_numeric(gs["shot_team_id"], errors="coerce").to_numpy()
+    idx = np.searchsorted(tS, t0, side="left")
+    out_t = np.full(len(gt), np.nan); out_tm = np.full(len(gt), np.nan)
+    for i in range(len(gt)):
+      j = idx[i]
+      while j < len(tS) and (tmS[j] == tm0[i] or np.isnan(tmS[j])): j += 1
+      if j < len(tS): out_t[i], out_tm[i] = tS[j], tmS[j]
+    return gt.assign(t_shot=out_t, shot_team_id=out_tm)
+
+  res = []
+  for key, gt in turn.groupby(["match_id","period"], sort=False):
+    gs = shots[(shots["match_id"]==key[0]) & (shots["period"]==key[1])]
+    res.append(first_opp_shot(gt, gs))
+  losses = pd.concat(res, ignore_index=True) if res else pd.DataFrame(columns=list(turn.columns)+["t_shot","shot_team_id"])
+  losses["dt"] = losses["t_shot"] - losses["end_time"]
+  losses["y_shot"] = ((losses["dt"] >= 0) & (losses["dt"] <= time_window_s)).astype(int)
+
+  cols_for_anchor = _anchor_columns(df)
+  outfield = df[~df["is_gk"]][cols_for_anchor].copy()
+
+  anchors = []
+  for (mid, per, pos), g in outfield.groupby(["match_id","period","possession"], sort=False):
+    g = g.sort_values("index")
+    tail = g.tail(k)
+    if tail.empty:
+        continue
+    anchors.append(tail.assign(match_id=mid, period=per, possession=pos))
+
+  anchors = pd.concat(anchors, ignore_index=True) if anchors else pd.DataFrame(columns=cols_for_anchor)
+
+  anchor_tbl = anchors.merge(
+    losses[["match_id","period","possession","y_shot"]],
+    on=["match_id","period","possession"], how="inner"
+  )
+  return _finish(anchor_tbl)
+
+
+# ---------- transformData2.py: recuperaciones -> tiro propio ----------
+def legacy_recoveries(df, k=K_LOOKBACK, time_window_s=TIME_WINDOW_S):
+  gpos = df.groupby(["match_id","period","possession"], sort=False, observed=True)
+
+  pos_core = gpos.agg(
+    start_index=("index","min"),
+    start_time=("t","min"),
+    pos_team=("possession_team_id","first")
+  ).reset_index()
+
+  pos_tbl = pos_core.sort_values(["match_id","period","possession"], kind="mergesort")
+  pos_tbl["prev_pos_team"] = pos_tbl.groupby(["match_id","period"])["pos_team"].shift(1)
+
+  recoveries = pos_tbl[(pos_tbl["prev_pos_team"].notna()) &
+                       (pos_tbl["prev_pos_team"] != pos_tbl["pos_team"])].copy()
+
+  shots = df[df["type"].eq("Shot")][["match_id","period","team_id","t"]].rename(
+    columns={"team_id":"shot_team_id","t":"t_shot"}
+  )
+
+  def first_own_shot_after(gt, gs):
+    if gt.empty:
+        return gt.assign(t_shot=np.nan, shot_team_id=np.nan)
+    if gs.empty:
+        return gt.assign(t_shot=np.nan, shot_team_id=np.nan)
+
+    gt = gt.sort_values("start_time", kind="mergesort").reset_index(drop=True)
+    gs = gs.sort_values("t_shot",   kind="mergesort").reset_index(drop=True)
+
+    t0   = gt["start_time"].to_numpy()
+    team = pd.to_numeric(gt["pos_team"], errors="coerce").to_numpy()
+    tS   = gs["t_shot"].to_numpy()
+    tmS  = pd.to_numeric(gs["shot_team_id"], errors="coerce").to_numpy()
+
+    idx = np.searchsorted(tS, t0, side="left")
+    out_t  = np.full(len(gt), np.nan)
+    out_tm = np.full(len(gt), np.nan)
+
+    for i in range(len(gt)):
+      j = idx[i]
+      while j < len(tS) and (tmS[j] != team[i] or np.isnan(tmS[j])):
+        j += 1
+      if j < len(tS):
+        out_t[i]  = tS[j]
+        out_tm[i] = tmS[j]
+
+    return gt.assign(t_shot=out_t, shot_team_id=out_tm)
+
+  res = []
+  g_rec = recoveries.groupby(["match_id","period"], sort=False)
+  gshot = shots.groupby(["match_id","period"], sort=False)
+
+  for key, gt in g_rec:
+    gs = gshot.get_group(key) if key in gshot.groups else pd.DataFrame(columns=["t_shot","shot_team_id"])
+    res.append(first_own_shot_after(gt, gs))
+
+  rec_df = pd.concat(res, ignore_index=True) if res else pd.DataFrame(columns=list(recoveries.columns)+["t_shot","shot_team_id"])
+  rec_df["dt"] = rec_df["t_shot"] - rec_df["start_time"]
+  rec_df["y_shot"] = ((rec_df["dt"] >= 0) & (rec_df["dt"] <= time_window_s)).astype(int)
+
+  cols_for_anchor = _anchor_columns(df)
+  outfield = df[~df["is_gk"]][cols_for_anchor].copy()
+
+  anchors = []
+  for (mid, per, pos), g in outfield.groupby(["match_id","period","possession"], sort=False):
+    g = g.sort_values("index")
+    head = g.head(k)
+    if head.empty:
+        continue
+    anchors.append(head)
+
+  anchors = pd.concat(anchors, ignore_index=True) if anchors else pd.DataFrame(columns=cols_for_anchor)
+
+  anchor_tbl = anchors.merge(
+    rec_df[["match_id","period","possession","y_shot"]],
+    on=["match_id","period","possession"],
+    how="inner"
+  )
+  return _finish(anchor_tbl)
+
+
+LEGACY = {"outfield": legacy_outfield, "recoveries": legacy_recoveries}
@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from dataExtractor import OpenDataSource, fetch_match, flatten_events
+from featurePipeline import EVENT_COLUMNS, load_events
+from locationParser import LOCATION_COLUMNS
+
+# El aplanado propio de dataExtractor.py debe producir las mismas columnas que
+# sb.events de statsbombpy (el formato de events_all_37_90.csv) para todo lo
+# que leen las transformaciones. Se comprueba sin red sobre un JSON de eventos
+# guardado (fixtures/statsbomb_events_sample.json, un partido con los tipos de
+# evento y campos que usa featurePipeline.py).
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       "fixtures", "statsbomb_events_sample.json")
+MATCH_ID = 3788741
+
+# columnas de EVENT_COLUMNS que vienen del JSON (x/y se derivan de location)
+RAW_COLUMNS = [c for c in EVENT_COLUMNS if c not in ("x", "y")]
+
+
+def _raw_events():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_flatten_tiene_las_columnas_de_las_transformaciones():
+    df = flatten_events(_raw_events(), MATCH_ID)
+    assert [c for c in RAW_COLUMNS if c not in df.columns] == []
+    # columnas con nombre e id, como statsbombpy
+    for col in ["type", "team", "possession_team", "player", "position", "play_pattern"]:
+        assert f"{col}_id" in df.columns
+    assert "goalkeeper_type" in df.columns
+
+
+def test_flatten_valores():
+    df = flatten_events(_raw_events(), MATCH_ID).set_index("index")
+    assert (df["match_id"] == MATCH_ID).all()
+
+    pass_a, pass_b = df.loc[2], df.loc[8]
+    assert pass_a["type"] == "Pass" and pass_a["type_id"] == 30
+    assert pass_a["team_id"] == 749 and pass_a["possession_team_id"] == 749
+    assert pass_a["player_id"] == 11 and pass_a["position"] == "Center Defensive Midfield"
+    assert pass_a["play_pattern"] == "From Kick Off"
+    assert pass_a["pass_length"] == 20.5 and pass_a["pass_angle"] == -0.3
+    assert pass_a["pass_height"] == "Ground Pass" and pass_a["pass_type"] == "Kick Off"
+    assert pass_a["pass_end_location"] == [80.0, 34.0]
+    assert pd.isna(pass_a["pass_outcome"]) and pd.isna(pass_a["pass_cross"])
+    assert pass_b["pass_outcome"] == "Incomplete"
+    for flag in ["pass_cross", "pass_cut_back", "pass_switch", "pass_through_ball", "pass_straight"]:
+        assert pass_b[flag] is True
+
+    assert df.loc[3, "carry_end_location"] == [92.5, 20.1]
+    assert df.loc[4, "counterpress"] is True
+    assert df.loc[5, "under_pressure"] is True
+    assert df.loc[5, "dribble_outcome"] == "Incomplete"
+    assert df.loc[5, "dribble_overrun"] is True and df.loc[5, "dribble_no_touch"] is True
+    assert df.loc[6, "duel_type"] == "Tackle" and df.loc[6, "duel_outcome"] == "Won"
+    assert df.loc[9, "shot_end_location"] == [120.0, 39.5, 1.2]
+    assert df.loc[10, "goalkeeper_type"] == "Shot Saved"
+
+    # listas de objetos se guardan como texto JSON
+    lineup = json.loads(df.loc[1, "tactics_lineup"])
+    assert lineup[0]["position"]["name"] == "Goalkeeper"
+    assert json.loads(df.loc[9, "shot_freeze_frame"])[0]["teammate"] is False
+
+
+def test_parquet_del_extractor_se_carga_en_el_pipeline(tmp_path):
+    # fuente local con la estructura de open-data
+    events_dir = tmp_path / "open-data" / "events"
+    events_dir.mkdir(parents=True)
+    shutil.copy(FIXTURE, events_dir / f"{MATCH_ID}.json")
+    out_dir = tmp_path / "events_37_90"
+    out_dir.mkdir()
+
+    n = fetch_match(OpenDataSource(str(tmp_path / "open-data")), MATCH_ID, str(out_dir))
+    assert n == len(_raw_events())
+
+    df = load_events(str(out_dir))
+    assert len(df) == n
+    assert df["index"].tolist() == sorted(df["index"])
+    assert {"x", "y", "t", "is_gk"} <= set(df.columns)
+    assert not any(c.startswith("goalkeeper_") for c in df.columns)
+    for col in LOCATION_COLUMNS:
+        assert col not in df.columns
+
+    df = df.set_index("index")
+    np.testing.assert_allclose(df.loc[2, ["x", "y", "pass_end_x", "pass_end_y"]].astype(float),
+                               [60.0, 40.0, 80.0, 34.0])
+    np.testing.assert_allclose(df.loc[3, ["carry_end_x", "carry_end_y"]].astype(float), [92.5, 20.1])
+    assert np.isnan(df.loc[1, "x"])  # Starting XI sin location
+    assert df.loc[9, "t"] == 12
+    assert df["type"].dtype == "category"
+    # portera por posición en el evento y, para el resto de sus eventos, por jugadora
+    assert df.loc[10, "is_gk"] and not df.loc[11, "is_gk"]
@@ -0,0 +1,367 @@
+import pandas as pd
+import numpy as np
+
+from sklearn.model_selection import GroupKFold
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
+from sklearn.metrics import roc_auc_score, average_precision_score
+from sklearn.utils.class_weight import compute_class_weight
+from joblib import Memory, Parallel, delayed, parallel_config
+import argparse
+import itertools
+import joblib
+import time
+import os
+
+from exportModel import export_compiled, compiled_path_for
+from modelRegistry import publish
+
+# Entrenamiento compartido por trainModel1.py / trainModel2.py:
+#   - GroupKFold por partido; folds x grilla de hiperparámetros en paralelo
+#     (pool de procesos de joblib/loky)
+#   - n_jobs anidado: workers externos x hebras del forest <= CPUs
+#   - preprocesador (ColumnTransformer) ajustado UNA vez por fold y cacheado en
+#     disco (joblib.Memory): cada combinación de parámetros sólo ajusta el forest
+#   - tabla de resultados con tiempos de fit/predict junto a AUC/AP
+#   - varios backends de modelo (BACKENDS): el forest original, un forest
+#     acotado en tamaño y HistGradientBoosting con categóricas nativas
+#   - el modelo final se publica como nueva versión en models/registry/
+#     (modelRegistry.py) con features, configuración y métricas de la CV
+#
+#   python models/trainPipeline.py outfield --param n_estimators=100,300,500 \
+#       --param min_samples_leaf=1,2,5 --param max_depth=None,20 --workers 4
+#   python models/trainPipeline.py outfield --backend hgb --param learning_rate=0.05,0.1
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = os.path.join(BASE_DIR, "source")
+MODELS_DIR = os.path.join(BASE_DIR, "joblib")
+REPORTS_DIR = os.path.join(BASE_DIR, "reports")
+CACHE_DIR = os.getenv("TRAIN_CACHE_DIR", os.path.join(SOURCE_DIR, "cache", "cv"))
+
+DATASETS = {
+    "outfield":   ("train_outfield_K8_T15s.arrow",   "risk_model_rf.joblib"),
+    "recoveries": ("train_recoveries_K8_T15s.arrow", "recovery_risk_model_rf.joblib"),
+}
+# dataset -> clave del modelo en el backend (MODEL_REGISTRY / models/registry/)
+MODEL_KEYS = {"outfield": "turnover", "recoveries": "recovery"}
+
+# --- Features: num / cat / flags (todas robustas) ---
+NUM = ["ax","ay","zx","zy","a_minute","period","pass_length","pass_angle"]
+CAT = ["a_type","play_pattern","pass_height","pass_type","pass_outcome",
+       "dribble_outcome","duel_type","duel_outcome","zone_id","team_id"]
+BIN = ["under_pressure","counterpress","dribble_overrun","dribble_no_touch",
+       "pass_cross","pass_cut_back","pass_switch","pass_through_ball","pass_straight"]
+
+# backend -> codificación de categóricas + hiperparámetros por defecto
+BACKENDS = {
+    # forest original: 500 árboles sin límite de profundidad (artefacto grande)
+    "rf": {"encoding": "onehot",
+           "params": {"n_estimators": 500, "max_depth": None, "min_samples_leaf": 2}},
+    # forest acotado: menos árboles, profundidad y hojas limitadas
+    "rf_compact": {"encoding": "onehot",
+                   "params": {"n_estimators": 100, "max_depth": 12, "min_samples_leaf": 20}},
+    # gradient boosting por histogramas: categóricas nativas (códigos ordinales)
+    # y numéricas con NaN sin imputar
+    "hgb": {"encoding": "ordinal",
+            "params": {"max_iter": 300, "learning_rate": 0.05, "max_leaf_nodes": 31,
+                       "min_samples_leaf": 40, "l2_regularization": 1.0}},
+}
+DEFAULT_BACKEND = "rf"
+DEFAULT_PARAMS = BACKENDS[DEFAULT_BACKEND]["params"]
+HGB_MAX_CATEGORIES = 255  # HistGradientBoosting admite códigos < max_bins (255)
+N_SPLITS = 5
+RANDOM_STATE = 7
+
+memory = Memory(CACHE_DIR, verbose=0)
+
+
+# === 1) Datos ===
+def load_training_data(data_path):
+    """df, features (num, cat, binf), y, grupos por partido."""
+    df = pd.read_feather(data_path)
+    num = [c for c in NUM if c in df.columns]
+    cat = [c for c in CAT if c in df.columns]
+    binf = [c for c in BIN if c in df.columns]
+    y = df["y_shot"].astype(int).values
+    groups = df["match_id"].values if "match_id" in df.columns else np.arange(len(df))
+    return df, (num, cat, binf), y, groups
+
+
+def file_fingerprint(path):
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+
+
+# === 2) Preprocesador y clasificador ===
+def make_preprocessor(num, cat, binf, encoding="onehot"):
+    if encoding == "ordinal":
+        # numéricas sin imputar (el boosting trata los NaN de forma nativa);
+        # categorías desconocidas -> NaN
+        return ColumnTransformer([
+            ("num", "passthrough", num),
+            ("cat", Pipeline([
+                ("imp", SimpleImputer(strategy="most_frequent")),
+                ("ord", OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=np.nan,
+                                       max_categories=HGB_MAX_CATEGORIES))
+            ]), cat),
+            ("bin", SimpleImputer(strategy="constant", fill_value=0), binf)
+        ], remainder="drop")
+    return ColumnTransformer([
+        ("num", SimpleImputer(strategy="median"), num),
+        ("cat", Pipeline([
+            ("imp", SimpleImputer(strategy="most_frequent")),
+            ("ohe", OneHotEncoder(handle_unknown="ignore"))
+        ]), cat),
+        ("bin", SimpleImputer(strategy="constant", fill_value=0), binf)
+    ], remainder="drop")
+
+
+def balanced_class_weight(y):
+    """Pesos 'balanced' (la clase positiva es rara)."""
+    cw = compute_class_weight(class_weight="balanced", classes=np.array([0,1]), y=y)
+    return {0: float(cw[0]), 1: float(cw[1])}
+
+
+def make_estimator(backend, features, params, class_weight, n_jobs=-1):
+    params = {**BACKENDS[backend]["params"], **params}
+    if backend == "hgb":
+        # el ColumnTransformer deja las categóricas justo después de las numéricas
+        num, cat, _ = features
+        return HistGradientBoostingClassifier(
+            **params,
+            categorical_features=list(range(len(num), len(num) + len(cat))) or None,
+            class_weight=class_weight,
+            random_state=RANDOM_STATE
+        )
+    return RandomForestClassifier(
+        **params,
+        n_jobs=n_jobs,
+        class_weight=class_weight,
+        random_state=RANDOM_STATE
+    )
+
+
+def make_model(features, params, class_weight, n_jobs=-1, backend=DEFAULT_BACKEND):
+    return Pipeline([("prep", make_preprocessor(*features, encoding=BACKENDS[backend]["encoding"])),
+                     ("mdl", make_estimator(backend, features, params, class_weight, n_jobs))])
+
+
+# === 3) Folds con preprocesador cacheado ===
+@memory.cache(ignore=["data_path"])
+def _prepared_fold(data_path, fingerprint, features, n_splits, fold, encoding):
+    """Ajusta el preprocesador en el train del fold y transforma train/test (cacheado en disco)."""
+    df, _, y, groups = load_training_data(data_path)
+    tr, te = list(GroupKFold(n_splits=n_splits).split(df, y, groups))[fold]
+    cols = [c for block in features for c in block]
+    pre = make_preprocessor(*features, encoding=encoding)
+    t0 = time.perf_counter()
+    Xtr = pre.fit_transform(df.iloc[tr][cols], y[tr])
+    prep_s = time.perf_counter() - t0
+    Xte = pre.transform(df.iloc[te][cols])
+    return {"pre": pre, "Xtr": Xtr, "ytr": y[tr], "Xte": Xte, "yte": y[te], "prep_s": prep_s}
+
+
+def prepared_fold(data_path, features, n_splits, fold, encoding="onehot"):
+    return _prepared_fold(data_path, file_fingerprint(data_path), features, n_splits, fold, encoding)
+
+
+def _run_task(data_path, features, n_splits, fold, combo, params, class_weight, n_jobs, backend):
+    f = prepared_fold(data_path, features, n_splits, fold, BACKENDS[backend]["encoding"])
+    mdl = make_estimator(backend, features, params, class_weight, n_jobs)
+    t0 = time.perf_counter()
+    mdl.fit(f["Xtr"], f["ytr"])
+    fit_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    p = mdl.predict_proba(f["Xte"])[:,1]
+    predict_s = time.perf_counter() - t0
+    return {
+        "combo": combo, **params,
+        "fold": fold,
+        "auc": roc_auc_score(f["yte"], p),
+        "ap": average_precision_score(f["yte"], p),
+        "prep_s": round(f["prep_s"], 4),
+        "fit_s": round(fit_s, 4),
+        "predict_s": round(predict_s, 4),
+        "predict_ms_per_1k": round(1000 * predict_s / max(len(p), 1) * 1000, 4),
+        "n_train": len(f["ytr"]), "n_test": len(p),
+    }
+
+
+def split_jobs(n_tasks, workers=None, cpus=None):
+    """(workers externos, n_jobs del forest) sin sobre-suscribir las CPUs."""
+    cpus = cpus or os.cpu_count() or 1
+    workers = max(1, min(workers or cpus, n_tasks, cpus))
+    return workers, max(1, cpus // workers)
+
+
+def default_grid(backend=DEFAULT_BACKEND):
+    return {k: [v] for k, v in BACKENDS[backend]["params"].items()}
+
+
+def param_grid(grid):
+    """{"n_estimators": [100, 500], ...} -> lista de dicts (producto cartesiano)."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def cross_validate(data_path, grid=None, n_splits=N_SPLITS, workers=None, backend=DEFAULT_BACKEND):
+    """
+    Corre folds x combinaciones en paralelo. Devuelve (combinaciones,
+    resultados por fold, resumen por combinación ordenado por AUC).
+    """
+    _, features, y, _ = load_training_data(data_path)
+    class_weight = balanced_class_weight(y)
+    combos = param_grid(grid or default_grid(backend))
+    encoding = BACKENDS[backend]["encoding"]
+
+    # preprocesadores de cada fold: se ajustan una vez antes de repartir tareas
+    workers_pre, _ = split_jobs(n_splits, workers)
+    Parallel(n_jobs=workers_pre)(
+        delayed(prepared_fold)(data_path, features, n_splits, fold, encoding) for fold in range(n_splits)
+    )
+
+    tasks = [(fold, i) for i in range(len(combos)) for fold in range(n_splits)]
+    n_workers, inner = split_jobs(len(tasks), workers)
+    with parallel_config(backend="loky", inner_max_num_threads=inner):
+        rows = Parallel(n_jobs=n_workers)(
+            delayed(_run_task)(data_path, features, n_splits, fold, i, combos[i], class_weight, inner, backend)
+            for fold, i in tasks
+        )
+
+    results = pd.DataFrame(rows)
+    for k in combos[0]:  # valores tal cual (None, enteros) en vez de NaN/float
+        results[k] = pd.Series([combos[i][k] for i in results["combo"]], dtype=object)
+    summary = (results.groupby("combo", sort=False)
+               .agg(auc=("auc", "mean"), auc_std=("auc", "std"), ap=("ap", "mean"), ap_std=("ap", "std"),
+                    fit_s=("fit_s", "mean"), predict_ms_per_1k=("predict_ms_per_1k", "mean"))
+               .reset_index())
+    params = pd.DataFrame(combos, dtype=object)
+    summary = (params.join(summary.set_index("combo"))
+               .rename_axis("combo").reset_index()
+               .sort_values("auc", ascending=False, kind="mergesort"))
+    return combos, results, summary
+
+
+def write_report(results, summary, name):
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    folds_path = os.path.join(REPORTS_DIR, f"cv_{name}_{stamp}_folds.csv")
+    summary_path = os.path.join(REPORTS_DIR, f"cv_{name}_{stamp}.csv")
+    results.to_csv(folds_path, index=False)
+    summary.to_csv(summary_path, index=False)
+    return summary_path
+
+
+# === 4) Modelo final ===
+def model_file(dataset, backend=DEFAULT_BACKEND):
+    """risk_model_rf.joblib -> risk_model_<backend>.joblib"""
+    return DATASETS[dataset][1].replace("_rf.joblib", f"_{backend}.joblib")
+
+
+def fit_final(data_path, model_path, params=None, backend=DEFAULT_BACKEND):
+    """Entrena con todos los datos y guarda joblib + versión compilada (forests)."""
+    df, features, y, _ = load_training_data(data_path)
+    clf = make_model(features, params or {}, balanced_class_weight(y), backend=backend)
+    clf.fit(df[[c for block in features for c in block]], y)
+
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    joblib.dump(clf, model_path)
+    print("Modelo guardado en:", model_path)
+
+    compiled_path = compiled_path_for(model_path)
+    if isinstance(clf.named_steps["mdl"], RandomForestClassifier):
+        # Versión aplanada para el motor compilado del backend
+        export_compiled(clf, compiled_path)
+        print("Modelo compilado guardado en:", compiled_path)
+    elif os.path.exists(compiled_path):
+        # un compilado viejo junto a otro tipo de modelo lo taparía en el backend
+        os.remove(compiled_path)
+    return clf
+
+
+def model_metadata(clf, dataset, backend, params, best, data_path, n_splits):
+    """Features, configuración de entrenamiento y métricas de CV para el registro."""
+    features = {name: list(cols) for name, _, cols in clf.named_steps["prep"].transformers_
+                if name != "remainder"}
+    return {
+        "dataset": dataset,
+        "backend": backend,
+        "features": features,
+        "params": params,
+        "training": {
+            "data_path": os.path.abspath(data_path),
+            "data_fingerprint": file_fingerprint(data_path),
+            "n_splits": n_splits,
+            "random_state": RANDOM_STATE,
+        },
+        "metrics": {k: float(best[k]) for k in ("auc", "auc_std", "ap", "ap_std")},
+    }
+
+
+def train(dataset, grid=None, n_splits=N_SPLITS, workers=None, refit=True, data_path=None, model_path=None,
+          backend=DEFAULT_BACKEND, publish_model=False, activate=False):
+    """
+    CV + modelo final. Con publish_model el modelo se publica en el registro
+    como versión nueva; sólo pasa a ser la activa (y el backend la carga) con
+    activate, así los experimentos no cambian el modelo servido.
+    """
+    data_path = data_path or os.path.join(SOURCE_DIR, DATASETS[dataset][0])
+    model_path = model_path or os.path.join(MODELS_DIR, model_file(dataset, backend))
+
+    combos, results, summary = cross_validate(data_path, grid, n_splits, workers, backend)
+    best = summary.iloc[0]
+    print(f"CV (GroupKFold, {n_splits} folds) — {dataset} [{backend}]")
+    print(summary.drop(columns="combo").to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    print(f"Mejor: {combos[best['combo']]}  AUC: {best['auc']:.3f} ± {best['auc_std']:.3f} "
+          f"| AP: {best['ap']:.3f} ± {best['ap_std']:.3f}")
+    print("Resultados en:", write_report(results, summary, f"{dataset}_{backend}"))
+
+    if refit:
+        params = combos[best["combo"]]
+        clf = fit_final(data_path, model_path, params, backend)
+        if publish_model or activate:
+            meta = model_metadata(clf, dataset, backend, params, best, data_path, n_splits)
+            version = publish(MODEL_KEYS[dataset], clf, meta, make_current=activate)
+            print(f"Versión publicada ({MODEL_KEYS[dataset]}):", version,
+                  "(activa)" if activate else f"(activar con: python models/modelRegistry.py activate {MODEL_KEYS[dataset]} {version})")
+    return results, summary
+
+
+def parse_param(text):
+    """'max_depth=None,20' -> ('max_depth', [None, 20])"""
+    key, values = text.split("=", 1)
+
+    def cast(v):
+        if v == "None":
+            return None
+        try:
+            return int(v)
+        except ValueError:
+            return float(v)
+
+    return key, [cast(v) for v in values.split(",")]
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("dataset", choices=list(DATASETS))
+    ap.add_argument("--backend", choices=list(BACKENDS), default=DEFAULT_BACKEND)
+    ap.add_argument("--param", type=parse_param, action="append", default=[],
+                    help="hiperparámetro del modelo con valores separados por coma (repetible)")
+    ap.add_argument("--folds", type=int, default=N_SPLITS)
+    ap.add_argument("--workers", type=int, default=None, help="procesos (por defecto, nº de CPUs)")
+    ap.add_argument("--data", default=None, help="dataset .arrow (por defecto, el del tipo)")
+    ap.add_argument("--model", default=None, help="ruta del joblib final (por defecto, <modelo>_<backend>.joblib)")
+    ap.add_argument("--no-refit", action="store_true", help="sólo CV, sin modelo final")
+    ap.add_argument("--publish", action="store_true",
+                    help="publicar el modelo final en models/registry/ sin activarlo")
+    ap.add_argument("--activate", action="store_true",
+                    help="publicar y activar (el backend lo carga en caliente)")
+    args = ap.parse_args()
+
+    grid = default_grid(args.backend) | dict(args.param)
+    train(args.dataset, grid, args.folds, args.workers, not args.no_refit, args.data, args.model,
+          args.backend, args.publish, args.activate)